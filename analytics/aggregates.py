@@ -0,0 +1,145 @@
+"""
+Country-level aggregate cube shared by the dashboard tabs.
+
+One groupby over the fact table yields sum/mean/min/max/count per country for
+every dashboard metric. Tabs read columns out of the cube instead of running
+their own `df.groupby('Country')` on every rerun.
+
+Means of means cannot be merged, so every metric also keeps mergeable moments
+per (Country, Year): sum, count, document-weighted sum and document weight.
+Any rollup (country lifetime, a year range, a set of countries) is a sum of
+those moments in O(groups), and gives both the simple and the
+document-weighted mean. The cube's 'wmean' stat comes from them.
+"""
+import pandas as pd
+
+# Every metric offered in the tab METRICS_MAP dictionaries
+METRIC_COLUMNS = [
+    'Documents',
+    'Times Cited',
+    'CNCI',
+    'Collab-CNCI',
+    '% Docs Cited',
+    '% Documents in Top 1%',
+    '% Documents in Top 10%',
+]
+# Metrics of the per-metric views (tab selectors, batch report, API quadrant columns) with their labels
+METRIC_LABELS = {
+    'Documents': "Documents (Volume)",
+    'CNCI': "CNCI (Quality)",
+    'Times Cited': "Times Cited (Impact)",
+    '% Docs Cited': "% Docs Cited (Relevance)",
+    'Collab-CNCI': "Collab-CNCI (Collab Quality)",
+    '% Documents in Top 1%': "% Top 1% Documents (Excellence)",
+}
+CUBE_STATS = ['sum', 'mean', 'min', 'max', 'count']
+MOMENTS = ['sum', 'count', 'wsum', 'weight']  # <-- same state the ETL merges per chunk (etl.MEAN_STATE)
+WEIGHT_COL = 'Documents'
+
+# Volume metrics are totalled, quality/percentage metrics are averaged
+VOLUME_METRICS = ['Documents', 'Times Cited']
+
+
+def build_moments(df, metrics=None, keys=('Country', 'Year'), state=None):
+    """keys x (metric, moment) frame of additive moments. Treat the result as read-only.
+
+    `state` maps each moment to the column suffix of moments already kept per row
+    (etl.MEAN_STATE): metrics that carry them are rolled up from those columns, so
+    rows that are themselves aggregates (the ETL's groups) are not counted as one value.
+    """
+    metrics = [m for m in (metrics or METRIC_COLUMNS) if m in df.columns]
+    values = df[metrics].astype('float64')
+    weight = df[WEIGHT_COL].astype('float64')
+    parts = {}
+    for col in metrics:
+        if state and all(col + suffix in df.columns for suffix in state.values()):
+            parts.update({(col, moment): df[col + state[moment]] for moment in MOMENTS})
+            continue
+        present = values[col].notna()
+        parts[(col, 'sum')] = values[col]
+        parts[(col, 'count')] = present.astype('int64')
+        parts[(col, 'wsum')] = values[col] * weight
+        parts[(col, 'weight')] = weight.where(present)
+    groups = [df[key].astype(str) if isinstance(df[key].dtype, pd.CategoricalDtype) else df[key] for key in keys]
+    return pd.DataFrame(parts).groupby(groups, observed=True).sum()
+
+
+def rollup(moments, by='Country', mask=None):
+    """Sum moments over the groups selected by `mask`, per level `by`."""
+    if mask is not None:
+        moments = moments[mask]
+    return moments.groupby(level=by, observed=True).sum()
+
+
+def moment_means(moments, weighted=False):
+    """Simple (sum / count) or document-weighted (wsum / weight) mean of every metric."""
+    num, den = ('wsum', 'weight') if weighted else ('sum', 'count')
+    numer = moments.xs(num, axis=1, level=1)
+    denom = moments.xs(den, axis=1, level=1)
+    return numer / denom.where(denom > 0)
+
+
+def build_country_cube(df, metrics=None):
+    """Country x (metric, stat) frame. Treat the result as read-only."""
+    metrics = [m for m in (metrics or METRIC_COLUMNS) if m in df.columns]
+    cube = df.groupby('Country', observed=True)[metrics].agg(CUBE_STATS)
+    cube.index = cube.index.astype(str)  # <-- plain labels, no unused categories
+    weighted = moment_means(rollup(build_moments(df, metrics)), weighted=True)
+    for col in metrics:
+        cube[(col, 'wmean')] = weighted[col].reindex(cube.index)
+    return cube
+
+
+def default_agg(col):
+    return 'sum' if col in VOLUME_METRICS else 'mean'
+
+
+def country_series(cube, col, how=None):
+    """Series of one (metric, stat) column, indexed by Country."""
+    return cube[(col, how or default_agg(col))].rename(col)
+
+
+def country_frame(cube, rules):
+    """Country-level frame like `df.groupby('Country').agg(rules).reset_index()`."""
+    out = pd.DataFrame({col: cube[(col, how)] for col, how in rules.items()})
+    out.index.name = 'Country'
+    return out.reset_index()
+
+
+def quadrant_rules(averages='mean'):
+    """Tab 2 aggregation per column: volume sums, quality metrics averaged by `averages` ('mean' or 'wmean')."""
+    return {
+        'Documents': 'sum',
+        'Times Cited': 'sum',
+        'CNCI': averages,
+        'Collab-CNCI': averages,
+        '% Docs Cited': averages,
+        '% Documents in Top 1%': averages
+    }
+
+
+def pareto_table(cube, col):
+    """Sorted country totals with cumulative share, plus % of entities needed for 80%."""
+    pareto_df = cube[(col, 'sum')].rename(col).sort_values(ascending=False).reset_index()
+
+    total_val = pareto_df[col].sum()
+    pareto_df['Cumulative_Perc'] = (pareto_df[col].cumsum() / total_val) * 100
+    pareto_df['Entity_Perc'] = ((pareto_df.index + 1) / len(pareto_df)) * 100
+    return pareto_df, pareto_cutoff(pareto_df)
+
+
+def pareto_cutoff(pareto_df, share=80):
+    """% of entities needed to reach `share`% of the total (100 if never reached)."""
+    reached = pareto_df.loc[pareto_df['Cumulative_Perc'] >= share, 'Entity_Perc']
+    return reached.iloc[0] if not reached.empty else 100
+
+
+def leaderboard(cube, col, how=None, countries=None, top=None, ascending=False):
+    """Country/value frame sorted by the aggregated metric."""
+    series = country_series(cube, col, how)
+    if countries is not None:
+        series = series[series.index.isin(countries)]
+    series = series.sort_values(ascending=ascending)
+    if top is not None:
+        series = series.head(top)
+    return series.reset_index()
@@ -0,0 +1,385 @@
+"""
+Local HTTP API for the dashboard's derived tables.
+
+Serves leaderboards, yearly rankings, dominance series, quadrant assignments
+and outlier lists as JSON or Arrow IPC. Each table is built by the same query
+backend (analytics.backends) the dashboard tabs call, with the same sidebar
+filters (?field=, ?doc_type=, ?years=2010-2020, ?countries=INDIA,USA).
+
+- Tables are memoized per (dataset version, dataset, metric, params) in a
+  memo.ComputeCache. Encoded pages go into a byte-bounded LRU.
+- pandas work runs in the thread pool. Concurrent requests for the same page
+  await one shared computation, so many polling clients cost one rebuild.
+- ETags are derived from the request key (dataset version + code + params), so
+  a matching If-None-Match is answered 304 before anything is computed.
+- JSON (default) or Arrow IPC (?format=arrow or Accept:
+  application/vnd.apache.arrow.stream). Bodies are gzipped for clients that ask.
+- Pagination via ?page= and ?page_size=, with X-Total-Count and Link headers.
+
+Usage:
+    pip install -r requirements-api.txt    # starlette + uvicorn
+    python -m analytics.api --port 8600
+    curl 'http://127.0.0.1:8600/leaderboard/CNCI?top=10'
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import math
+import threading
+import time
+from urllib.parse import quote, urlencode
+
+import pyarrow as pa
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from analytics import aggregates, backends, compute, memo, outliers, ranks, slicing, star, store
+
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+VERSION_TTL = 5.0  # <-- seconds between checks of the store for a new dataset version
+
+
+class ResponseCache(memo.ComputeCache):
+    """LRU of encoded (body, row count) pages, bounded by total body bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=4096):
+        super().__init__(max_entries)
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._sizes = {}
+
+    def _measure(self, value):
+        return len(value[0])
+
+    def _insert(self, key, value, size):
+        self._data[key] = value
+        self._sizes[key] = size
+        self.nbytes += size
+
+    def _remove(self, key):
+        del self._data[key]
+        self.nbytes -= self._sizes.pop(key)
+
+    def _over_budget(self):
+        return len(self._data) > self.max_entries or self.nbytes > self.max_bytes
+
+
+# -----------------------------------------------------------------------------
+# DATA (dataset version, filtered views, query engine)
+# -----------------------------------------------------------------------------
+class Datasets:
+    """Current dataset version plus the frame / cube / ranks of each filtered view."""
+
+    def __init__(self, ttl=VERSION_TTL):
+        self.ttl = ttl
+        self.version = None
+        self.code = memo.code_digest()  # <-- analytics code change = new ETags after a restart
+        self.tables = memo.ComputeCache(max_entries=512)
+        self.views = memo.ComputeCache(max_entries=16)
+        self.pages = ResponseCache()
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._star = None
+        self._duckdb = None
+
+    def refresh(self):
+        """Re-read the store metadata at most every `ttl` seconds; drop caches of older versions."""
+        with self._lock:
+            if self.version is not None and time.monotonic() - self._checked < self.ttl:
+                return self.version
+            version = store.ensure_store()['version']
+            if version != self.version:
+                self._star = star.StarSchema(store.load_facts())
+                self._duckdb = None
+                for cache in (self.tables, self.views, self.pages):
+                    cache.retain_version(version)
+                self.version = version
+            self._checked = time.monotonic()
+            return version
+
+    def check_filters(self, field, data_slice):
+        """Reject unknown Field / Document Type members, countries and year ranges without data."""
+        for name, member in zip(star.FILTER_DIMENSIONS, field):
+            if member != star.ALL and member not in self._star.members(name):
+                raise HTTPException(404, f"Unknown {name}: {member}")
+        if data_slice is None:
+            return
+        years, countries = data_slice
+        if years is not None:
+            known = self._star.members('Year')
+            if years[1] < known[0] or years[0] > known[-1]:
+                raise HTTPException(404, f"No data for years {years[0]}-{years[1]} (data covers {known[0]}-{known[-1]})")
+        unknown = sorted(set(countries) - set(self._star.members('Country')))
+        if unknown:
+            raise HTTPException(404, f"Unknown countries: {', '.join(unknown)}")
+
+    def _build_view(self, version, field, data_slice):
+        frame = self._star.frame(*field)
+        if data_slice is None:
+            return frame, aggregates.build_country_cube(frame), ranks.RankTensor(frame, aggregates.METRIC_COLUMNS)
+        slicer = self.views.get_or_compute(
+            memo.make_key(version, 'slicer', None, data_field=field),
+            slicing.SliceIndex, frame, aggregates.METRIC_COLUMNS
+        )
+        years, countries = data_slice
+        rows = slicer.rows(years, countries)
+        return rows, slicer.cube(years, countries), ranks.RankTensor(rows, aggregates.METRIC_COLUMNS)
+
+    def view(self, version, field, data_slice):
+        """(query backend, country cube) for one sidebar selection, as the dashboard builds them."""
+        key = memo.make_key(version, 'view', None, data_field=field, data_slice=data_slice)
+        frame, cube, rank_tensor = self.views.get_or_compute(key, self._build_view, version, field, data_slice)
+        if backends.backend_name() != 'duckdb':
+            return backends.PandasBackend(frame, cube, lambda: rank_tensor), cube
+        with self._lock:
+            if self._duckdb is None:
+                self._duckdb = (backends.connect(), backends.export_parquet(store.load_facts(), version))
+        con, path = self._duckdb
+        years, countries = data_slice or (None, ())
+        return backends.DuckDBBackend(con, path, frame, years=years, countries=countries, field=field), cube
+
+
+# -----------------------------------------------------------------------------
+# DATASETS: (engine, cube, metric, params) -> (DataFrame, meta)
+# -----------------------------------------------------------------------------
+def _metric(engine, metric):
+    if metric not in aggregates.METRIC_COLUMNS or metric not in engine.frame.columns:
+        raise HTTPException(404, f"Unknown metric: {metric}")
+    return metric
+
+
+def leaderboard(engine, cube, metric, how=None, top=None):
+    how = how or aggregates.default_agg(metric)
+    return aggregates.leaderboard(cube, metric, how, top=top), {'how': how}
+
+
+def yearly(engine, cube, metric, year=None, k=10):
+    years = sorted(engine.frame['Year'].unique())
+    if not years and year is None:
+        # A valid filter without rows: empty leaderboard
+        ranked = dict.fromkeys(['Rank', 'Rank Change', 'Percentile'], float('nan'))
+        return engine.frame[['Country', metric]].assign(**ranked), {'year': None}
+    year = int(years[-1]) if year is None else year
+    if year not in years:
+        raise HTTPException(404, f"No data for year {year}")
+    return engine.year_top(metric, year, k=k), {'year': year}
+
+
+def dominance(engine, cube, metric):
+    return engine.top2_per_year(metric), {}
+
+
+def quadrant(engine, cube, metric, y='CNCI', averages='mean'):
+    # metric = x axis (path), y = y axis; ratio metrics averaged by `averages` like tab 2
+    if y == metric:
+        raise HTTPException(400, f"y must be a metric other than {metric}")
+    columns = dict.fromkeys(list(aggregates.METRIC_LABELS) + [metric, y])  # <-- tab 2 columns plus both axes
+    rules = {col: 'sum' if aggregates.default_agg(col) == 'sum' else averages for col in columns}
+    overall_df, median_x, median_y = engine.quadrant(rules, metric, y, averages=averages)
+    overall_df = overall_df.assign(Quadrant=compute.quadrant_labels(overall_df, metric, y, median_x, median_y))
+    return overall_df, {'median_x': float(median_x), 'median_y': float(median_y)}
+
+
+def outlier_list(engine, cube, metric, method='iqr', scope='global', window=7):
+    if engine.frame.empty:
+        # A valid filter without rows: nothing to fence, bounds are null
+        fences = dict.fromkeys(['Lower Fence', 'Upper Fence'] if scope != 'global' else [], float('nan'))
+        return engine.frame[['Country', 'Year', metric]].assign(**fences), {'lower': None, 'upper': None} if scope == 'global' else {}
+    scan = engine.outlier_scan([metric], method=method, scope=scope, window=window)
+    rows = outliers.outlier_rows(engine.frame, scan, metric)
+    columns = ['Country', 'Year', metric] + [c for c in ('Lower Fence', 'Upper Fence') if c in rows.columns]
+    meta = {'lower': float(scan['lower'][metric].iloc[0]), 'upper': float(scan['upper'][metric].iloc[0])} if scope == 'global' else {}
+    return rows[columns].sort_values(metric, ascending=False).reset_index(drop=True), meta
+
+
+DATASETS = {
+    # name: (builder, {query param: type})
+    'leaderboard': (leaderboard, {'how': str, 'top': int}),
+    'yearly': (yearly, {'year': int, 'k': int}),
+    'dominance': (dominance, {}),
+    'quadrant': (quadrant, {'y': str, 'averages': str}),
+    'outliers': (outlier_list, {'method': str, 'scope': str, 'window': int}),
+}
+
+# Checked in _parse() before any data is touched: query param -> (predicate, message)
+PARAM_CHECKS = {
+    'how': (lambda v: v in ('sum', 'mean', 'wmean', 'min', 'max'), "how must be sum|mean|wmean|min|max"),
+    'top': (lambda v: v >= 1, "top must be >= 1"),
+    'k': (lambda v: v >= 1, "k must be >= 1"),
+    'y': (lambda v: v in aggregates.METRIC_COLUMNS, "y must be a metric"),
+    'averages': (lambda v: v in ('mean', 'wmean'), "averages must be mean or wmean"),
+    'method': (lambda v: v in outliers.DEFAULT_K, "method must be iqr or mad"),
+    'scope': (lambda v: v in ('global', 'country', 'year', 'rolling'), "scope must be global|country|year|rolling"),
+    'window': (lambda v: v >= outliers.MIN_WINDOW and v % 2 == 1, f"window must be an odd number >= {outliers.MIN_WINDOW}"),
+}
+
+
+# -----------------------------------------------------------------------------
+# ENCODING
+# -----------------------------------------------------------------------------
+def encode(table, meta, envelope, fmt):
+    if fmt == 'arrow':
+        arrow = pa.Table.from_pandas(table, preserve_index=False)
+        arrow = arrow.replace_schema_metadata({**(arrow.schema.metadata or {}), b'dashboard': json.dumps({**envelope, 'meta': meta}).encode()})
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, arrow.schema) as writer:
+            writer.write_table(arrow)
+        return sink.getvalue()
+    float32 = {c: table[c].astype(str).astype('float64') for c in table.columns if table[c].dtype == 'float32'}
+    rows = table.assign(**float32).to_json(orient='records', date_format='iso')  # <-- shortest float32 repr, NaN -> null
+    head = json.dumps({**envelope, 'meta': meta, 'columns': [str(c) for c in table.columns]})
+    return (head[:-1] + ', "rows": ' + rows + '}').encode('utf-8')
+
+
+def _etag(key):
+    return '"' + hashlib.sha256(repr(key).encode()).hexdigest()[:32] + '"'
+
+
+def _page_url(request, page):
+    return quote(request.url.path) + '?' + urlencode({**request.query_params, 'page': page})
+
+
+def _parse_filters(params):
+    """(field, data_slice) like the sidebar: data_slice = ((first, last) or None, countries) or None."""
+    field = (params.get('field', star.ALL), params.get('doc_type', star.ALL))
+    countries = tuple(sorted(c for c in params.get('countries', '').split(',') if c))
+    years = None
+    if params.get('years'):
+        try:
+            first, last = (int(y) for y in params['years'].split('-'))
+        except ValueError:
+            raise HTTPException(400, "years must look like 2010-2020")
+        if first > last:
+            raise HTTPException(400, f"years range is reversed: {first}-{last}")
+        years = (first, last)
+    return field, (years, countries) if years or countries else None
+
+
+def _parse(request):
+    name = request.path_params['dataset']
+    if name not in DATASETS:
+        raise HTTPException(404, f"Unknown dataset: {name}")
+    _, types = DATASETS[name]
+    params = {}
+    for param, kind in types.items():
+        if param in request.query_params:
+            try:
+                params[param] = kind(request.query_params[param])
+            except ValueError:
+                raise HTTPException(400, f"Bad value for {param}")
+            valid, message = PARAM_CHECKS.get(param, (None, None))
+            if valid is not None and not valid(params[param]):
+                raise HTTPException(400, message)
+    try:
+        page = int(request.query_params.get('page', 1))
+        page_size = int(request.query_params.get('page_size', PAGE_SIZE))
+    except ValueError:
+        raise HTTPException(400, "page and page_size must be integers")
+    if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise HTTPException(400, f"page >= 1 and 1 <= page_size <= {MAX_PAGE_SIZE}")
+    fmt = request.query_params.get('format') or ('arrow' if ARROW_TYPE in request.headers.get('accept', '') else 'json')
+    if fmt not in ('json', 'arrow'):
+        raise HTTPException(400, "format must be json or arrow")
+    return name, request.path_params['metric'], params, page, page_size, fmt
+
+
+# -----------------------------------------------------------------------------
+# APPLICATION
+# -----------------------------------------------------------------------------
+def create_app(datasets=None):
+    datasets = datasets or Datasets()
+    inflight = {}  # <-- page key -> task; concurrent identical requests share one computation
+
+    def build_page(key, name, metric, params, field, data_slice, page, page_size, fmt):
+        version = key[0]
+
+        def build_table():
+            engine, cube = datasets.view(version, field, data_slice)
+            builder, _ = DATASETS[name]
+            return builder(engine, cube, _metric(engine, metric), **params)
+
+        table, meta = datasets.tables.get_or_compute(key, build_table)
+        total = len(table)
+        part = table.iloc[(page - 1) * page_size: page * page_size].reset_index(drop=True)
+        envelope = {
+            'dataset': name, 'metric': metric, 'version': version, 'params': params,
+            'total': total, 'page': page, 'page_size': page_size, 'pages': max(1, math.ceil(total / page_size)),
+        }
+        return encode(part, meta, envelope, fmt), total
+
+    async def shared(page_key, *args):
+        task = inflight.get(page_key)
+        if task is None:
+            task = asyncio.ensure_future(run_in_threadpool(datasets.pages.get_or_compute, page_key, build_page, *args))
+            inflight[page_key] = task
+            task.add_done_callback(lambda _: inflight.pop(page_key, None))
+        return await asyncio.shield(task)  # <-- one client disconnecting does not cancel the others
+
+    async def table_endpoint(request):
+        name, metric, params, page, page_size, fmt = _parse(request)
+        field, data_slice = _parse_filters(request.query_params)
+        version = await run_in_threadpool(datasets.refresh)
+        datasets.check_filters(field, data_slice)
+        key = memo.make_key(version, name, metric, data_field=field, data_slice=data_slice, **params)
+        page_key = key + (datasets.code, page, page_size, fmt)
+        etag = _etag(page_key)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept, Accept-Encoding'}
+        if etag in [t.strip() for t in request.headers.get('if-none-match', '').split(',')]:
+            return Response(status_code=304, headers=headers)  # <-- nothing computed or encoded
+
+        body, total = await shared(page_key, key, name, metric, params, field, data_slice, page, page_size, fmt)
+        headers['X-Total-Count'] = str(total)
+        links = []
+        if page * page_size < total:
+            links.append(f'<{_page_url(request, page + 1)}>; rel="next"')
+        if page > 1:
+            links.append(f'<{_page_url(request, page - 1)}>; rel="prev"')
+        if links:
+            headers['Link'] = ', '.join(links)
+        return Response(body, media_type=ARROW_TYPE if fmt == 'arrow' else 'application/json', headers=headers)
+
+    async def index(request):
+        version = await run_in_threadpool(datasets.refresh)
+        return JSONResponse({
+            'version': version,
+            'backend': backends.backend_name(),
+            'metrics': list(aggregates.METRIC_COLUMNS),
+            'datasets': {name: sorted(types) for name, (_, types) in DATASETS.items()},
+            'filters': ['field', 'doc_type', 'years', 'countries'],
+            'cache': {'tables': datasets.tables.stats(), 'pages': datasets.pages.stats()},
+        })
+
+    async def http_error(request, exc):
+        return JSONResponse({'error': exc.detail}, status_code=exc.status_code)
+
+    return Starlette(
+        routes=[
+            Route('/', index),
+            Route('/{dataset}/{metric:path}', table_endpoint),
+        ],
+        middleware=[Middleware(GZipMiddleware, minimum_size=1024)],
+        exception_handlers={HTTPException: http_error},
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the dashboard's derived tables over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level='info')
+
+
+if __name__ == '__main__':
+    main()
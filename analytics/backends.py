@@ -0,0 +1,225 @@
+"""
+Pluggable query backends for the tab aggregations.
+
+Both backends answer the same questions with the same small frames the Plotly
+code already consumes:
+
+- pareto(col): sorted country totals, cumulative share and the 80% cutoff (tab 1)
+- quadrant(rules, x_col, y_col): country-level frame plus its two medians (tab 2)
+- top2_per_year(col): leader, runner-up and dominance margin per year (tab 4)
+- outlier_scan(columns, ...): fences and labels for tab 5
+- year_top(col, year, k): dense-ranked top k of one year with rank change (tab 7)
+
+'pandas' (default) runs them on the in-memory frame, cube and rank tensor.
+'duckdb' runs SQL over a Parquet copy of the fact table. Only the referenced
+columns are read (projection pushdown), the year / country / field filter is
+applied while scanning (predicate pushdown), and queries use every core. Select it with
+DASHBOARD_BACKEND=duckdb. Without the duckdb package the pandas backend is used.
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics import aggregates, compute, dominance, etl, outliers, store
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None  # <-- DASHBOARD_BACKEND=duckdb falls back to pandas
+
+BACKENDS = ['pandas', 'duckdb']
+PARQUET_DIR = os.path.dirname(store.STORE_PATH)
+
+
+def backend_name():
+    name = os.environ.get('DASHBOARD_BACKEND', 'pandas').lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DASHBOARD_BACKEND: {name}")
+    return 'pandas' if name == 'duckdb' and duckdb is None else name
+
+
+# -----------------------------------------------------------------------------
+# PANDAS (in-memory frame, cube and rank tensor)
+# -----------------------------------------------------------------------------
+class PandasBackend:
+    name = 'pandas'
+
+    def __init__(self, frame, cube, rank_loader):
+        self.frame = frame
+        self.cube = cube
+        self._rank_loader = rank_loader  # <-- the rank tensor is only built when tab 7 asks for it
+
+    def pareto(self, col):
+        return aggregates.pareto_table(self.cube, col)
+
+    def quadrant(self, rules, x_col, y_col, averages='mean'):
+        overall_df = aggregates.country_frame(self.cube, rules)
+        median_x, median_y = compute.quadrant_medians(overall_df, x_col, y_col)
+        return overall_df, median_x, median_y
+
+    def top2_per_year(self, col):
+        return dominance.market_dominance(self.frame, col)
+
+    def outlier_scan(self, columns, method='iqr', scope='global', window=7):
+        return outliers.scan(self.frame, columns, method=method, scope=scope, window=window)
+
+    def year_top(self, col, year, k=10):
+        return self._rank_loader().top_k(col, year, k=k)
+
+
+# -----------------------------------------------------------------------------
+# DUCKDB (SQL over Parquet)
+# -----------------------------------------------------------------------------
+def parquet_path(version):
+    return os.path.join(PARQUET_DIR, f"facts-{version[:16]}.parquet")
+
+
+def export_parquet(facts, version):
+    """Write the fact table for `version` once and drop copies of older versions."""
+    path = parquet_path(version)
+    if not os.path.exists(path):
+        etl.atomic_write(path, lambda f: facts.to_parquet(f, index=False), binary=True)
+    for old in glob.glob(os.path.join(PARQUET_DIR, 'facts-*.parquet')):
+        if old != path:
+            os.remove(old)
+    return path
+
+
+def connect():
+    return duckdb.connect(database=':memory:')
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    name = 'duckdb'
+
+    def __init__(self, con, path, frame, years=None, countries=None, field=None):
+        self.con = con
+        self.path = path
+        self.frame = frame  # <-- rows the tabs plot; only used to attach outlier labels
+        self.years = years
+        self.countries = countries
+        self.field = dict(zip(['Category', 'Doc Type'], field or ()))
+        self.source = "read_parquet('" + path.replace("'", "''") + "')"
+        self.columns = set(self._query(f"SELECT * FROM {self.source} LIMIT 0").columns)
+
+    def _query(self, sql, params=()):
+        return self.con.cursor().execute(sql, list(params)).df()  # <-- one cursor per call, safe across sessions
+
+    def _where(self):
+        clauses, params = [], []
+        if self.years is not None:
+            clauses.append('Year BETWEEN ? AND ?')
+            params += [int(y) for y in self.years]
+        if self.countries:
+            clauses.append(f"Country IN ({', '.join('?' * len(self.countries))})")
+            params += list(self.countries)
+        for dim, member in self.field.items():
+            if member != 'All':
+                clauses.append(f'{_q(dim)} = ?')
+                params.append(member)
+        return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _rollup(self, col):
+        c = _q(col)
+        if etl.AGG_RULES.get(col) == 'sum':
+            return f"SUM({c})"
+        total, count = col + etl.MEAN_STATE['sum'], col + etl.MEAN_STATE['count']
+        if {total, count} <= self.columns:
+            # Mean of the raw rows behind every fact row, rounded like the ETL's means
+            return f"ROUND(SUM({_q(total)}) / NULLIF(SUM({_q(count)}), 0), 2)"
+        return f"AVG({c})"  # <-- fact table without the ETL's mean state
+
+    def _cy(self, columns):
+        # Country x Year rollup of the view (identity unless the export has Category / Doc Type rows)
+        select = ', '.join(f"{self._rollup(col)} AS {_q(col)}" for col in dict.fromkeys(columns))
+        where, params = self._where()
+        return f"cy AS (SELECT Country, Year, {select} FROM {self.source} {where} GROUP BY Country, Year)", params
+
+    def _is_int(self, col):
+        return self.frame[col].dtype.kind in 'iu'
+
+    def _agg(self, col, how):
+        c = _q(col)
+        if how == 'sum':
+            return f"CAST(SUM({c}) AS BIGINT)" if self._is_int(col) else f"SUM({c})"
+        if how == 'wmean':
+            return f"SUM({c} * \"Documents\") / SUM(CASE WHEN {c} IS NOT NULL THEN \"Documents\" END)"
+        return {'mean': 'AVG', 'min': 'MIN', 'max': 'MAX', 'count': 'COUNT'}[how] + f"({c})"
+
+    def pareto(self, col):
+        cy, params = self._cy([col])
+        c = _q(col)
+        order = f"{c} DESC, Country"
+        pareto_df = self._query(f"""
+            WITH {cy}, totals AS (SELECT Country, {self._agg(col, 'sum')} AS {c} FROM cy GROUP BY Country)
+            SELECT Country, {c},
+                   SUM({c}) OVER (ORDER BY {order} ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) * 100.0
+                       / SUM({c}) OVER () AS Cumulative_Perc,
+                   ROW_NUMBER() OVER (ORDER BY {order}) * 100.0 / COUNT(*) OVER () AS Entity_Perc
+            FROM totals ORDER BY {order}
+        """, params)
+        return pareto_df, aggregates.pareto_cutoff(pareto_df)
+
+    def quadrant(self, rules, x_col, y_col, averages='mean'):
+        needed = list(rules) + (['Documents'] if 'wmean' in rules.values() else [])
+        cy, params = self._cy(needed)
+        select = ', '.join(f"{self._agg(col, how)} AS {_q(col)}" for col, how in rules.items())
+        overall_df = self._query(f"""
+            WITH {cy}, agg AS (SELECT Country, {select} FROM cy GROUP BY Country)
+            SELECT *, MEDIAN({_q(x_col)}) OVER () AS __median_x, MEDIAN({_q(y_col)}) OVER () AS __median_y
+            FROM agg ORDER BY Country
+        """, params)
+        median_x, median_y = overall_df['__median_x'].iloc[0], overall_df['__median_y'].iloc[0]
+        return overall_df.drop(columns=['__median_x', '__median_y']), median_x, median_y
+
+    def top2_per_year(self, col):
+        cy, params = self._cy([col])
+        c = _q(col)
+        return self._query(f"""
+            WITH {cy}, ranked AS (
+                SELECT Year, Country, {c} AS v, ROW_NUMBER() OVER (PARTITION BY Year ORDER BY {c} DESC, Country) AS pos
+                FROM cy WHERE {c} IS NOT NULL)
+            SELECT l.Year, l.Country AS Leader, r.Country AS "Runner-Up",
+                   CASE WHEN l.v + r.v > 0 THEN (l.v - r.v) / (l.v + r.v) * 100 ELSE 0 END AS "Dominance %"
+            FROM ranked l JOIN ranked r ON l.Year = r.Year AND l.pos = 1 AND r.pos = 2
+            ORDER BY l.Year
+        """, params)
+
+    def outlier_scan(self, columns, method='iqr', scope='global', window=7):
+        if method != 'iqr' or scope != 'global':
+            # Grouped / rolling / MAD fences need every row's neighbours: computed in pandas
+            return outliers.scan(self.frame, columns, method=method, scope=scope, window=window)
+        cy, params = self._cy(columns)
+        quartiles = self._query(
+            f"WITH {cy} SELECT " + ', '.join(f"QUANTILE_CONT({_q(c)}, [0.25, 0.75]) AS {_q(c)}" for c in columns) + " FROM cy",
+            params,
+        ).iloc[0]
+        k = outliers.DEFAULT_K['iqr']
+        q1 = np.array([quartiles[c][0] for c in columns])
+        q3 = np.array([quartiles[c][1] for c in columns])
+        fences = pd.DataFrame([q1 - k * (q3 - q1), q3 + k * (q3 - q1)], index=['lower', 'upper'], columns=columns)
+        return outliers.from_fences(self.frame, fences)
+
+    def year_top(self, col, year, k=10):
+        cy, params = self._cy([col])
+        c = _q(col)
+        top = self._query(f"""
+            WITH {cy},
+            prev AS (SELECT MAX(Year) AS y FROM cy WHERE Year < ?),
+            ranked AS (
+                SELECT Country, Year, {c},
+                       DENSE_RANK() OVER (PARTITION BY Year ORDER BY {c} DESC) AS "Rank",
+                       COUNT(*) OVER (PARTITION BY Year ORDER BY {c} RANGE BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+                           * 100.0 / COUNT(*) OVER (PARTITION BY Year) AS Percentile
+                FROM cy WHERE {c} IS NOT NULL AND (Year = ? OR Year = (SELECT y FROM prev)))
+            SELECT cur.Country, cur.{c}, cur."Rank", p."Rank" - cur."Rank" AS "Rank Change", cur.Percentile
+            FROM ranked cur LEFT JOIN ranked p ON p.Country = cur.Country AND p.Year = (SELECT y FROM prev)
+            WHERE cur.Year = ? ORDER BY cur."Rank", cur.Country LIMIT ?
+        """, params + [int(year)] * 3 + [int(k)])
+        return top.astype({col: self.frame[col].dtype, 'Rank': 'int16', 'Rank Change': 'float64', 'Percentile': 'float32'})
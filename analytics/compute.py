@@ -0,0 +1,53 @@
+"""
+Pure per-tab computations (no Streamlit calls), safe to memoize.
+
+Functions taking an optional `qindex` (quantiles.QuantileIndex) read quantiles
+from its presorted columns instead of re-sorting the column.
+"""
+import pandas as pd
+
+from analytics.quantiles import SortedColumn
+
+
+def distribution_summary(df, col, qindex=None):
+    """Tab 3: headline stats, describe() table, top-25% consistency and single-year peaks."""
+    values = df[col]
+    if qindex is not None:
+        sorted_col = qindex.column(col)
+        threshold = sorted_col.quantile(0.75)
+        median = sorted_col.median()
+        stats = sorted_col.describe().to_frame(name='Value')
+        consistent = qindex.group_counts_above(col, threshold).head(5).rename_axis('Country')
+    else:
+        threshold = values.quantile(0.75)
+        median = values.median()
+        stats = values.describe().to_frame(name='Value')
+        consistent = df.loc[values > threshold, 'Country'].astype(str).value_counts().head(5)
+    consistent = consistent.to_frame(name='High Perf. Years')
+
+    top_peaks = df.nlargest(5, col)[['Country', 'Year', col]].rename(columns={col: 'Value'})
+    top_peaks.index = range(1, len(top_peaks) + 1)
+
+    return {
+        'mean': values.mean(),
+        'median': median,
+        'skew': values.skew(),
+        'stats': stats,
+        'threshold': threshold,
+        'consistent': consistent,
+        'peaks': top_peaks,
+    }
+
+
+def quadrant_medians(overall_df, x_col, y_col):
+    """Tab 2: median lines of the strategic quadrant chart."""
+    return SortedColumn(overall_df[x_col]).median(), SortedColumn(overall_df[y_col]).median()
+
+
+def quadrant_labels(overall_df, x_col, y_col, median_x, median_y):
+    """Tab 2: quadrant of every country relative to the two median lines (categorical)."""
+    high_x = (overall_df[x_col] >= median_x).to_numpy()
+    high_y = (overall_df[y_col] >= median_y).to_numpy()
+    categories = ['Developing', f'{y_col} Driven', f'{x_col} Driven', 'Leaders']
+    labels = pd.Categorical.from_codes(high_x * 2 + high_y, categories=categories)
+    return pd.Series(labels, index=overall_df.index, name='Quadrant')
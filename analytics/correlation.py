@@ -0,0 +1,134 @@
+"""
+Correlation suite for tab 6: every metric pair at once.
+
+correlation_suite() returns Pearson, Spearman and Kendall matrices, their
+p-values, bootstrap confidence intervals (Pearson and Spearman) and the OLS
+slope/intercept of every (y, x) pair. All of it comes from a few matrix products
+over the complete-case rows, so one call per dataset version serves every
+selection in the tab.
+
+The bootstrap draws multinomial row counts. Each batch of resamples costs two
+matrix products (counts @ X and counts @ pairwise products), not a loop over
+pairs.
+"""
+import numpy as np
+import pandas as pd
+
+from analytics import resampling
+
+try:
+    from scipy import stats
+except ImportError:
+    stats = None  # <-- p-values and Kendall's tau are left as NaN
+
+METHODS = ['pearson', 'spearman', 'kendall']
+BOOT_CELLS = 20_000_000  # <-- resample counts held in memory per batch (B x n)
+
+
+def _pearson(X):
+    Z = X - X.mean(axis=0)
+    Z /= np.sqrt((Z ** 2).sum(axis=0))
+    return np.clip(Z.T @ Z, -1.0, 1.0)
+
+
+def _ranks(X):
+    return pd.DataFrame(X).rank(method='average').to_numpy()
+
+
+def _t_pvalues(r, n):
+    if stats is None or n < 3:
+        return np.full_like(r, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt((n - 2) / (1.0 - r ** 2))
+    p = 2 * stats.t.sf(np.abs(t), n - 2)
+    np.fill_diagonal(p, 0.0)
+    return p
+
+
+def _kendall(X):
+    m = X.shape[1]
+    tau = np.eye(m)
+    p = np.zeros((m, m))
+    if stats is None:
+        tau[~np.eye(m, dtype=bool)] = np.nan
+        p[:] = np.nan
+        return tau, p
+    for i in range(m):
+        for j in range(i + 1, m):
+            res = stats.kendalltau(X[:, i], X[:, j])  # <-- O(n log n) per pair
+            tau[i, j] = tau[j, i] = res.statistic
+            p[i, j] = p[j, i] = res.pvalue
+    return tau, p
+
+
+def bootstrap_pearson(blocks, n_boot=1000, ci=0.95, seed=0):
+    """Percentile CI bounds of the Pearson matrix of each (n x m) block.
+
+    All blocks share the same resamples. Returns [(low, high), ...] per block.
+    """
+    n, m = blocks[0].shape
+    iu, ju = np.triu_indices(m)
+    centred = [X - X.mean(axis=0) for X in blocks]  # <-- centring keeps the one-pass moments stable
+    firsts = np.hstack(centred)
+    products = np.hstack([Xc[:, iu] * Xc[:, ju] for Xc in centred])  # <-- (n, pairs per block x blocks)
+    n_pairs = len(iu)
+
+    rng = np.random.default_rng(seed)
+    batch = max(1, BOOT_CELLS // max(n, 1))
+    boot = []
+    for start in range(0, n_boot, batch):
+        W = resampling.resample_counts(rng, min(batch, n_boot - start), n)
+        s1 = W @ firsts / n
+        s2 = W @ products / n
+        rs = []
+        for b in range(len(blocks)):
+            b1 = s1[:, b * m:(b + 1) * m]
+            cov = s2[:, b * n_pairs:(b + 1) * n_pairs] - b1[:, iu] * b1[:, ju]
+            var = cov[:, iu == ju]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs.append(cov / np.sqrt(var[:, iu] * var[:, ju]))
+        boot.append(np.stack(rs, axis=1))  # <-- (resamples, blocks, pairs)
+    boot = np.concatenate(boot)
+
+    alpha = (1 - ci) / 2
+    lo_flat, hi_flat = np.nanquantile(boot, [alpha, 1 - alpha], axis=0)
+    bounds = []
+    for b in range(len(blocks)):
+        lo, hi = np.eye(m), np.eye(m)
+        lo[iu, ju] = lo[ju, iu] = lo_flat[b]
+        hi[iu, ju] = hi[ju, iu] = hi_flat[b]
+        bounds.append((lo, hi))
+    return bounds
+
+
+def correlation_suite(df, columns, n_boot=1000, ci=0.95, seed=0):
+    """All-pairs correlations, significance, bootstrap CIs and OLS lines for `columns`."""
+    data = df[list(columns)].astype('float64').dropna()
+    X = data.to_numpy()
+    n = len(X)
+    frame = lambda values: pd.DataFrame(values, index=data.columns, columns=data.columns)
+
+    R = _ranks(X)
+    pearson, spearman = _pearson(X), _pearson(R)
+    kendall, kendall_p = _kendall(X)
+
+    # Spearman CIs resample the rank-transformed rows (Pearson of ranks)
+    (pearson_lo, pearson_hi), (spearman_lo, spearman_hi) = bootstrap_pearson([X, R], n_boot, ci, seed)
+
+    # OLS of every column (rows, y) on every other (columns, x): slope = r * sd_y / sd_x
+    mean, sd = X.mean(axis=0), X.std(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = pearson * sd[:, None] / sd[None, :]
+    intercept = mean[:, None] - slope * mean[None, :]
+
+    return {
+        'n': n,
+        'ci': ci,
+        'matrices': {'pearson': frame(pearson), 'spearman': frame(spearman), 'kendall': frame(kendall)},
+        'pvalues': {'pearson': frame(_t_pvalues(pearson, n)), 'spearman': frame(_t_pvalues(spearman, n)), 'kendall': frame(kendall_p)},
+        'ci_low': {'pearson': frame(pearson_lo), 'spearman': frame(spearman_lo)},
+        'ci_high': {'pearson': frame(pearson_hi), 'spearman': frame(spearman_hi)},
+        'slope': frame(slope),  # <-- slope.loc[y_col, x_col]
+        'intercept': frame(intercept),
+        'r_squared': frame(pearson ** 2),
+    }
@@ -0,0 +1,26 @@
+"""
+Derived classification columns, kept outside the shared core frame.
+
+Labels are computed with vectorized comparisons into categorical Series aligned
+with the core frame's index, so tabs can colour charts by them without writing
+into the cached DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+OUTLIER_LABELS = ['Low Outlier', 'Normal', 'High Outlier']
+
+
+def threshold_labels(values, threshold, label_below, label_above):
+    """label_below where value < threshold, else label_above (categorical)."""
+    codes = np.where(values.to_numpy() < threshold, 0, 1)
+    labels = pd.Categorical.from_codes(codes, categories=[label_below, label_above])
+    return pd.Series(labels, index=values.index, name='Benchmark')
+
+
+def outlier_labels(values, lower, upper):
+    """Low/Normal/High Outlier per value for the given fences (categorical)."""
+    v = values.to_numpy()
+    codes = np.where(v > upper, 2, np.where(v < lower, 0, 1))
+    labels = pd.Categorical.from_codes(codes, categories=OUTLIER_LABELS)
+    return pd.Series(labels, index=values.index, name='Outlier_Status')
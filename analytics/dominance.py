@@ -0,0 +1,96 @@
+"""
+Leader vs runner-up dominance for tab 4 (Competitive Landscape).
+
+Dominance % is the normalized margin between two values:
+(leader - runner) / (leader + runner) * 100, or 0 when the total is not positive.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _dominance_pct(leader_val, runner_val):
+    total = leader_val + runner_val
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap = (leader_val - runner_val) / total * 100
+    return np.where(total > 0, gap, 0.0)
+
+
+def market_dominance(df, col, entity_col='Country', period_col='Year'):
+    """Top-2 entities per period by `col` and the leader's dominance margin.
+
+    One lexsort over the whole frame replaces a filter + sort per year.
+    Periods with fewer than two rows are skipped.
+    """
+    values = df[col].to_numpy(dtype='float64')
+    periods = df[period_col].to_numpy()
+    entities = df[entity_col].to_numpy(dtype=object)
+
+    # --- Step 1 : Sort once by (period asc, value desc) ---
+    order = np.lexsort((-values, periods)) # <-- last key is the primary key
+    sorted_periods = periods[order]
+
+    # --- Step 2 : First two rows of every period block ---
+    starts = np.flatnonzero(np.r_[True, sorted_periods[1:] != sorted_periods[:-1]])
+    sizes = np.diff(np.r_[starts, len(order)])
+    starts = starts[sizes >= 2]
+    leader_idx, runner_idx = order[starts], order[starts + 1]
+
+    leader_val, runner_val = values[leader_idx], values[runner_idx]
+    return pd.DataFrame({
+        period_col: periods[leader_idx],
+        'Leader': entities[leader_idx],
+        'Runner-Up': entities[runner_idx],
+        'Dominance %': _dominance_pct(leader_val, runner_val),
+    })
+
+
+def dominance_tensor(values):
+    """(periods x k x k) dominance % of entity i over entity j from a (periods x k) array.
+
+    Entries are the normalized margin |v_i - v_j| / (v_i + v_j) * 100, NaN where
+    either value is missing.
+    """
+    a, b = values[:, :, None], values[:, None, :]
+    tensor = _dominance_pct(np.fmax(a, b), np.fmin(a, b))
+    tensor[np.isnan(a + b)] = np.nan
+    return tensor
+
+
+def rivalry_dominance(df, col, entities, entity_col='Country', period_col='Year'):
+    """Long-format pairwise dominance (Year, Pair, Dominance %, Leader, Runner-Up).
+
+    Pairs follow itertools.combinations(entities, 2) order; ties go to the first
+    entity of the pair.
+    """
+    entities = list(entities)
+    columns = [period_col, 'Pair', 'Dominance %', 'Leader', 'Runner-Up']
+    sub = df[df[entity_col].isin(entities)]
+    if len(entities) < 2 or sub.empty:
+        return pd.DataFrame(columns=columns)
+
+    # --- Step 1 : Period x Entity pivot as a dense array ---
+    periods, period_pos = np.unique(sub[period_col].to_numpy(), return_inverse=True)
+    entity_pos = pd.Index(entities).get_indexer(sub[entity_col].astype(str))
+    grid = np.full((len(periods), len(entities)), np.nan)
+    grid[period_pos, entity_pos] = sub[col].to_numpy(dtype='float64')
+
+    # --- Step 2 : Dominance tensor, read off the upper triangle ---
+    tensor = dominance_tensor(grid)
+    i, j = np.triu_indices(len(entities), k=1) # <-- same order as combinations()
+    dom = tensor[:, i, j]                        # (periods x pairs)
+    first_leads = grid[:, i] >= grid[:, j]       # argmax of each pair, ties -> first
+    valid = ~np.isnan(dom)
+
+    names = np.array(entities, dtype=object)
+    pair_labels = np.char.add(np.char.add(names[i].astype(str), ' vs '), names[j].astype(str)).astype(object)
+    leader = np.where(first_leads, names[i], names[j])
+    runner = np.where(first_leads, names[j], names[i])
+
+    t, p = np.nonzero(valid)                     # <-- row-major: year, then pair
+    return pd.DataFrame({
+        period_col: periods[t],
+        'Pair': pair_labels[p],
+        'Dominance %': dom[t, p],
+        'Leader': leader[t, p],
+        'Runner-Up': runner[t, p],
+    }, columns=columns)
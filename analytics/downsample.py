@@ -0,0 +1,91 @@
+"""
+Server-side reduction of large strip/scatter charts.
+
+Above a point limit, unflagged rows are binned into a density layer (one WebGL
+marker per occupied bin, sized and shaded by row count). Flagged rows, such as
+below-baseline years or IQR outliers, are always drawn exactly.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+POINT_LIMIT = int(os.environ.get('DASHBOARD_POINT_LIMIT', 20000))
+BINS = 60  # <-- bins per numeric axis
+
+
+def _axis_codes(values, bins):
+    """Bin keys and representative positions for one axis.
+
+    Discrete axes (text, categories, few unique values such as Year) keep their
+    values. Numeric axes are cut into `bins` equal-width bins.
+    """
+    if not pd.api.types.is_numeric_dtype(values) or values.nunique() <= bins:
+        return values.to_numpy(), None
+    v = values.to_numpy(dtype='float64')
+    edges = np.linspace(np.nanmin(v), np.nanmax(v), bins + 1)
+    codes = np.clip(np.digitize(v, edges[1:-1]), 0, bins - 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return codes, centers
+
+
+def bin_points(df, x, y, bins=BINS):
+    """Occupied (x, y) bins of df with their mean position and row count."""
+    x_codes, x_centers = _axis_codes(df[x], bins)
+    y_codes, _ = _axis_codes(df[y], bins)
+    grouped = pd.DataFrame({'xb': x_codes, 'yb': y_codes, 'y': df[y].to_numpy(dtype='float64')})
+    binned = grouped.groupby(['xb', 'yb'], observed=True, sort=False).agg(y=('y', 'mean'), Points=('y', 'size')).reset_index()
+    binned['x'] = x_centers[binned['xb']] if x_centers is not None else binned['xb']
+    return binned[['x', 'y', 'Points']]
+
+
+def needs_reduction(n_rows, limit=None):
+    return n_rows > (POINT_LIMIT if limit is None else limit)
+
+
+def density_figure(df, x, y, keep_mask, color_labels=None, color_map=None, hover_name=None,
+                   hover_cols=(), size=None, size_max=20, bins=BINS):
+    """WebGL figure: binned density for ordinary rows + exact markers for flagged rows."""
+    keep_mask = np.asarray(keep_mask, dtype=bool)
+    exact, rest = df[keep_mask], df[~keep_mask]
+    fig = go.Figure()
+
+    # --- Layer 1 : Density of the unflagged rows ---
+    if not rest.empty:
+        binned = bin_points(rest, x, y, bins)
+        fig.add_trace(go.Scattergl(
+            x=binned['x'], y=binned['y'], mode='markers', name=f'Binned ({len(rest):,} rows)',
+            marker=dict(
+                color=np.log1p(binned['Points']), colorscale='Greys', cmin=0,
+                size=4 + 10 * np.sqrt(binned['Points'] / binned['Points'].max()), opacity=0.6
+            ),
+            customdata=binned['Points'],
+            hovertemplate=f'{x}=%{{x}}<br>{y}≈%{{y:.2f}}<br>%{{customdata:,}} rows<extra></extra>'
+        ))
+
+    # --- Layer 2 : Exact flagged rows ---
+    if exact.empty:
+        return fig
+    labels = color_labels[keep_mask] if color_labels is not None else pd.Series('Flagged', index=exact.index)
+    hover_cols = [c for c in hover_cols if c not in (x, y)]
+    marker_size = None
+    if size is not None:
+        sizes = df[size].to_numpy(dtype='float64')
+        sizeref = 2.0 * np.nanmax(sizes) / (size_max ** 2)  # <-- same scaling as px size_max
+
+    for label in pd.unique(labels):
+        part = exact[(labels == label).to_numpy()]
+        if size is not None:
+            marker_size = dict(size=part[size], sizemode='area', sizeref=sizeref)
+        hover = [f'{c}=%{{customdata[{i}]}}' for i, c in enumerate(hover_cols)]
+        fig.add_trace(go.Scattergl(
+            x=part[x], y=part[y], mode='markers', name=str(label),
+            marker=dict(color=(color_map or {}).get(label), **(marker_size or {})),
+            text=part[hover_name].astype(str) if hover_name else None,
+            customdata=part[hover_cols].to_numpy() if hover_cols else None,
+            hovertemplate='<br>'.join(
+                (['<b>%{text}</b>'] if hover_name else []) + [f'{x}=%{{x}}', f'{y}=%{{y}}'] + hover
+            ) + '<extra></extra>'
+        ))
+    return fig
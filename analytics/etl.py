@@ -0,0 +1,415 @@
+"""
+Incremental ETL: raw Web of Science exports -> data/cleaned_publications.csv
+
+Port of the cleaning cells in Research_Publications_EDA_Analysis.ipynb
+(rename, rounding, ENGLAND -> UNITED KINGDOM, Country x Year aggregation).
+
+Every raw file is one partition. A manifest keeps the content hash of each
+partition and the (Country, Year) groups it feeds, so a refresh only re-reads
+the partitions that touch changed groups and only re-aggregates those groups.
+
+Partitions are streamed in chunks of CHUNK_ROWS rows. Each chunk is cleaned and
+reduced to a mergeable per-group state (sums, mins, and sum + count +
+document-weighted sum for every mean column), so peak memory depends on the
+chunk size and the number of groups, not on the size of the export. A group
+whose rows span several chunks adds its partial sums in a different order, so a
+mean that lands exactly on a .xx5 tie can round the other way than a one-pass read.
+
+The cleaned table keeps that state next to the notebook's columns (e.g.
+'CNCI (sum)', 'CNCI (count)', 'CNCI (doc sum)', 'CNCI (doc weight)'), so
+downstream rollups across partitions, fields or years recombine the raw rows
+instead of averaging averages.
+
+Exports with Category (Web of Science subject category) and/or Doc Type columns
+keep them as extra group keys, so the cleaned table is at Country x Category x
+Doc Type x Year grain and feeds the star-schema layer (analytics.star). Rows of
+an export without such a column, or with it left blank, go to 'Unclassified'.
+
+Usage:
+    python -m analytics.etl                       # incremental refresh
+    python -m analytics.etl --force               # full rebuild
+    python -m analytics.etl --chunk-rows 100000   # smaller read chunks
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+RAW_SOURCES = ['data/publications.csv', 'data/raw/*.csv']  # <-- weekly exports go in data/raw/
+CLEAN_PATH = 'data/cleaned_publications.csv'
+MANIFEST_PATH = 'data/.etl_manifest.json'
+
+GROUP_KEYS = ['Country', 'Year']
+DIMENSION_KEYS = ['Category', 'Doc Type']  # <-- optional Field / Document Type columns of production exports
+UNCLASSIFIED = 'Unclassified'
+OUTPUT_VERSION = 2  # <-- bump when the cleaned-table columns change so old outputs are rebuilt
+CHUNK_ROWS = 250_000  # <-- raw rows held in memory at once while streaming a partition
+
+# 1. Renaming Columns for better readability
+RENAME_MAP = {
+    'Name': 'Country',
+    'Category Normalized Citation Impact': 'CNCI',
+    'Web of Science Documents': 'Documents',
+    'year': 'Year'
+}
+
+# 2. Precision Formatting
+ROUND_MAP = {
+    'Collab-CNCI': 2,
+    'CNCI': 2,
+    '% Docs Cited': 2,
+    '% Documents in Top 1%': 2,
+    '% Documents in Top 10%': 2
+}
+
+# 3. England and UK are recorded separately in the raw export
+COUNTRY_MERGE = {'ENGLAND': 'UNITED KINGDOM'}
+
+# 4. Aggregating Repeated Countries
+# Quantitative columns -> SUM, Quality/Percentage columns -> MEAN, Rank -> MIN
+AGG_RULES = {
+    'Documents': 'sum',
+    'Times Cited': 'sum',
+    'Documents in Top 1%': 'sum',
+    'Documents in Top 10%': 'sum',
+    'CNCI': 'mean',
+    'Collab-CNCI': 'mean',
+    '% Docs Cited': 'mean',
+    '% Documents in Top 1%': 'mean',
+    '% Documents in Top 10%': 'mean',
+    'Rank': 'min'  # <-- rank 1 is better than rank 10
+}
+
+# Mergeable state columns kept for every MEAN column
+MEAN_STATE = {
+    'sum': ' (sum)',          # <-- sum of the non-null values
+    'count': ' (count)',      # <-- number of non-null values
+    'wsum': ' (doc sum)',     # <-- sum of value x Documents
+    'weight': ' (doc weight)' # <-- Documents behind the non-null values
+}
+WEIGHT_COL = 'Documents'
+
+BENCHMARK_BELOW = 'Below Average (< 1.0)'
+BENCHMARK_ABOVE = 'Above Average (>= 1.0)'
+
+
+# -----------------------------------------------------------------------------
+# CLEANING STEPS (same order as the notebook)
+# -----------------------------------------------------------------------------
+def clean_raw(raw_df):
+    """Rename, round and merge countries on a raw export frame."""
+    df = raw_df.rename(columns=RENAME_MAP)
+    df = df.round(ROUND_MAP)
+    df['Country'] = df['Country'].replace(COUNTRY_MERGE)
+    return df
+
+
+def aggregate(clean_df):
+    """Collapse repeated (Country, Year) rows with AGG_RULES."""
+    return finalize(partial_state(clean_df, group_keys(clean_df.columns)))
+
+
+def group_keys(columns):
+    """Country, Year plus the dimension columns present in `columns` (cleaned names)."""
+    return GROUP_KEYS + [key for key in DIMENSION_KEYS if key in columns]
+
+
+# -----------------------------------------------------------------------------
+# MERGEABLE GROUP STATE (what lets partitions be streamed chunk by chunk)
+# -----------------------------------------------------------------------------
+def _state_rules():
+    rules = {}
+    for col, how in AGG_RULES.items():
+        if how == 'mean':
+            rules.update({col + suffix: 'sum' for suffix in MEAN_STATE.values()})
+        else:
+            rules[col] = how  # <-- sums and mins merge as themselves
+    return rules
+
+
+def state_columns():
+    """Mergeable state columns the cleaned table carries for every MEAN column."""
+    return [col + suffix for col, how in AGG_RULES.items() if how == 'mean' for suffix in MEAN_STATE.values()]
+
+
+def partial_state(clean_df, keys=GROUP_KEYS):
+    """Per-group state of cleaned rows; merge_states() combines any number of them."""
+    parts = {key: clean_df[key] for key in keys}
+    weight = clean_df[WEIGHT_COL].astype('float64')
+    for col, how in AGG_RULES.items():
+        values = clean_df[col]
+        if how != 'mean':
+            parts[col] = values
+            continue
+        present = values.notna()
+        parts[col + MEAN_STATE['sum']] = values
+        parts[col + MEAN_STATE['count']] = present.astype('int64')
+        parts[col + MEAN_STATE['wsum']] = values * weight
+        parts[col + MEAN_STATE['weight']] = weight.where(present)
+    return pd.DataFrame(parts).groupby(keys).agg(_state_rules())
+
+
+def merge_states(states):
+    """Combine partial states; the result only grows with the number of groups."""
+    states = [s for s in states if s is not None]
+    if len(states) <= 1:
+        return states[0] if states else None
+    return pd.concat(states).groupby(level=list(states[0].index.names)).agg(_state_rules())
+
+
+def finalize(state):
+    """Group state -> the notebook's cleaned table (simple means, rounded, benchmark label) plus the state."""
+    df_clean = pd.DataFrame(index=state.index)
+    for col, how in AGG_RULES.items():
+        if how == 'mean':
+            count = state[col + MEAN_STATE['count']]
+            df_clean[col] = state[col + MEAN_STATE['sum']] / count.where(count > 0)
+        else:
+            df_clean[col] = state[col]
+    df_clean = df_clean.reset_index().round(2)  # <-- rounding off again after mean calculation
+    df_clean['Benchmark Status'] = np.where(df_clean['CNCI'] < 1.0, BENCHMARK_BELOW, BENCHMARK_ABOVE)
+    for col in state_columns():
+        df_clean[col] = state[col].to_numpy()  # <-- unrounded, so rollups stay exact
+    return df_clean
+
+
+def _raw_columns(keys=GROUP_KEYS):
+    inverse = {new: old for old, new in RENAME_MAP.items()}
+    return {inverse.get(col, col) for col in keys + list(AGG_RULES)}
+
+
+def read_header(path):
+    """Cleaned column names of a raw export; ValueError if a required column is missing."""
+    header = pd.read_csv(path, nrows=0).columns
+    missing = sorted(_raw_columns() - set(header))
+    if missing:
+        raise ValueError(f"{path}: missing required column(s) {', '.join(missing)}")
+    return {RENAME_MAP.get(col, col) for col in header}
+
+
+def source_keys(sources):
+    """Group keys of a set of raw exports: a dimension is kept if any export carries it."""
+    columns = set()
+    for path in sources:
+        columns.update(read_header(path))  # <-- every header is checked before anything is read or written
+    return group_keys(columns)
+
+
+def read_partition(path, chunk_rows=CHUNK_ROWS, keys=GROUP_KEYS):
+    """Stream one raw export in chunks and return its merged group state."""
+    read_header(path)
+    wanted = _raw_columns(keys)
+    state = None
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, usecols=lambda c: c in wanted):
+        chunk = clean_raw(chunk)
+        for key in keys[len(GROUP_KEYS):]:
+            # Missing or blank dimension -> one explicit member (groupby drops NaN keys)
+            chunk[key] = chunk[key].fillna(UNCLASSIFIED).astype(str) if key in chunk else UNCLASSIFIED
+        state = merge_states([state, partial_state(chunk, keys)])
+    return state
+
+
+# -----------------------------------------------------------------------------
+# PARTITION BOOKKEEPING
+# -----------------------------------------------------------------------------
+def list_sources(patterns=None):
+    patterns = RAW_SOURCES if patterns is None else patterns
+    sources = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            if path not in sources:
+                sources.append(path)
+    return sources
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'output': None, 'partitions': {}}
+
+
+def _stat(path):
+    st = os.stat(path)
+    return {'mtime': st.st_mtime_ns, 'size': st.st_size}
+
+
+def _partition_keys(state):
+    if state is None:
+        return []  # <-- header-only export
+    return [[str(c), int(y), *map(str, dims)] for c, y, *dims in state.index]
+
+
+def _key_mask(df, keys, group_cols=GROUP_KEYS):
+    index = pd.MultiIndex.from_frame(df[group_cols])
+    return index.isin([tuple(k) for k in keys])
+
+
+def _read_umask():
+    mask = os.umask(0o022)  # <-- the umask can only be read by setting it
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _read_umask()  # <-- read once at import, before any worker thread writes files
+
+
+def _file_mode(path):
+    """Mode of the file being replaced, or what open() would give a new file."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write(path, write_fn, binary=False):
+    """Write through a temp file in the same directory, then os.replace()."""
+    folder = os.path.dirname(path) or '.'
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', newline='')) as f:
+            write_fn(f)
+        os.chmod(tmp_path, _file_mode(path))  # <-- mkstemp creates 0600 files
+        os.replace(tmp_path, path)  # <-- readers see old or new file, never half of one
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# -----------------------------------------------------------------------------
+# PIPELINE
+# -----------------------------------------------------------------------------
+def run_pipeline(sources=None, out_path=CLEAN_PATH, manifest_path=MANIFEST_PATH, force=False,
+                 chunk_rows=CHUNK_ROWS):
+    """Refresh out_path from the raw sources, recomputing only dirty groups.
+
+    Returns a summary dict (mode, partitions read, groups recomputed).
+    """
+    sources = list_sources(sources)
+    manifest = load_manifest(manifest_path)
+    old_parts = manifest.get('partitions', {})
+
+    if not sources:
+        return {'mode': 'no-sources', 'read': [], 'groups': 0}
+    keys = source_keys(sources)
+
+    # --- Step 1 : Find changed partitions (stat first, hash only if needed) ---
+    changed, new_parts = [], {}
+    for path in sources:
+        stat = _stat(path)
+        old = old_parts.get(path)
+        if old and old['mtime'] == stat['mtime'] and old['size'] == stat['size']:
+            new_parts[path] = old
+            continue
+        digest = file_hash(path)
+        if old and old['sha256'] == digest:
+            new_parts[path] = dict(old, **stat)  # <-- touched but same content
+            continue
+        new_parts[path] = dict(stat, sha256=digest, keys=None)
+        changed.append(path)
+    removed = [p for p in old_parts if p not in new_parts]
+
+    output_ok = (
+        os.path.exists(out_path)
+        and manifest.get('output') is not None
+        and manifest['output'] == _stat(out_path)
+    )
+    full = (
+        force or not output_ok
+        or manifest.get('group_keys', GROUP_KEYS) != keys  # <-- grain changed
+        or manifest.get('output_version') != OUTPUT_VERSION
+    )
+
+    if not full and not changed and not removed:
+        if new_parts != old_parts:
+            _save_manifest(manifest_path, manifest['output'], new_parts, keys)
+        return {'mode': 'up-to-date', 'read': [], 'groups': 0}
+
+    # --- Step 2 : Stream changed partitions into group states and collect dirty groups ---
+    states = {}
+    to_read = sources if full else changed
+    for path in to_read:
+        states[path] = read_partition(path, chunk_rows, keys)
+        new_parts[path]['keys'] = _partition_keys(states[path])
+
+    if full:
+        result = finalize(merge_states(states.values()))
+        dirty = None
+    else:
+        dirty = set()
+        for path in changed:
+            dirty.update(map(tuple, new_parts[path]['keys']))
+            if path in old_parts:
+                dirty.update(map(tuple, old_parts[path]['keys']))
+        for path in removed:
+            dirty.update(map(tuple, old_parts[path]['keys']))
+
+        # Unchanged partitions that also feed a dirty group must be re-read
+        for path in sources:
+            if path in states:
+                continue
+            if any(tuple(k) in dirty for k in new_parts[path]['keys']):
+                states[path] = read_partition(path, chunk_rows, keys)
+
+        merged = merge_states(states.values()) if states else None
+        fresh = finalize(merged[merged.index.isin(list(dirty))]) if merged is not None else None
+
+        # --- Step 3 : Splice fresh groups into the existing output ---
+        existing = pd.read_csv(out_path, dtype={key: str for key in keys[len(GROUP_KEYS):]})
+        kept = existing[~_key_mask(existing, dirty, keys)]
+        result = pd.concat([kept, fresh], ignore_index=True) if fresh is not None else kept
+
+    result = result.sort_values(keys).reset_index(drop=True)
+
+    # --- Step 4 : Atomic write (output first, then manifest) ---
+    atomic_write(out_path, lambda f: result.to_csv(f, index=False))
+    _save_manifest(manifest_path, _stat(out_path), new_parts, keys)
+
+    return {
+        'mode': 'full' if full else 'incremental',
+        'read': list(states),
+        'groups': len(result) if full else len(dirty),
+    }
+
+
+def _save_manifest(path, output_stat, partitions, group_keys=GROUP_KEYS):
+    payload = {'output': output_stat, 'output_version': OUTPUT_VERSION, 'group_keys': group_keys, 'partitions': partitions}
+    atomic_write(path, lambda f: json.dump(payload, f, indent=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh data/cleaned_publications.csv from raw exports.")
+    parser.add_argument('--force', action='store_true', help="Rebuild every group from scratch.")
+    parser.add_argument('--out', default=CLEAN_PATH)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Raw rows read per chunk.")
+    args = parser.parse_args()
+
+    try:
+        summary = run_pipeline(out_path=args.out, force=args.force, chunk_rows=args.chunk_rows)
+    except ValueError as e:
+        raise SystemExit(f"ETL failed, {args.out} left unchanged: {e}")
+    print(f"ETL {summary['mode']}: read {len(summary['read'])} partition(s), {summary['groups']} group(s) recomputed.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+"""
+Plotly figure builders shared by the dashboard and the batch report.
+
+Every function takes already computed frames/values and returns a figure.
+No Streamlit calls and no data access, so the dashboard (app.py) and the
+headless report (analytics.report) draw the same charts from the same results.
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analytics import downsample, resampling
+
+BASELINE_METRICS = ['CNCI', 'Collab-CNCI', '% Documents in Top 1%']  # <-- metrics with a global 1.0 baseline
+OUTLIER_COLORS = {'High Outlier': '#EF553B', 'Low Outlier': '#FFA15A', 'Normal': 'lightgrey'}
+
+
+def benchmark_threshold(col, median):
+    """(threshold, name, label below, label above) of the tab 1 consistency check."""
+    if col in BASELINE_METRICS:
+        return 1.0, "Global Baseline", "Below Baseline (< 1.0)", "Above Baseline (>= 1.0)"
+    return median, "Global Median", f"Below Median (< {median:.2f})", f"Above Median (>= {median:.2f})"
+
+
+def correlation_strength(r_value):
+    """(text, trendline colour) for a Pearson r."""
+    if abs(r_value) >= 0.7:
+        return "Strong Relationship", "green"
+    if abs(r_value) >= 0.4:
+        return "Moderate Relationship", "blue"
+    return "Weak/No Relationship", "red"
+
+
+# -----------------------------------------------------------------------------
+# 1. OVERVIEW
+# -----------------------------------------------------------------------------
+def strip(df, col, status, threshold_val, threshold_name, label_below, label_above, point_limit=None):
+    if downsample.needs_reduction(len(df), point_limit):
+        # Large data: bin the rows above the benchmark, keep the red (below) dots exact
+        fig_strip = downsample.density_figure(
+            df, 'Country', col,
+            keep_mask=status.cat.codes == 0,
+            color_labels=status,
+            color_map={label_below: '#EF553B', label_above: '#636EFA'},
+            hover_name='Country',
+            hover_cols=['Year']
+        )
+        fig_strip.update_layout(
+            title=f'Consistency Check vs {threshold_name}',
+            legend_title_text='Benchmark Status',
+            template='plotly_white'
+        )
+    else:
+        fig_strip = px.strip(
+            df,
+            y=col,
+            x='Country',
+            color=status,
+            color_discrete_map={
+                label_below: '#EF553B',
+                label_above: '#636EFA'
+            },
+            labels={'color': 'Benchmark Status'},
+            hover_data=['Year', col],
+            title=f'Consistency Check vs {threshold_name}',
+            template='plotly_white'
+        )
+
+    fig_strip.add_hline(
+        y=threshold_val,
+        line_dash="dash",
+        line_color="black",
+        annotation_text=f"{threshold_name} ({threshold_val:.2f})"
+    )
+
+    # Increased height slightly for better visibility in full width
+    fig_strip.update_layout(height=550)
+    return fig_strip
+
+
+def pareto(pareto_df, col, label, band=None):
+    fig_pareto = go.Figure()
+    fig_pareto.add_trace(go.Bar(
+        x=pareto_df['Country'], y=pareto_df[col], name='Value', marker_color='#ced4da'
+    ))
+    if band is not None:
+        # Confidence band of the cumulative share held by the top-k entities
+        fig_pareto.add_trace(go.Scatter(
+            x=pareto_df['Country'], y=band['band_high'], yaxis='y2',
+            mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False
+        ))
+        fig_pareto.add_trace(go.Scatter(
+            x=pareto_df['Country'], y=band['band_low'], yaxis='y2', name='Cumulative % (95% CI)',
+            mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(239, 85, 59, 0.2)', hoverinfo='skip'
+        ))
+    fig_pareto.add_trace(go.Scatter(
+        x=pareto_df['Country'], y=pareto_df['Cumulative_Perc'],
+        mode='lines+markers', name='Cumulative %', yaxis='y2', line=dict(color='#ef553b', width=3)
+    ))
+
+    fig_pareto.update_layout(
+        title=f'Lorenz Curve: {label}',
+        yaxis=dict(title=f'Total {label}'),
+        yaxis2=dict(title='Cumulative %', overlaying='y', side='right', range=[0, 110]),
+        hovermode='x unified',
+        height=550, # Increased height
+        showlegend=False
+    )
+
+    fig_pareto.add_hline(y=80, line_dash="dash", line_color="green", yref="y2", annotation_text="80% Threshold")
+    return fig_pareto
+
+
+# -----------------------------------------------------------------------------
+# 2. STRATEGIC POSITIONING
+# -----------------------------------------------------------------------------
+def quadrant(overall_df, x_col, y_col, median_x, median_y, x_label, y_label):
+    # Log Scale only for large numbers
+    log_x_bool = x_col in ['Documents', 'Times Cited']
+    log_y_bool = y_col in ['Documents', 'Times Cited']
+
+    fig_quad = px.scatter(
+        overall_df,
+        x=x_col,
+        y=y_col,
+        size='Documents', # <-- Bubble size to show volume
+        color='Collab-CNCI', # <-- Bubble color to show Collab-CNCI
+        hover_name='Country',
+        hover_data=['Times Cited', 'CNCI'],
+        log_x=log_x_bool,
+        log_y=log_y_bool,
+        color_continuous_scale='Plasma',
+        height=600,
+        text='Country'
+    )
+
+    fig_quad.update_traces(
+            textposition='top center',  # <-- put text on topc
+    )
+
+    # Add Median Lines (Quadrants)
+    fig_quad.add_vline(x=median_x, line_dash="dash", line_color="gray", annotation_text=f"Median {x_col}")
+    fig_quad.add_hline(y=median_y, line_dash="dash", line_color="gray", annotation_text=f"Median {y_col}")
+
+    # Dynamic Quadrant Annotation
+    fig_quad.add_annotation(
+        xref="paper", yref="paper", x=0.98, y=0.98, text="<b>LEADERS</b><br>(High X & High Y)",
+        showarrow=False, font=dict(color="green", size=12), xanchor='right', yanchor='top'
+    )
+    fig_quad.add_annotation(
+        xref="paper", yref="paper", x=0.98, y=0.02, text=f"<b>{x_col} DRIVEN</b><br>(High X / Low Y)",
+        showarrow=False, font=dict(color="orange", size=12), xanchor='right', yanchor='bottom'
+    )
+    fig_quad.add_annotation(
+        xref="paper", yref="paper", x=0.02, y=0.98, text=f"<b>{y_col} DRIVEN</b><br>(Low X / High Y)",
+        showarrow=False, font=dict(color="blue", size=12), xanchor='left', yanchor='top'
+    )
+    fig_quad.add_annotation(
+        xref="paper", yref="paper", x=0.02, y=0.02, text="<b>DEVELOPING</b><br>(Low X & Low Y)",
+        showarrow=False, font=dict(color="grey", size=12), xanchor='left', yanchor='bottom'
+    )
+
+    fig_quad.update_layout(
+        xaxis_title=x_label,
+        yaxis_title=y_label,
+        margin=dict(l=0, r=0, t=40, b=0),
+        coloraxis_colorbar_title_text='Collab<br>Quality',
+        template="plotly_white",
+    )
+    return fig_quad
+
+
+# -----------------------------------------------------------------------------
+# 3. DISTRIBUTION
+# -----------------------------------------------------------------------------
+def histogram(df, col, label, mean_val, median_val):
+    fig_dist = px.histogram(
+        df,
+        x=col,
+        nbins=40,
+        marginal='box',
+        color_discrete_sequence=['#636EFA'],
+        opacity=0.7,
+        title=f"Spread of {label}"
+    )
+
+    # Add Lines
+    fig_dist.add_vline(x=mean_val, line_dash="dash", line_color="red")
+    fig_dist.add_vline(x=median_val, line_dash="dot", line_color="blue")
+
+    # Add Annotations
+    fig_dist.add_annotation(  # <-- Mean Label
+        x=mean_val, y=1.02, yref="paper", text="Mean",
+        showarrow=False, font=dict(color="red")
+    )
+    fig_dist.add_annotation(  # <-- Median Label
+        x=median_val, y=0.95, yref="paper", text="Median",
+        showarrow=False, font=dict(color="blue")
+    )
+
+    # Add Baseline Line only for relevant metrics
+    if col in BASELINE_METRICS:
+        baseline = 1.0
+        fig_dist.add_vline(x=baseline, line_dash="solid", line_color="green")
+        fig_dist.add_annotation(    # <-- Baseline Label
+            x=baseline, y=0.88, yref="paper", text="Global Baseline (1.0)",
+            showarrow=False, font=dict(color="green")
+        )
+
+    fig_dist.update_layout(height=450, xaxis_title=label, yaxis_title='Frequency (Count)', showlegend=False)
+    return fig_dist
+
+
+# -----------------------------------------------------------------------------
+# 4. COMPETITIVE LANDSCAPE
+# -----------------------------------------------------------------------------
+def market(gap_df):
+    fig_gap_line = px.line(gap_df, x='Year', y='Dominance %', markers=True,
+                           hover_data=['Leader', 'Runner-Up'])
+
+    fig_gap_line.update_traces(line=dict(color='crimson', width=3), marker=dict(size=8))
+
+    fig_gap_line.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="No Gap (Equal)") # <-- Reference line
+
+    # Y-axis zero to 100
+    fig_gap_line.update_layout(
+        height=500,
+        template='plotly_white',
+        yaxis_title=f"Normalized Dominance (%)",
+        yaxis=dict(range=[0, 100]) # <--- Locked Range
+    )
+    return fig_gap_line
+
+
+def rivalry(dom_df):
+    fig_dom_trend = px.line(
+        dom_df, x='Year', y='Dominance %', color='Pair', markers=True,
+        hover_data={'Dominance %': ':.1f', 'Leader': True, 'Runner-Up': True},
+        template='plotly_white'
+    )
+    fig_dom_trend.add_hline(y=0, line_dash="dash", line_color="black", annotation_text="Equal Impact (0% Gap)")
+    fig_dom_trend.update_layout(height=450, yaxis_title=f"Normalized Dominance (%)", yaxis=dict(range=[0, 100]))
+    return fig_dom_trend
+
+
+# -----------------------------------------------------------------------------
+# 5. OUTLIERS
+# -----------------------------------------------------------------------------
+def outlier_scatter(df, col, status, lower_bound, upper_bound, global_fences=True, point_limit=None):
+    if downsample.needs_reduction(len(df), point_limit):
+        # Large data: bin the 'Normal' rows, keep every outlier exact
+        fig_out = downsample.density_figure(
+            df, 'Year', col,
+            keep_mask=status != 'Normal',
+            color_labels=status,
+            color_map=OUTLIER_COLORS,
+            hover_name='Country',
+            hover_cols=['Documents'],
+            size='Documents',
+            size_max=20
+        )
+        fig_out.update_layout(legend_title_text='Outlier_Status')
+    else:
+        fig_out = px.scatter(
+            df,
+            x='Year',
+            y=col,
+            color=status,
+            color_discrete_map=OUTLIER_COLORS,
+            labels={'color': 'Outlier_Status'},
+            hover_name='Country',
+            hover_data=['Year', col, 'Documents'],
+            size='Documents', # Bubble size represents Volume context
+            size_max=20
+        )
+
+    # Threshold lines only exist for global fences (grouped fences differ per row)
+    if global_fences:
+        # Add Threshold Line (Upper)
+        fig_out.add_hline(
+            y=upper_bound,
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"Upper Limit ({upper_bound:.2f})",
+            annotation_position="top right"
+        )
+
+        # Add Threshold Line (Lower) - Only if positive
+        if lower_bound > 0:
+            fig_out.add_hline(
+                y=lower_bound,
+                line_dash="dash",
+                line_color="orange",
+                annotation_text=f"Lower Limit ({lower_bound:.2f})",
+                annotation_position="bottom right"
+            )
+
+    fig_out.update_layout(template='plotly_white', height=500)
+    return fig_out
+
+
+# -----------------------------------------------------------------------------
+# 6. CORRELATION
+# -----------------------------------------------------------------------------
+def correlation_scatter(df, x_col, y_col, x_label, y_label, corr, corr_tests, point_limit=None):
+    if downsample.needs_reduction(len(df), point_limit):
+        # Large data: binned density
+        fig_corr = downsample.density_figure(df, x_col, y_col, keep_mask=np.zeros(len(df), dtype=bool))
+        fig_corr.update_layout(xaxis_title=x_label, yaxis_title=y_label)
+    else:
+        fig_corr = px.scatter(
+            df,
+            x=x_col,
+            y=y_col,
+            hover_name='Country',
+            hover_data=['Year'],
+            labels={x_col: x_label, y_col: y_label},
+            opacity=0.65
+        )
+
+        # Customize Markers
+        fig_corr.update_traces(marker=dict(size=10, line=dict(width=1, color='DarkSlateGrey')))
+
+    # OLS trendline from the cached coefficients (no refit per rerun)
+    _, trend_color = correlation_strength(corr['matrices']['pearson'].loc[x_col, y_col])
+    slope = corr['slope'].loc[y_col, x_col]
+    intercept = corr['intercept'].loc[y_col, x_col]
+    x_ends = np.array([df[x_col].min(), df[x_col].max()], dtype='float64')
+    x_grid = np.linspace(x_ends[0], x_ends[1], 50)
+    band_low, band_high = resampling.line_band(corr_tests, y_col, x_col, x_grid)
+    fig_corr.add_trace(go.Scatter(x=x_grid, y=band_high, mode='lines', line=dict(width=0), hoverinfo='skip'))
+    fig_corr.add_trace(go.Scatter(
+        x=x_grid, y=band_low, mode='lines', line=dict(width=0), hoverinfo='skip',
+        fill='tonexty', fillcolor='rgba(128, 128, 128, 0.25)', name='95% CI (Bootstrap)'
+    ))
+    fig_corr.add_trace(go.Scatter(
+        x=x_ends, y=slope * x_ends + intercept, mode='lines', name='OLS trendline',
+        line=dict(color=trend_color, width=3),
+        hovertemplate=f"<b>OLS trendline</b><br>{y_col} = {slope:.4g} * {x_col} + {intercept:.4g}<br>R<sup>2</sup>={corr['r_squared'].loc[y_col, x_col]:.4f}<extra></extra>"
+    ))
+
+    fig_corr.update_layout(height=550, template='plotly_white', showlegend=False)
+    return fig_corr
+
+
+def correlation_matrix(matrix, method_label):
+    fig_matrix = px.imshow(matrix, text_auto='.2f', zmin=-1, zmax=1, color_continuous_scale='RdBu_r', aspect='auto')
+    fig_matrix.update_layout(height=550, template='plotly_white', coloraxis_colorbar_title_text=method_label)
+    return fig_matrix
+
+
+# -----------------------------------------------------------------------------
+# 7. PERFORMANCE TRENDS
+# -----------------------------------------------------------------------------
+def trend(df_visual, col, label):
+    fig_trend = px.line(
+        df_visual,
+        x='Year',
+        y=col,
+        color='Country',
+        markers=True,
+        hover_data=['Documents']
+    )
+    if col in ['CNCI', 'Collab-CNCI']:
+        fig_trend.add_hline(y=1.0, line_dash="dash", line_color="red", annotation_text="Global Baseline (1.0)")
+
+    fig_trend.update_layout(height=500, template='plotly_white', xaxis_title="Year", yaxis_title=label)
+    return fig_trend
+
+
+def rank_history(history_df, country):
+    fig_history = px.line(
+        history_df, x='Year', y='Rank', color='Metric', markers=True,
+        hover_data=['Percentile'], title=f"{country}: Yearly Rank Across Metrics"
+    )
+    fig_history.update_yaxes(autorange="reversed", title="Rank (1 = best)")
+    fig_history.update_layout(height=420, template='plotly_white')
+    return fig_history
+
+
+def overall(leaderboard_df, col, label, fmt):
+    fig_overall = px.bar(
+        leaderboard_df,
+        y='Country',
+        x=col,
+        orientation='h',
+        color='Country',
+        text_auto=fmt,
+    )
+    if col in ['CNCI', 'Collab-CNCI']:
+        fig_overall.add_vline(x=1.0, line_dash="dash", line_color="red", annotation_text="Global Baseline")
+
+    fig_overall.update_layout(height=500, template='plotly_white', xaxis_title=f"Total/Avg {label}", showlegend=False)
+    return fig_overall
+
+
+def choropleth(map_df, col, label, how):
+    fig_map = px.choropleth(
+        map_df,
+        locations="Country",
+        locationmode='country names',
+        color=col,
+        hover_name="Country",
+        color_continuous_scale="Viridis_r" if how == 'mean' else "Plasma", # Different themes for volume/quality
+    )
+
+    fig_map.update_geos(
+        visible=True,
+        resolution=50,
+        showcountries=True, countrycolor="black",
+        showcoastlines=True, coastlinecolor="black",
+        showlakes=False,
+        projection_type="natural earth" # Looks like a 3D-ish flat map
+    )
+
+    fig_map.update_layout(
+        height=600,
+        margin={"r":0,"t":40,"l":0,"b":0},
+        paper_bgcolor="white", # Chart background black
+        font_color="black",    # Text white
+        coloraxis_colorbar=dict(
+            title=f"{label}",
+            tickfont=dict(color="black"),
+            title_font=dict(color="black")
+        )
+    )
+    return fig_map
@@ -0,0 +1,154 @@
+"""
+Size-bounded memoization for per-widget derived results and built figures.
+
+Keys are (dataset version, tab, metric, params). Values are shared between
+reruns and sessions, so callers must treat them as read-only.
+"""
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from analytics import etl
+
+
+def make_key(version, tab, metric, **params):
+    return (version, tab, metric, tuple(sorted(params.items())))
+
+
+def code_digest():
+    """Hash of the analytics sources: results persisted across restarts are keyed on it."""
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.py'))):
+        h.update(etl.file_hash(path).encode())
+    return h.hexdigest()
+
+
+class ComputeCache:
+    """Thread-safe LRU cache with explicit eviction."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_or_compute(self, key, fn, *args, **kwargs):
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)  # <-- most recently used
+                return self._data[key]
+            self.misses += 1
+
+        value = fn(*args, **kwargs)  # <-- computed outside the lock
+        size = self._measure(value)
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)  # <-- computed concurrently by another thread
+            self._insert(key, value, size)
+            while self._data and self._over_budget():
+                self._remove(next(iter(self._data)))  # <-- least recently used
+        return value
+
+    # Storage hooks; subclasses track extra budgets here
+    def _measure(self, value):
+        return 0  # <-- called outside the lock, the others with it held
+
+    def _insert(self, key, value, size):
+        self._data[key] = value
+
+    def _remove(self, key):
+        del self._data[key]
+
+    def _over_budget(self):
+        return len(self._data) > self.max_entries
+
+    def evict(self, version=None, tab=None, metric=None):
+        """Drop entries matching every given key part. Returns the number removed."""
+        with self._lock:
+            doomed = [
+                key for key in self._data
+                if (version is None or key[0] == version)
+                and (tab is None or key[1] == tab)
+                and (metric is None or key[2] == metric)
+            ]
+            for key in doomed:
+                self._remove(key)
+        return len(doomed)
+
+    def retain_version(self, version):
+        """Drop entries computed for any other dataset version."""
+        with self._lock:
+            doomed = [key for key in self._data if key[0] != version]
+            for key in doomed:
+                self._remove(key)
+        return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+            self.hits = self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class FigureCache(ComputeCache):
+    """LRU of built Plotly figures, bounded by the data points their traces carry.
+
+    Figures are cached as objects, not as serialized JSON: st.plotly_chart has
+    no public way to ship a pre-serialized spec and re-serializes whatever it is
+    given. The cache saves building the figure (traces, lines, annotations, geo
+    layout); the JSON encoding still happens once per render.
+    """
+
+    ARRAY_PROPS = ('x', 'y', 'z', 'locations', 'customdata', 'text')
+
+    def __init__(self, max_points=5_000_000, max_entries=512):
+        super().__init__(max_entries)
+        self.max_points = max_points
+        self.points = 0
+        self._sizes = {}
+
+    def _measure(self, value):
+        # Array lengths are read off the traces (no serialization)
+        points = 0
+        for trace in value.data:
+            for prop in self.ARRAY_PROPS:
+                if prop in trace and trace[prop] is not None and np.ndim(trace[prop]) > 0:
+                    points += np.size(trace[prop])
+        return points
+
+    def _insert(self, key, value, size):
+        self._data[key] = value
+        self._sizes[key] = size
+        self.points += size
+
+    def _remove(self, key):
+        del self._data[key]
+        self.points -= self._sizes.pop(key)
+
+    def _over_budget(self):
+        return len(self._data) > self.max_entries or self.points > self.max_points
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(points=self.points, max_points=self.max_points)
+        return stats
@@ -0,0 +1,128 @@
+"""
+Batched outlier detection for tab 5.
+
+One scan computes fences for every requested metric at once:
+
+- method 'iqr': [Q1 - k*IQR, Q3 + k*IQR] (k defaults to 1.5)
+- method 'mad': median +/- k * MAD / 0.6745, i.e. |robust z| > k (k defaults to 3.5)
+
+The fences can be global, per country, per year, or rolling: a centred window
+of calendar years (odd, at least MIN_WINDOW) over each country's own series. Groups smaller than MIN_GROUP rows get no
+fences, and their rows count as Normal.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analytics.derived import outlier_labels
+from analytics.quantiles import window_quantile
+
+METHODS = ['iqr', 'mad']
+SCOPES = ['global', 'country', 'year', 'rolling']
+DEFAULT_K = {'iqr': 1.5, 'mad': 3.5}
+MAD_SCALE = 0.6745  # <-- MAD of a standard normal, makes the robust z comparable to a z-score
+MIN_GROUP = 4
+MIN_WINDOW = 3
+
+
+def _grouped_fences(values, keys, method, k):
+    if keys is None:
+        # Global: one fence pair per column, broadcast to every row
+        if method == 'iqr':
+            q = values.quantile([0.25, 0.75])
+            center_lo, center_hi, spread = q.iloc[0], q.iloc[1], q.iloc[1] - q.iloc[0]
+        else:
+            center_lo = center_hi = values.median()
+            spread = (values - center_lo).abs().median() / MAD_SCALE
+        lower = center_lo - k * spread
+        upper = center_hi + k * spread
+        return (pd.DataFrame(np.broadcast_to(lower.to_numpy(), values.shape), index=values.index, columns=values.columns),
+                pd.DataFrame(np.broadcast_to(upper.to_numpy(), values.shape), index=values.index, columns=values.columns))
+
+    grouped = values.groupby(keys, observed=True, sort=False)
+    if method == 'iqr':
+        q1 = grouped.transform('quantile', 0.25)
+        q3 = grouped.transform('quantile', 0.75)
+        lower, upper = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    else:
+        med = grouped.transform('median')
+        mad = (values - med).abs().groupby(keys, observed=True, sort=False).transform('median') / MAD_SCALE
+        lower, upper = med - k * mad, med + k * mad
+
+    small = grouped.transform('count') < MIN_GROUP
+    return lower.mask(small), upper.mask(small)
+
+
+def _rolling_fences(values, countries, years, method, k, window):
+    if window < MIN_WINDOW or window % 2 == 0:
+        raise ValueError(f"Rolling window must be an odd number of years >= {MIN_WINDOW}: {window}")
+    # Country x year x metric grid; a centred window of `window` calendar years per cell
+    c_codes, _ = pd.factorize(countries)
+    y_codes, year_values = pd.factorize(years, sort=True)
+    grid = np.full((c_codes.max() + 1, len(year_values), values.shape[1]), np.nan)
+    grid[c_codes, y_codes] = values.to_numpy()
+
+    half = window // 2
+    padded = np.pad(grid, ((0, 0), (half, half), (0, 0)), constant_values=np.nan)
+    windows = sliding_window_view(padded, window, axis=1)  # <-- (country, year, metric, window), no copy
+    enough = (~np.isnan(windows)).sum(axis=-1) >= min(window, MIN_GROUP)
+
+    if method == 'iqr':
+        q1, q3 = window_quantile(windows, 0.25), window_quantile(windows, 0.75)
+        lower, upper = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    else:
+        med = window_quantile(windows, 0.5)
+        mad = window_quantile(np.abs(windows - med[..., None]), 0.5) / MAD_SCALE  # <-- deviations from each window's median
+        lower, upper = med - k * mad, med + k * mad
+
+    lower, upper = np.where(enough, lower, np.nan), np.where(enough, upper, np.nan)
+    as_frame = lambda grid_values: pd.DataFrame(grid_values[c_codes, y_codes], index=values.index, columns=values.columns)
+    return as_frame(lower), as_frame(upper)
+
+
+def scan(df, columns, method='iqr', scope='global', k=None, window=7,
+         group_col='Country', period_col='Year'):
+    """Fences and Low/Normal/High labels for every column in one pass.
+
+    Returns {'lower', 'upper'} (row-aligned DataFrames), 'labels' (column ->
+    categorical Series) and 'counts' (outliers per column).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown outlier method: {method}")
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown outlier scope: {scope}")
+    k = DEFAULT_K[method] if k is None else k
+    values = df[list(columns)].astype('float64')
+
+    if scope == 'rolling':
+        lower, upper = _rolling_fences(values, df[group_col], df[period_col], method, k, window)
+    else:
+        keys = {'global': None, 'country': df[group_col], 'year': df[period_col]}[scope]
+        lower, upper = _grouped_fences(values, keys, method, k)
+    return _labelled(df, lower, upper)
+
+
+def from_fences(df, fences):
+    """scan()-shaped result for global fences computed elsewhere (e.g. a SQL backend).
+
+    `fences` is a DataFrame with rows 'lower' / 'upper' and one column per metric.
+    """
+    shape = (len(df), fences.shape[1])
+    lower = pd.DataFrame(np.broadcast_to(fences.loc['lower'].to_numpy(dtype='float64'), shape), index=df.index, columns=fences.columns)
+    upper = pd.DataFrame(np.broadcast_to(fences.loc['upper'].to_numpy(dtype='float64'), shape), index=df.index, columns=fences.columns)
+    return _labelled(df, lower, upper)
+
+
+def _labelled(df, lower, upper):
+    labels = {col: outlier_labels(df[col], lower[col].to_numpy(), upper[col].to_numpy()) for col in lower.columns}
+    counts = pd.Series({col: int((lab != 'Normal').sum()) for col, lab in labels.items()}, name='Outliers')
+    return {'lower': lower, 'upper': upper, 'labels': labels, 'counts': counts}
+
+
+def outlier_rows(df, result, col):
+    """Rows flagged for `col`, with the fences they broke."""
+    flagged = (result['labels'][col] != 'Normal').to_numpy()
+    rows = df.loc[flagged, ['Country', 'Year', col]].copy()
+    rows['Lower Fence'] = result['lower'][col].to_numpy()[flagged]
+    rows['Upper Fence'] = result['upper'][col].to_numpy()[flagged]
+    return rows
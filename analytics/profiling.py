@@ -0,0 +1,94 @@
+"""
+Opt-in hot-path timings for one dashboard rerun.
+
+Enable with the `?profile=1` query parameter or DASHBOARD_PROFILE=1. Timings
+are grouped by kind (load, compute, figure, chart, section). They can be shown
+as a table, written as JSON log lines or exported in the Prometheus text format.
+The Prometheus export uses process-wide totals across reruns.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger('dashboard.profile')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Process-wide totals for the Prometheus export: (name, kind) -> [count, seconds]
+_TOTALS = {}
+_TOTALS_LOCK = threading.Lock()
+
+
+def is_enabled(query_params=None):
+    if os.environ.get('DASHBOARD_PROFILE', '') == '1':
+        return True
+    return query_params is not None and query_params.get('profile') == '1'
+
+
+class RerunProfiler:
+    """Collects (name, kind, ms) records for a single rerun. No-op when disabled."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.records = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def timer(self, name, kind='compute'):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, kind, time.perf_counter() - start)
+
+    def record(self, name, kind, seconds):
+        if not self.enabled:
+            return
+        self.records.append({'name': name, 'kind': kind, 'ms': seconds * 1000})
+        with _TOTALS_LOCK:
+            total = _TOTALS.setdefault((name, kind), [0, 0.0])
+            total[0] += 1
+            total[1] += seconds
+
+    def to_frame(self):
+        frame = pd.DataFrame(self.records, columns=['name', 'kind', 'ms'])
+        return frame.sort_values('ms', ascending=False).reset_index(drop=True)
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def log(self, **context):
+        """Emit one structured (JSON) log line per record."""
+        for rec in self.records:
+            logger.info(json.dumps(dict(context, **rec), ensure_ascii=False))
+
+
+def prometheus_text(prefix='dashboard'):
+    """Cumulative timings of this process in the Prometheus text exposition format."""
+    with _TOTALS_LOCK:
+        items = sorted(_TOTALS.items())
+    lines = [
+        f'# HELP {prefix}_timing_seconds Time spent per dashboard hot path.',
+        f'# TYPE {prefix}_timing_seconds summary',
+    ]
+    for (name, kind), (count, seconds) in items:
+        labels = f'name="{_escape(name)}",kind="{kind}"'
+        lines.append(f'{prefix}_timing_seconds_sum{{{labels}}} {seconds:.6f}')
+        lines.append(f'{prefix}_timing_seconds_count{{{labels}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
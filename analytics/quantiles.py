@@ -0,0 +1,126 @@
+"""
+Quantile engine: exact quantiles from presorted columns.
+
+A SortedColumn keeps one metric sorted once, so any quantile is an index lookup
+and any rank or count above a threshold is a binary search. QuantileIndex holds
+one SortedColumn per metric and per (metric, country), built once per dataset
+version (or cut out of a SliceIndex's presorted orders for a filtered view).
+
+Interpolation matches pandas/numpy 'linear', so results equal Series.quantile().
+"""
+import numpy as np
+import pandas as pd
+
+
+def lerp(a, b, t):
+    # numpy's formulation of linear interpolation (bitwise equal to np.quantile)
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def sorted_quantile(values, q):
+    """Quantile(s) q of an already sorted float array (linear interpolation)."""
+    n = len(values)
+    if n == 0:
+        return np.nan if np.ndim(q) == 0 else np.full(np.shape(q), np.nan)
+    pos = np.asarray(q, dtype='float64') * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    out = lerp(values[lo], values[hi], pos - lo)
+    return float(out) if out.ndim == 0 else out
+
+
+def window_quantile(windows, q):
+    """Quantile q along the last axis of a NaN-padded window array (NaN if empty)."""
+    ordered = np.sort(windows, axis=-1)  # <-- NaNs sort to the end
+    n = (~np.isnan(ordered)).sum(axis=-1)
+    pos = q * np.maximum(n - 1, 0)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+    a = np.take_along_axis(ordered, lo[..., None], axis=-1)[..., 0]
+    b = np.take_along_axis(ordered, hi[..., None], axis=-1)[..., 0]
+    return np.where(n > 0, lerp(a, b, pos - lo), np.nan)
+
+
+class SortedColumn:
+    """One column sorted once: O(1) quantiles, O(log n) ranks."""
+
+    def __init__(self, values=(), presorted=False):
+        v = np.asarray(values, dtype='float64')
+        self.values = v if presorted else np.sort(v[~np.isnan(v)])  # <-- presorted: already sorted, no NaNs
+        self._mean = self.values.mean() if len(self.values) else np.nan
+        self._m2 = ((self.values - self._mean) ** 2).sum() if len(self.values) else 0.0
+
+    def __len__(self):
+        return len(self.values)
+
+    def quantile(self, q):
+        return sorted_quantile(self.values, q)
+
+    def median(self):
+        # Mean of the two middle values for even n, as Series.median() computes it
+        n = len(self)
+        if n == 0:
+            return np.nan
+        mid = n // 2
+        return float(self.values[mid]) if n % 2 else float((self.values[mid - 1] + self.values[mid]) / 2)
+
+    def count_below(self, threshold):
+        return int(np.searchsorted(self.values, threshold, side='left'))
+
+    def count_above(self, threshold):
+        return len(self) - int(np.searchsorted(self.values, threshold, side='right'))
+
+    def describe(self):
+        """Same rows as Series.describe() on the column."""
+        n = len(self)
+        q1, q2, q3 = self.quantile([0.25, 0.5, 0.75]) if n else (np.nan,) * 3
+        return pd.Series({
+            'count': float(n),
+            'mean': self._mean,
+            'std': np.sqrt(self._m2 / (n - 1)) if n > 1 else np.nan,
+            'min': self.values[0] if n else np.nan,
+            '25%': q1,
+            '50%': q2,
+            '75%': q3,
+            'max': self.values[-1] if n else np.nan,
+        })
+
+
+class QuantileIndex:
+    """SortedColumns per metric and per (metric, group), built in one pass per metric."""
+
+    def __init__(self, df, columns, group_col='Country'):
+        self.columns = [col for col in columns if col in df.columns]
+        self.group_col = group_col
+        groups = df[group_col].astype(str).to_numpy()
+        order = np.argsort(groups, kind='stable')  # <-- one group sort shared by all metrics
+        keys, starts = np.unique(groups[order], return_index=True)
+        self.overall, self.groups = {}, {}
+        for col in self.columns:
+            values = df[col].to_numpy(dtype='float64')
+            self.overall[col] = SortedColumn(values)
+            self.groups[col] = {key: SortedColumn(part) for key, part in zip(keys, np.split(values[order], starts[1:]))}
+
+    @classmethod
+    def from_sorted(cls, overall, groups, group_col='Country'):
+        """Index over SortedColumns that already exist (e.g. a slice of a presorted layout)."""
+        index = cls.__new__(cls)
+        index.columns = list(overall)
+        index.group_col = group_col
+        index.overall = overall
+        index.groups = groups
+        return index
+
+    def column(self, col):
+        return self.overall[col]
+
+    def quantile(self, col, q):
+        return self.overall[col].quantile(q)
+
+    def group_counts_above(self, col, threshold):
+        """Rows above threshold per group (binary search per group), largest first."""
+        counts = {key: sc.count_above(threshold) for key, sc in self.groups[col].items()}
+        counts = pd.Series(counts, dtype='int64')
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
@@ -0,0 +1,88 @@
+"""
+Precomputed per-year country rankings for every metric.
+
+RankTensor stores arrays shaped (metric, year, country):
+- rank: dense rank within the year, 1 = best (int16, 0 = no data that year)
+- change: rank gained since the previous year (int16, positive = climbed)
+- percentile: share of that year's countries at or below the value (float32)
+
+They are built with one groupby('Year').rank() over all metrics. Leaderboards,
+climbers and rank histories are then array lookups instead of per-query sorts.
+"""
+import numpy as np
+import pandas as pd
+
+
+class RankTensor:
+
+    def __init__(self, df, metrics, entity_col='Country', period_col='Year'):
+        self.metrics = [m for m in metrics if m in df.columns]
+        c_codes, countries = pd.factorize(df[entity_col].astype(str), sort=True)
+        y_codes, years = pd.factorize(df[period_col], sort=True)
+        self.countries = pd.Index(countries, name=entity_col)
+        self.years = np.asarray(years)
+        shape = (len(self.metrics), len(self.years), len(self.countries))
+
+        by_year = df.groupby(period_col, observed=True)[self.metrics]
+        dense = by_year.rank(method='dense', ascending=False).fillna(0).to_numpy(dtype='int16')
+        pct = (by_year.rank(method='max', pct=True) * 100).to_numpy(dtype='float32')
+
+        self.rank = np.zeros(shape, dtype='int16')
+        self.rank[:, y_codes, c_codes] = dense.T
+        self.percentile = np.full(shape, np.nan, dtype='float32')
+        self.percentile[:, y_codes, c_codes] = pct.T
+        self.dtypes = df[self.metrics].dtypes
+        self.values = np.full(shape, np.nan)
+        self.values[:, y_codes, c_codes] = df[self.metrics].to_numpy(dtype='float64').T
+
+        # Year-over-year change; 0 where either year is missing
+        prev, cur = self.rank[:, :-1, :], self.rank[:, 1:, :]
+        self.change = np.zeros(shape, dtype='int16')
+        self.change[:, 1:, :] = np.where((prev > 0) & (cur > 0), prev - cur, 0)
+        self.has_prev = np.zeros(shape, dtype=bool)
+        self.has_prev[:, 1:, :] = (prev > 0) & (cur > 0)
+
+    def _idx(self, metric, year):
+        return self.metrics.index(metric), int(np.searchsorted(self.years, year))
+
+    def top_k(self, metric, year, k=10):
+        """Best k countries of `year` by `metric` (ties keep country order, like nlargest)."""
+        m, y = self._idx(metric, year)
+        ranks = self.rank[m, y]
+        present = np.flatnonzero(ranks > 0)
+        order = present[np.argsort(ranks[present], kind='stable')][:k]
+        return pd.DataFrame({
+            'Country': self.countries[order],
+            metric: self.values[m, y, order].astype(self.dtypes[metric]),
+            'Rank': ranks[order],
+            'Rank Change': np.where(self.has_prev[m, y, order], self.change[m, y, order], np.nan),
+            'Percentile': self.percentile[m, y, order],
+        })
+
+    def climbers(self, metric, year, k=5, ascending=False):
+        """Largest rank gains into `year` (ascending=True for the biggest fallers)."""
+        m, y = self._idx(metric, year)
+        movers = np.flatnonzero(self.has_prev[m, y])
+        change = self.change[m, y, movers].astype('int32')
+        order = movers[np.lexsort((self.rank[m, y, movers], change if ascending else -change))][:k]
+        return pd.DataFrame({
+            'Country': self.countries[order],
+            'Previous Rank': self.rank[m, y - 1, order],
+            'Rank': self.rank[m, y, order],
+            'Rank Change': self.change[m, y, order],
+        })
+
+    def history(self, country, metrics=None):
+        """Long frame (Year, Metric, Rank, Percentile) of one country's ranks across metrics."""
+        c = self.countries.get_loc(country)
+        frames = []
+        for metric in metrics or self.metrics:
+            m = self.metrics.index(metric)
+            present = self.rank[m, :, c] > 0
+            frames.append(pd.DataFrame({
+                'Year': self.years[present],
+                'Metric': metric,
+                'Rank': self.rank[m, present, c],
+                'Percentile': self.percentile[m, present, c],
+            }))
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,402 @@
+"""
+Headless batch report: every dashboard view x selector option as static files.
+
+Reuses the dashboard's compute functions and figure builders (analytics.figures)
+without Streamlit. Each (view, option) job writes an HTML chart, a PNG when
+kaleido is installed, and the CSV tables behind it. An option is one setting of
+the view's selectors: the metric, plus the quadrant axis pair and averaging
+(tab 2), the outlier method, scope and rolling window (tab 5) and the
+correlation axis pair (tab 6). Year selectors become one table over every year.
+Free country picks are rendered at the dashboard's default (tab 4 rivalry:
+USA vs INDIA, tab 7 trend: the metric's top 10). Per-country rank history and
+the sidebar Field / year / country filters are not rendered: the report covers
+the unfiltered 'All' data. Jobs run on a process pool;
+every worker loads the data once in the pool initializer.
+
+Output names are content addressed: the stem hashes the dataset version, the
+view, the option and the analytics source code. A job whose stem is already
+complete (its .json marker exists) is skipped, so a nightly run only renders
+what changed. index.html and manifest.json list the current files.
+
+Usage:
+    python -m analytics.report                        # -> reports/
+    python -m analytics.report --out site --jobs 4
+    python -m analytics.report --prune                # also delete outputs of older versions
+"""
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import plotly.offline
+
+from analytics import aggregates, compute, correlation, derived, dominance, etl, figures, memo, outliers, quantiles, ranks, resampling, star, store
+
+try:
+    import kaleido  # noqa: F401  (plotly's static image engine)
+except ImportError:
+    kaleido = None  # <-- HTML + CSV only
+
+REPORT_DIR = 'reports'
+RESAMPLES = 2000  # <-- same replicate counts as the dashboard, so bands match it
+CORR_BOOTSTRAPS = 1000
+
+METRICS = aggregates.METRIC_LABELS
+CORR_METRICS = {**METRICS, '% Documents in Top 10%': "% Top 10% Documents"}
+CORR_METHODS = {'pearson': "Pearson", 'spearman': "Spearman", 'kendall': "Kendall"}
+QUADRANT_AVERAGES = {'mean': "Simple Mean", 'wmean': "Document-Weighted Mean"}
+RIVALRY_DEFAULTS = ['USA', 'INDIA']  # <-- tab 4's preselected countries
+ROLLING_WINDOWS = range(3, 12, 2)  # <-- tab 5's rolling-window slider
+
+_WORKER = {}
+
+
+# -----------------------------------------------------------------------------
+# WORKER STATE (data loaded once per process)
+# -----------------------------------------------------------------------------
+def _init_worker():
+    frame = star.StarSchema(store.load_facts()).frame()  # <-- same Country x Year frame as the dashboard
+    _WORKER.clear()
+    _WORKER.update(
+        frame=frame,
+        cube=aggregates.build_country_cube(frame),
+        qindex=quantiles.QuantileIndex(frame, [c for c in aggregates.METRIC_COLUMNS if c in frame.columns]),
+        ranks=ranks.RankTensor(frame, aggregates.METRIC_COLUMNS),
+    )
+
+
+def _shared(name, fn, *args, **kwargs):
+    # Results several jobs need (correlation suite, permutation tests): once per worker
+    if name not in _WORKER:
+        _WORKER[name] = fn(*args, **kwargs)
+    return _WORKER[name]
+
+
+def _correlations(df):
+    columns = [c for c in CORR_METRICS if c in df.columns]
+    corr = _shared('corr', correlation.correlation_suite, df, columns, n_boot=CORR_BOOTSTRAPS)
+    tests = _shared('corr_tests', resampling.correlation_resampling, df, columns,
+                    n_perm=RESAMPLES, n_boot=CORR_BOOTSTRAPS, n_jobs=1)
+    return corr, tests
+
+
+# -----------------------------------------------------------------------------
+# VIEWS: (figure, {table name: DataFrame}) for one option
+# -----------------------------------------------------------------------------
+def view_strip(col):
+    df, qindex = _WORKER['frame'], _WORKER['qindex']
+    threshold_val, threshold_name, label_below, label_above = figures.benchmark_threshold(col, qindex.column(col).median())
+    status = derived.threshold_labels(df[col], threshold_val, label_below, label_above)
+    fig = figures.strip(df, col, status, threshold_val, threshold_name, label_below, label_above)
+    below = df.loc[status.cat.codes.to_numpy() == 0, ['Country', 'Year', col]]
+    return fig, {'below': below.sort_values(['Country', 'Year'])}
+
+
+def view_pareto(col):
+    df = _WORKER['frame']
+    pareto_df, cutoff_perc = aggregates.pareto_table(_WORKER['cube'], col)
+    band = resampling.pareto_bootstrap(df, col, n_reps=RESAMPLES, n_jobs=1)
+    summary = pd.DataFrame([{
+        'Entities for 80% (%)': cutoff_perc, 'CI Low (%)': band['cutoff_low'], 'CI High (%)': band['cutoff_high'],
+    }])
+    return figures.pareto(pareto_df, col, METRICS[col], band=band), {'pareto': pareto_df, 'cutoff': summary}
+
+
+def view_quadrant(x_col, y_col, averages):
+    rules = aggregates.quadrant_rules(averages)  # <-- same rules as tab 2
+    overall_df = aggregates.country_frame(_WORKER['cube'], rules)
+    median_x, median_y = compute.quadrant_medians(overall_df, x_col, y_col)
+    fig = figures.quadrant(overall_df, x_col, y_col, median_x, median_y, METRICS[x_col], METRICS[y_col])
+    return fig, {'countries': overall_df}
+
+
+def view_histogram(col):
+    df = _WORKER['frame']
+    dist = compute.distribution_summary(df, col, _WORKER['qindex'])
+    fig = figures.histogram(df, col, METRICS[col], dist['mean'], dist['median'])
+    return fig, {'stats': dist['stats'], 'consistent': dist['consistent'], 'peaks': dist['peaks']}
+
+
+def view_market(col):
+    gap_df = dominance.market_dominance(_WORKER['frame'], col)
+    return figures.market(gap_df), {'dominance': gap_df}
+
+
+def view_rivalry(col):
+    # Pairwise dominance of the countries the dashboard preselects
+    df = _WORKER['frame']
+    available = sorted(df['Country'].astype(str).unique())
+    countries = [c for c in RIVALRY_DEFAULTS if c in available]
+    if len(countries) < 2:
+        countries = available[:3]  # <-- same fallback as tab 4
+    dom_df = dominance.rivalry_dominance(df, col, countries)
+    return figures.rivalry(dom_df), {'dominance': dom_df}
+
+
+def view_outliers(col, method, scope, window):
+    # One batched scan per (method, scope, window) and worker, like tab 5's memoized scan
+    df = _WORKER['frame']
+    scan = _shared(f'outlier_scan:{method}:{scope}:{window}', outliers.scan, df, [c for c in METRICS if c in df.columns],
+                   method=method, scope=scope, window=window)
+    global_fences = scope == 'global'
+    fig = figures.outlier_scatter(df, col, scan['labels'][col], scan['lower'][col].iloc[0], scan['upper'][col].iloc[0],
+                                  global_fences=global_fences)
+    columns = ['Country', 'Year', col] + ([] if global_fences else ['Lower Fence', 'Upper Fence'])
+    rows = outliers.outlier_rows(df, scan, col)[columns]
+    return fig, {'outliers': rows.sort_values(col, ascending=False), 'counts': scan['counts']}
+
+
+def view_correlation(col, y_col):
+    df = _WORKER['frame']
+    corr, tests = _correlations(df)
+    fig = figures.correlation_scatter(df, col, y_col, CORR_METRICS[col], CORR_METRICS[y_col], corr, tests)
+    pair = pd.DataFrame([{
+        'Method': CORR_METHODS[m],
+        'r': corr['matrices'][m].loc[col, y_col],
+        'p-value': corr['pvalues'][m].loc[col, y_col],
+        'CI Low': corr['ci_low'][m].loc[col, y_col] if m in corr['ci_low'] else None,  # <-- no bootstrap CI for Kendall
+        'CI High': corr['ci_high'][m].loc[col, y_col] if m in corr['ci_high'] else None,
+    } for m in CORR_METHODS])
+    pair.loc[pair['Method'] == 'Pearson', 'p-value (Permutation)'] = tests['perm_pvalues'].loc[col, y_col]
+    return fig, {'pair': pair}
+
+
+def view_matrix(method):
+    corr, _ = _correlations(_WORKER['frame'])
+    matrix = corr['matrices'][method].rename(index=CORR_METRICS, columns=CORR_METRICS)
+    return figures.correlation_matrix(matrix, CORR_METHODS[method]), {'matrix': matrix}
+
+
+def view_trend(col):
+    df, rank_tensor = _WORKER['frame'], _WORKER['ranks']
+    top = aggregates.leaderboard(_WORKER['cube'], col, top=10)['Country'].astype(str).tolist()
+    fig = figures.trend(df[df['Country'].astype(str).isin(top)], col, METRICS[col])
+    # Every option of the tab's year selector: yearly top 10 and biggest climbers
+    years = [int(year) for year in rank_tensor.years]
+    top10 = pd.concat([rank_tensor.top_k(col, year, k=10).assign(Year=year) for year in years], ignore_index=True)
+    climbers = pd.concat([rank_tensor.climbers(col, year, k=5).assign(Year=year) for year in years[1:]], ignore_index=True)
+    return fig, {'top10_by_year': top10, 'climbers_by_year': climbers}
+
+
+def view_overall(col):
+    df, cube = _WORKER['frame'], _WORKER['cube']
+    how = aggregates.default_agg(col)
+    top = aggregates.leaderboard(cube, col, how, top=10)
+    fig = figures.overall(top.iloc[::-1], col, METRICS[col], '.2s' if how == 'sum' else '.2f')
+    rank_ci = resampling.rank_bootstrap(df, col, how=how, n_reps=RESAMPLES, n_jobs=1)
+    table = top.join(rank_ci, on='Country')  # <-- bootstrap rank interval of each position
+    return fig, {'leaderboard': table}
+
+
+def view_choropleth(col):
+    how = aggregates.default_agg(col)
+    map_df = aggregates.leaderboard(_WORKER['cube'], col, how)
+    return figures.choropleth(map_df, col, METRICS[col], how), {'countries': map_df}
+
+
+# -----------------------------------------------------------------------------
+# OPTIONS: {option name: view keyword arguments}, one job per option
+# -----------------------------------------------------------------------------
+def per_metric(labels, name='col'):
+    return {key: {name: key} for key in labels}
+
+
+def axis_pairs(labels, x='col', y='y_col'):
+    return {f"{x_col} vs {y_col}": {x: x_col, y: y_col} for x_col in labels for y_col in labels if x_col != y_col}
+
+
+def quadrant_options():
+    # Tab 2: every X / Y axis pair, with simple and document-weighted averages
+    return {f"{name}, {QUADRANT_AVERAGES[averages]}": dict(axes, averages=averages)
+            for name, axes in axis_pairs(METRICS, 'x_col', 'y_col').items() for averages in QUADRANT_AVERAGES}
+
+
+def outlier_options():
+    # Tab 5: every metric x method x scope, and every rolling window of the slider
+    scopes = [(scope, 7) for scope in outliers.SCOPES if scope != 'rolling']  # <-- window only matters when rolling
+    scopes += [('rolling', window) for window in ROLLING_WINDOWS]
+    return {
+        f"{col}, {method}, {scope}" + (f" {window}y" if scope == 'rolling' else ''): {'col': col, 'method': method, 'scope': scope, 'window': window}
+        for col in METRICS for method in outliers.METHODS for scope, window in scopes
+    }
+
+
+VIEWS = {
+    'tab1.strip': (view_strip, per_metric(METRICS)),
+    'tab1.pareto': (view_pareto, per_metric(METRICS)),
+    'tab2.quadrant': (view_quadrant, quadrant_options()),
+    'tab3.histogram': (view_histogram, per_metric(METRICS)),
+    'tab4.market': (view_market, per_metric(METRICS)),
+    'tab4.rivalry': (view_rivalry, per_metric(METRICS)),
+    'tab5.outliers': (view_outliers, outlier_options()),
+    'tab6.scatter': (view_correlation, axis_pairs(CORR_METRICS)),
+    'tab6.matrix': (view_matrix, per_metric(CORR_METHODS, 'method')),
+    'tab7.trend': (view_trend, per_metric(METRICS)),
+    'tab7.overall': (view_overall, per_metric(METRICS)),
+    'tab7.choropleth': (view_choropleth, per_metric(METRICS)),
+}
+
+
+# -----------------------------------------------------------------------------
+# JOBS
+# -----------------------------------------------------------------------------
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def output_stem(version, code, view, option, png):
+    digest = hashlib.sha256(json.dumps([version, code, view, option, png]).encode()).hexdigest()[:16]
+    return f"{view}--{slug(option)}-{digest}"
+
+
+def render(out_dir, stem, view, option, png):
+    """Run one view and write its files. The .json marker is written last (= job complete)."""
+    if not _WORKER:
+        _init_worker()
+    fn, options = VIEWS[view]
+    fig, tables = fn(**options[option])
+
+    files = [f"{stem}.html"]
+    page = fig.to_html(include_plotlyjs='directory', full_html=True)  # <-- one shared plotly.min.js
+    etl.atomic_write(os.path.join(out_dir, files[0]), lambda f: f.write(page.encode('utf-8')), binary=True)
+    if png:
+        image = fig.to_image(format='png', width=1200, height=fig.layout.height or 600)
+        files.append(f"{stem}.png")
+        etl.atomic_write(os.path.join(out_dir, files[-1]), lambda f: f.write(image), binary=True)
+    for name, table in tables.items():
+        files.append(f"{stem}--{slug(name)}.csv")
+        keep_index = not isinstance(table.index, pd.RangeIndex)
+        etl.atomic_write(os.path.join(out_dir, files[-1]), lambda f: table.to_csv(f, index=keep_index))
+
+    entry = {'view': view, 'option': option, 'stem': stem, 'files': files}
+    etl.atomic_write(os.path.join(out_dir, f"{stem}.json"), lambda f: json.dump(entry, f, indent=1))
+    return entry
+
+
+def _load_entry(out_dir, stem):
+    try:
+        with open(os.path.join(out_dir, f"{stem}.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _load_manifest(out_dir, version):
+    try:
+        with open(os.path.join(out_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    return manifest['entries'] if manifest.get('version') == version else []
+
+
+def write_index(out_dir, entries, version):
+    sections = []
+    for view in VIEWS:
+        links = []
+        for entry in (e for e in entries if e['view'] == view):
+            label = CORR_METHODS.get(entry['option']) or METRICS.get(entry['option'], entry['option'])
+            files = ' · '.join(f'<a href="{html.escape(name)}">{html.escape(name.rsplit(".", 1)[-1])}</a>' for name in entry['files'])
+            links.append(f"<li><b>{html.escape(label)}</b>: {files}</li>")
+        sections.append(f"<h2>{html.escape(view)}</h2><ul>{''.join(links)}</ul>")
+    page = (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Research Analytics Report</title></head>"
+            f"<body><h1>Global Research Performance Analytics</h1><p>Dataset version {html.escape(str(version))}</p>"
+            f"{''.join(sections)}</body></html>")
+    etl.atomic_write(os.path.join(out_dir, 'index.html'), lambda f: f.write(page.encode('utf-8')), binary=True)
+    etl.atomic_write(os.path.join(out_dir, 'manifest.json'), lambda f: json.dump({'version': version, 'entries': entries}, f, indent=1))
+
+
+def prune(out_dir, entries):
+    """Delete files of the listed views that no current entry refers to (older dataset versions or code)."""
+    keep, views = set(), {entry['view'] for entry in entries}
+    for entry in entries:
+        keep.update(entry['files'], [f"{entry['stem']}.json"])
+    removed = 0
+    for name in os.listdir(out_dir):
+        if name.split('--', 1)[0] in views and name not in keep:
+            os.remove(os.path.join(out_dir, name))
+            removed += 1
+    return removed
+
+
+def run_report(out_dir=REPORT_DIR, views=None, n_jobs=None, png=None, refresh=True, progress=None):
+    """Render every (view, option) whose content-addressed output is missing; returns a summary."""
+    if refresh:
+        etl.run_pipeline()  # <-- same refresh as the dashboard's startup
+    version = store.ensure_store()['version']
+    code = memo.code_digest()  # <-- a code change re-renders everything
+    png = kaleido is not None if png is None else png
+    os.makedirs(out_dir, exist_ok=True)
+    bundle = os.path.join(out_dir, 'plotly.min.js')
+    if not os.path.exists(bundle):
+        etl.atomic_write(bundle, lambda f: f.write(plotly.offline.get_plotlyjs().encode('utf-8')), binary=True)
+
+    jobs, entries = [], {}
+    for view in views or VIEWS:
+        for option in VIEWS[view][1]:
+            stem = output_stem(version, code, view, option, png)
+            entry = _load_entry(out_dir, stem)
+            if entry is None:
+                jobs.append((stem, view, option))
+            else:
+                entries[stem] = entry  # <-- inputs unchanged: keep the existing files
+
+    skipped = len(entries)
+    n_jobs = int(os.environ.get('DASHBOARD_REPORT_JOBS', os.cpu_count() or 1)) if n_jobs is None else n_jobs
+    if n_jobs <= 1 or len(jobs) <= 1:
+        for stem, view, option in jobs:
+            entries[stem] = render(out_dir, stem, view, option, png)
+            if progress:
+                progress(len(entries) - skipped, len(jobs))
+    else:
+        # Same start method rule as analytics.resampling: never fork a multi-threaded parent
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(jobs)), mp_context=context, initializer=_init_worker) as pool:
+            futures = [pool.submit(render, out_dir, stem, view, option, png) for stem, view, option in jobs]
+            for future in as_completed(futures):
+                entry = future.result()
+                entries[entry['stem']] = entry
+                if progress:
+                    progress(len(entries) - skipped, len(jobs))
+
+    # A partial run (--views) keeps the other views' current entries in the index
+    for entry in _load_manifest(out_dir, version):
+        current = entry['view'] in VIEWS and entry.get('option') in VIEWS[entry['view']][1]  # <-- not an option an older code offered
+        if entry['view'] not in (views or VIEWS) and current and _load_entry(out_dir, entry['stem']) is not None:
+            entries[entry['stem']] = entry
+
+    ordered = sorted(entries.values(), key=lambda e: (list(VIEWS).index(e['view']), list(VIEWS[e['view']][1]).index(e['option'])))
+    write_index(out_dir, ordered, version)
+    return {'version': version, 'rendered': len(jobs), 'skipped': skipped, 'png': png, 'entries': ordered}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render every dashboard view x selector option as static HTML/PNG + CSV.")
+    parser.add_argument('--out', default=REPORT_DIR)
+    parser.add_argument('--views', nargs='+', choices=list(VIEWS), help="Only render these views (e.g. tab1.pareto tab7.choropleth).")
+    parser.add_argument('--jobs', type=int, help="Worker processes (default: DASHBOARD_REPORT_JOBS or all cores).")
+    parser.add_argument('--no-png', action='store_true', help="Skip PNGs even when kaleido is installed.")
+    parser.add_argument('--no-refresh', action='store_true', help="Do not run the ETL refresh first.")
+    parser.add_argument('--prune', action='store_true', help="Delete outputs of older dataset versions / code.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = run_report(
+        out_dir=args.out, views=args.views, n_jobs=args.jobs,
+        png=False if args.no_png else None, refresh=not args.no_refresh
+    )
+    removed = prune(args.out, summary['entries']) if args.prune else 0
+    print(f"Report {summary['version']}: {summary['rendered']} rendered, {summary['skipped']} up to date, "
+          f"{removed} pruned in {time.perf_counter() - start:.1f}s -> {os.path.join(args.out, 'index.html')}"
+          + ("" if summary['png'] else " (no PNG: install kaleido)"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Bootstrap and permutation replicates for the dashboard's headline claims.
+
+Replicates run in chunks. Each chunk draws from its own child of one
+SeedSequence, so results depend only on `seed` and not on how many workers ran
+them. Large jobs go to a process pool (workers receive the data once via the
+pool initializer); small ones run in-process. `progress(done, total)`
+is called as chunks finish.
+
+Resampling units:
+- Pareto cutoff and country ranks: bootstrap over years. Country totals vary
+  with which years are observed.
+- Correlations: row permutations (null of no association) and row bootstrap
+  (OLS line bands).
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+PARALLEL_MIN_WORK = 50_000_000  # <-- replicate x cell count below which a pool costs more than it saves
+CHUNK_SIZE = 250
+PERM_BATCH_CELLS = 262_144  # <-- permuted values gathered per batch (2 MiB of float64, stays in cache)
+
+_WORKER = {}
+
+
+def resample_counts(rng, size, n):
+    """Multinomial bootstrap as counts: how often each of n units is drawn in each of `size` resamples."""
+    idx = rng.integers(n, size=(size, n)) + (np.arange(size) * n)[:, None]
+    return np.bincount(idx.ravel(), minlength=size * n).reshape(size, n).astype('float64')
+
+
+def _default_jobs():
+    return int(os.environ.get('DASHBOARD_RESAMPLE_JOBS', os.cpu_count() or 1))
+
+
+def _init_worker(kernel, data):
+    _WORKER['kernel'], _WORKER['data'] = kernel, data
+
+
+def _run_chunk(size, seed_seq):
+    return _WORKER['kernel'](_WORKER['data'], size, np.random.default_rng(seed_seq))
+
+
+def run_replicates(kernel, data, n_reps, work, seed=0, n_jobs=None, progress=None):
+    """kernel(data, size, rng) -> (size, ...) array, run over n_reps replicates in seeded chunks."""
+    sizes = [min(CHUNK_SIZE, n_reps - start) for start in range(0, n_reps, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    n_jobs = _default_jobs() if n_jobs is None else n_jobs
+    results = [None] * len(sizes)
+    done = 0
+
+    if n_jobs <= 1 or len(sizes) == 1 or work < PARALLEL_MIN_WORK:
+        for i, (size, seed_seq) in enumerate(zip(sizes, seeds)):
+            results[i] = kernel(data, size, np.random.default_rng(seed_seq))
+            done += size
+            if progress:
+                progress(done, n_reps)
+        return np.concatenate(results)
+
+    # Never fork the multi-threaded Streamlit server itself; forkserver also skips re-running __main__
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(sizes)), mp_context=context,
+                             initializer=_init_worker, initargs=(kernel, data)) as pool:
+        futures = {pool.submit(_run_chunk, size, seed_seq): i for i, (size, seed_seq) in enumerate(zip(sizes, seeds))}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            done += sizes[i]
+            if progress:
+                progress(done, n_reps)
+    return np.concatenate(results)
+
+
+# -----------------------------------------------------------------------------
+# KERNELS (module level so spawned workers can unpickle them)
+# -----------------------------------------------------------------------------
+def _pareto_kernel(data, size, rng):
+    # Columns: [cutoff %, cumulative share held by the top 1..C countries]
+    weights = resample_counts(rng, size, data['sums'].shape[1])
+    totals = weights @ data['sums'].T
+    ordered = -np.sort(-totals, axis=1)
+    cum = np.cumsum(ordered, axis=1) / ordered.sum(axis=1, keepdims=True) * 100
+    n_countries = cum.shape[1]
+    cutoff = (np.argmax(cum >= data['share'], axis=1) + 1) / n_countries * 100
+    return np.column_stack([cutoff, cum])
+
+
+def _rank_kernel(data, size, rng):
+    weights = resample_counts(rng, size, data['sums'].shape[1])
+    values = weights @ data['sums'].T
+    if data['how'] == 'mean':
+        counts = weights @ data['present'].T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = values / counts
+    values = np.where(np.isnan(values), -np.inf, values)
+    order = np.argsort(-values, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, values.shape[1] + 1)[None, :], axis=1)
+    return ranks.astype(np.int16)
+
+
+def _permutation_kernel(data, size, rng):
+    # Correlation of every column with every row-permuted column (null distribution)
+    Z = data['z']
+    n, m = Z.shape
+    step = max(1, PERM_BATCH_CELLS // Z.size)  # <-- replicates whose permuted copies fit the budget
+    out = np.empty((size, m, m))
+    for start in range(0, size, step):
+        stop = min(start + step, size)
+        perm = rng.permuted(np.tile(np.arange(n), (stop - start, 1)), axis=1)  # <-- (batch, n) row orders
+        out[start:stop] = Z.T @ Z[perm]  # <-- one batched matmul: (m, n) @ (batch, n, m)
+    return out
+
+
+def _ols_kernel(data, size, rng):
+    # Per replicate: slope[y, x] and intercept[y, x] of the least-squares line of y on x
+    X = data['x']
+    n, m = X.shape
+    weights = resample_counts(rng, size, n)
+    mean = weights @ X / n
+    second = np.einsum('bn,ni,nj->bij', weights, X, X, optimize=True) / n
+    cov = second - mean[:, :, None] * mean[:, None, :]
+    var = np.diagonal(cov, axis1=1, axis2=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = cov / var[:, None, :]
+    intercept = mean[:, :, None] - slope * mean[:, None, :]
+    return np.stack([slope, intercept], axis=1)
+
+
+# -----------------------------------------------------------------------------
+# PUBLIC ENTRY POINTS
+# -----------------------------------------------------------------------------
+def _country_year(df, col, entity_col='Country', period_col='Year'):
+    table = df.pivot_table(index=entity_col, columns=period_col, values=col, aggfunc='sum', observed=True)
+    table.index = table.index.astype(str)
+    return table
+
+
+def pareto_bootstrap(df, col, progress=None, n_reps=2000, share=80, ci=0.95, seed=0, n_jobs=None):
+    """CI of the '% of countries holding `share`% of the total' cutoff, plus a band for the Lorenz curve."""
+    table = _country_year(df, col)
+    data = {'sums': table.fillna(0).to_numpy(dtype='float64'), 'share': share}
+    reps = run_replicates(_pareto_kernel, data, n_reps, n_reps * data['sums'].size, seed, n_jobs, progress)
+    alpha = (1 - ci) / 2
+    lo, hi = np.quantile(reps, [alpha, 1 - alpha], axis=0)
+    return {'ci': ci, 'n_reps': n_reps, 'cutoff_low': lo[0], 'cutoff_high': hi[0], 'band_low': lo[1:], 'band_high': hi[1:]}
+
+
+def rank_bootstrap(df, col, progress=None, how='sum', n_reps=2000, ci=0.95, seed=0, n_jobs=None):
+    """Per-country rank interval (1 = best) of the lifetime sum/mean under year resampling."""
+    table = _country_year(df, col)
+    data = {
+        'sums': table.fillna(0).to_numpy(dtype='float64'),
+        'present': table.notna().to_numpy(dtype='float64'),
+        'how': how,
+    }
+    ranks = run_replicates(_rank_kernel, data, n_reps, n_reps * data['sums'].size, seed, n_jobs, progress)
+    alpha = (1 - ci) / 2
+    lo, med, hi = np.quantile(ranks, [alpha, 0.5, 1 - alpha], axis=0, method='nearest')
+    return pd.DataFrame({'Rank Low': lo, 'Rank Median': med, 'Rank High': hi}, index=table.index).astype('int16')
+
+
+def correlation_resampling(df, columns, progress=None, n_perm=2000, n_boot=1000, seed=0, n_jobs=None):
+    """Permutation p-values for every pair plus bootstrap OLS replicates for line bands."""
+    data = df[list(columns)].astype('float64').dropna()
+    X = data.to_numpy()
+    Z = X - X.mean(axis=0)
+    Z /= np.sqrt((Z ** 2).sum(axis=0))
+    observed = Z.T @ Z
+    n_cells = X.size
+
+    total = n_perm + n_boot
+    perm_progress = (lambda done, _: progress(done, total)) if progress else None
+    boot_progress = (lambda done, _: progress(n_perm + done, total)) if progress else None
+
+    null = run_replicates(_permutation_kernel, {'z': Z}, n_perm, n_perm * n_cells * X.shape[1], seed, n_jobs, perm_progress)
+    exceed = (np.abs(null) >= np.abs(observed)[None, :, :] - 1e-12).sum(axis=0)
+    pvalues = (exceed + 1) / (n_perm + 1)  # <-- add-one estimate, never exactly 0
+    np.fill_diagonal(pvalues, 0.0)
+
+    lines = run_replicates(_ols_kernel, {'x': X - X.mean(axis=0)}, n_boot, n_boot * n_cells * X.shape[1], seed + 1, n_jobs, boot_progress)
+    return {
+        'columns': list(data.columns),
+        'means': X.mean(axis=0),
+        'n_perm': n_perm,
+        'perm_pvalues': pd.DataFrame(pvalues, index=data.columns, columns=data.columns),
+        'lines': lines,  # <-- (n_boot, 2, m, m): slope / intercept of centred y on centred x
+    }
+
+
+def line_band(result, y_col, x_col, x_grid, ci=0.95):
+    """Pointwise CI band of the OLS line of y_col on x_col over x_grid."""
+    i, j = result['columns'].index(y_col), result['columns'].index(x_col)
+    slope, intercept = result['lines'][:, 0, i, j], result['lines'][:, 1, i, j]
+    mean_x, mean_y = result['means'][j], result['means'][i]
+    x = np.asarray(x_grid, dtype='float64') - mean_x
+    fits = mean_y + intercept[:, None] + slope[:, None] * x[None, :]
+    alpha = (1 - ci) / 2
+    return np.nanquantile(fits, [alpha, 1 - alpha], axis=0)
@@ -0,0 +1,171 @@
+"""
+Cross-process shared tier: immutable frames as memory-mapped Arrow IPC files.
+
+Every Streamlit worker process of the dashboard attaches the same files
+through mmap. Numeric and category columns become read-only NumPy views over
+the OS page cache, so N processes hold one physical copy and none of them
+re-parses or re-aggregates. Files live in data/.cache/shared/<version>-<code>/
+(dataset version plus a digest of the analytics sources and TIER_VERSION), are
+written once (atomic rename) and are dropped when the data or the code changes.
+
+Besides the Country x Year frames, country cubes and the Field / Document Type
+filter members, table-shaped results of the default views (Pareto, quadrant, dominance, yearly top-k) are published
+under their memo key; trailing scalars (cutoff, medians) go into the schema
+metadata.
+
+    python -m analytics.shared      # publish the default views before the first user arrives
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pyarrow as pa
+
+from analytics import aggregates, backends, etl, memo, ranks, star, store
+
+SHARED_DIR = os.path.join(os.path.dirname(store.STORE_PATH), 'shared')
+TIER_VERSION = 1  # <-- bump when the file layout changes
+_EXTRAS = b'shared_extras'
+
+# Selections a fresh dashboard session opens with: (tab, metric, backend method, args, params)
+DEFAULT_VIEWS = [
+    ('pareto', 'CNCI', 'pareto', ('CNCI',), {}),
+    ('quadrant', 'Documents', 'quadrant', (aggregates.quadrant_rules('mean'), 'Documents'), {'y_col': 'CNCI', 'averages': 'mean'}),
+    ('dominance', 'Times Cited', 'top2_per_year', ('Times Cited',), {}),
+    ('year_top', 'Documents', 'year_top', ('Documents',), {'k': 10}),  # <-- + year=<latest year>
+]
+SHARED_TABS = {tab for tab, *_ in DEFAULT_VIEWS}  # <-- memo tabs whose results are published
+
+
+def key_name(key):
+    return hashlib.sha256(repr(key).encode()).hexdigest()[:24]
+
+
+@functools.lru_cache(maxsize=1)
+def _code_tag():
+    return hashlib.sha256(f"{TIER_VERSION}:{memo.code_digest()}".encode()).hexdigest()[:12]
+
+
+def tier_name(version):
+    """Directory of `version` for the running code: new code never attaches results of old code."""
+    return f"{version}-{_code_tag()}"
+
+
+def _path(version, name, root=SHARED_DIR):
+    return os.path.join(root, tier_name(version), f"{name}.arrow")
+
+
+def publish(version, name, value, root=SHARED_DIR):
+    """Write a DataFrame (or a (DataFrame, *scalars) tuple) once as an uncompressed Arrow IPC file."""
+    frame, extras = (value[0], list(value[1:])) if isinstance(value, tuple) else (value, None)
+    table = pa.Table.from_pandas(frame)
+    if extras is not None:
+        extras = [x.item() if hasattr(x, 'item') else x for x in extras]  # <-- NumPy scalars -> JSON
+        table = table.replace_schema_metadata({**table.schema.metadata, _EXTRAS: json.dumps(extras).encode()})
+
+    def write(f):
+        with pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+
+    etl.atomic_write(_path(version, name, root), write, binary=True)
+
+
+def attach(version, name, root=SHARED_DIR):
+    """Memory-mapped view of a published value, or None if it was never published."""
+    path = _path(version, name, root)
+    if not os.path.exists(path):
+        return None
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()  # <-- buffers point into the mapping
+    frame = table.to_pandas(split_blocks=True)  # <-- one block per column: no consolidation copy
+    extras = (table.schema.metadata or {}).get(_EXTRAS)
+    return (frame, *json.loads(extras)) if extras is not None else frame
+
+
+def get_or_publish(version, name, build, *args, **kwargs):
+    """Attach `name`, or build it, publish it and attach it (every process then reads the same pages)."""
+    value = attach(version, name)
+    if value is not None:
+        return value
+    value = build(*args, **kwargs)
+    try:
+        publish(version, name, value)
+    except OSError:
+        return value  # <-- read-only deployment: keep the private copy
+    return attach(version, name)
+
+
+def prune(version, root=SHARED_DIR):
+    """Remove the files of every other dataset version or code. Returns the number of directories dropped."""
+    if not os.path.isdir(root):
+        return 0
+    current = tier_name(version)
+    stale = [d for d in os.listdir(root) if d != current and os.path.isdir(os.path.join(root, d))]
+    for d in stale:
+        shutil.rmtree(os.path.join(root, d), ignore_errors=True)  # <-- open mappings stay valid after unlink
+    return len(stale)
+
+
+def frame_name(version, field=star.ALL, doc_type=star.ALL):
+    return key_name(memo.make_key(version, 'frame', None, data_field=(field, doc_type)))
+
+
+def cube_name(version, field=star.ALL, doc_type=star.ALL):
+    return key_name(memo.make_key(version, 'cube', None, data_field=(field, doc_type)))
+
+
+def members_name(version):
+    return key_name(memo.make_key(version, 'members', None))
+
+
+def filter_members(version, load_facts):
+    """{filter dimension: sorted members}; only a publish miss calls load_facts() and scans the fact table."""
+    table = get_or_publish(version, members_name(version), lambda: star.members_frame(load_facts()))
+    return {name: list(table.loc[table['Dimension'] == name, 'Member']) for name in star.FILTER_DIMENSIONS}
+
+
+# -----------------------------------------------------------------------------
+# WARM-UP
+# -----------------------------------------------------------------------------
+def warm_up(version, facts=None):
+    """Publish the default frame, cube, filter members and default-view tables of `version`. Returns their names.
+
+    The fact table is only read, and the star schema only built, for what is not published yet.
+    """
+    load_facts = (lambda: facts) if facts is not None else (lambda: store.load_facts(memory_map=True))
+    frame = get_or_publish(version, frame_name(version), lambda: star.StarSchema(load_facts()).frame())
+    cube = get_or_publish(version, cube_name(version), aggregates.build_country_cube, frame)
+    filter_members(version, load_facts)
+    engine = backends.PandasBackend(frame, cube, lambda: ranks.RankTensor(frame, aggregates.METRIC_COLUMNS))
+
+    names = [frame_name(version), cube_name(version), members_name(version)]
+    for tab, metric, method, args, params in DEFAULT_VIEWS:
+        if tab == 'year_top':
+            params = {**params, 'year': int(frame['Year'].max())}
+        key = memo.make_key(version, tab, metric, data_field=(star.ALL, star.ALL), data_slice=None, **params)
+        get_or_publish(version, key_name(key), getattr(engine, method), *args, **params)
+        names.append(key_name(key))
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the shared Arrow tier and precompute the default views.")
+    parser.add_argument('--no-refresh', action='store_true', help="Do not run the ETL refresh first.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if not args.no_refresh:
+        etl.run_pipeline()
+    version = store.ensure_store()['version']
+    names = warm_up(version)
+    dropped = prune(version)
+    size = sum(os.path.getsize(_path(version, n)) for n in names)
+    print(f"Shared tier {version}: {len(names)} table(s), {size / 1024 / 1024:.1f} MiB, "
+          f"{dropped} stale tier(s) dropped in {time.perf_counter() - start:.1f}s -> {os.path.join(SHARED_DIR, tier_name(version))}")
+
+
+if __name__ == '__main__':
+    main()
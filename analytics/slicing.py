@@ -0,0 +1,152 @@
+"""
+Year-range and country-subset slices of the fact table without rescans.
+
+SliceIndex keeps the rows sorted by (Year, Country), so a year range is one
+contiguous block found with two binary searches over per-year offsets. The
+additive moments of every metric (aggregates.MOMENTS) are stored as prefix sums
+over years per country: the sum, count, simple or document-weighted mean of any
+year range costs two lookups per country. Per-metric row orders, sorted by value
+overall and within each country, give the slice's quantiles with a mask
+instead of a sort.
+"""
+import numpy as np
+import pandas as pd
+
+from analytics import aggregates
+from analytics.quantiles import QuantileIndex, SortedColumn
+
+
+class SliceIndex:
+
+    def __init__(self, df, metrics=None, entity_col='Country', period_col='Year'):
+        self.entity_col, self.period_col = entity_col, period_col
+        self.metrics = [m for m in (metrics or aggregates.METRIC_COLUMNS) if m in df.columns]
+        self._cube_dtypes = aggregates.build_country_cube(df.head(1), self.metrics).dtypes
+        self.frame = df.sort_values([period_col, entity_col], kind='stable').reset_index(drop=True)
+
+        # --- Row layout: per-year offsets into the (Year, Country) order ---
+        years = self.frame[period_col].to_numpy()
+        self.years = np.unique(years)
+        self.offsets = np.append(np.searchsorted(years, self.years, side='left'), len(years))
+        self._year_codes = np.searchsorted(self.years, years)
+        codes, countries = pd.factorize(self.frame[entity_col].astype(str), sort=True)
+        self.countries = pd.Index(countries, name=entity_col)
+        self._country_codes = codes
+        shape = (len(self.countries), len(self.years))
+
+        # --- Prefix sums over years: prefix[c, j] = moments of country c over years[:j] ---
+        moments = aggregates.build_moments(self.frame, self.metrics, keys=(entity_col, period_col))
+        self.moment_columns = moments.columns
+        c_idx = self.countries.get_indexer(moments.index.get_level_values(0))
+        y_idx = np.searchsorted(self.years, moments.index.get_level_values(1))
+        grid = np.zeros(shape + (moments.shape[1],))
+        grid[c_idx, y_idx] = moments.to_numpy(dtype='float64')
+        self.prefix = np.zeros((shape[0], shape[1] + 1, grid.shape[2]))
+        self.prefix[:, 1:] = np.cumsum(grid, axis=1)
+        row_counts = np.zeros(shape)
+        np.add.at(row_counts, (codes, self._year_codes), 1)
+        self.row_prefix = np.zeros((shape[0], shape[1] + 1))
+        self.row_prefix[:, 1:] = np.cumsum(row_counts, axis=1)
+
+        # --- Per (country, year) extremes for the cube's min/max (grid sized, not row sized) ---
+        by_cell = self.frame[self.metrics].groupby([codes, self._year_codes])
+        lows, highs = by_cell.min(), by_cell.max()
+        cells = (lows.index.get_level_values(0), lows.index.get_level_values(1))
+        self.low = np.full(shape + (len(self.metrics),), np.nan)
+        self.high = np.full(shape + (len(self.metrics),), np.nan)
+        self.low[cells] = lows.to_numpy(dtype='float64')
+        self.high[cells] = highs.to_numpy(dtype='float64')
+
+        # --- Value orders for quantiles (NaNs dropped): overall, and by (country, value) ---
+        self._values, self._order, self._grouped = {}, {}, {}
+        for col in self.metrics:
+            values = self.frame[col].to_numpy(dtype='float64')
+            valid = np.flatnonzero(~np.isnan(values))
+            self._values[col] = values
+            self._order[col] = valid[np.argsort(values[valid], kind='stable')]
+            self._grouped[col] = valid[np.lexsort((values[valid], codes[valid]))]
+
+    def year_span(self, years=None):
+        """(start, stop) positions in self.years of an inclusive (first, last) year range (start == stop if empty)."""
+        if years is None:
+            return 0, len(self.years)
+        first, last = years
+        lo = int(np.searchsorted(self.years, first, side='left'))
+        return lo, max(lo, int(np.searchsorted(self.years, last, side='right')))  # <-- reversed range -> empty
+
+    def _row_mask(self, years, countries):
+        lo, hi = self.year_span(years)
+        mask = np.zeros(len(self.frame), dtype=bool)
+        mask[self.offsets[lo]:self.offsets[hi]] = True
+        if countries:
+            mask &= self.countries.isin(countries)[self._country_codes]
+        return mask
+
+    def rows(self, years=None, countries=None):
+        """Fact rows of the slice: one contiguous block for the years, then a country mask."""
+        lo, hi = self.year_span(years)
+        start, stop = self.offsets[lo], self.offsets[hi]
+        block = self.frame.iloc[start:stop]
+        if countries:
+            block = block[self.countries.isin(countries)[self._country_codes[start:stop]]]
+        block = block.reset_index(drop=True)
+        if isinstance(block[self.entity_col].dtype, pd.CategoricalDtype):
+            block[self.entity_col] = block[self.entity_col].cat.remove_unused_categories()
+        return block
+
+    def moments(self, years=None, countries=None):
+        """Country x (metric, moment) totals of the slice, two prefix lookups per country."""
+        lo, hi = self.year_span(years)
+        present = (self.row_prefix[:, hi] - self.row_prefix[:, lo]) > 0
+        if countries:
+            present &= self.countries.isin(countries)
+        totals = self.prefix[present, hi] - self.prefix[present, lo]
+        return pd.DataFrame(totals, index=self.countries[present], columns=self.moment_columns)
+
+    def cube(self, years=None, countries=None):
+        """Same layout as aggregates.build_country_cube(), for the slice."""
+        moments = self.moments(years, countries)
+        lo, hi = self.year_span(years)
+        keep = self.countries.get_indexer(moments.index)
+        if hi > lo:
+            low = np.fmin.reduce(self.low[keep, lo:hi], axis=1)  # <-- fmin/fmax skip NaN years
+            high = np.fmax.reduce(self.high[keep, lo:hi], axis=1)
+        else:
+            low = high = np.empty((0, len(self.metrics)))  # <-- no year in the span: no country present
+        means = aggregates.moment_means(moments)
+        weighted = aggregates.moment_means(moments, weighted=True)
+
+        parts = {}
+        for i, col in enumerate(self.metrics):
+            total = moments[(col, 'sum')]
+            low_col = pd.Series(low[:, i], index=moments.index)
+            high_col = pd.Series(high[:, i], index=moments.index)
+            if pd.api.types.is_integer_dtype(self._cube_dtypes[(col, 'sum')]):
+                total, low_col, high_col = total.round(), low_col.round(), high_col.round()  # <-- exact in float64
+            parts[(col, 'sum')] = total
+            parts[(col, 'mean')] = means[col]
+            parts[(col, 'min')] = low_col
+            parts[(col, 'max')] = high_col
+            parts[(col, 'count')] = moments[(col, 'count')].round().astype('int64')
+            parts[(col, 'wmean')] = weighted[col]
+        cube = pd.DataFrame(parts).astype(self._cube_dtypes)  # <-- same dtypes as the groupby cube
+        cube.index.name = self.entity_col
+        return cube
+
+    def quantile_index(self, years=None, countries=None):
+        """QuantileIndex of the slice, cut out of the presorted orders (masks, no sorting)."""
+        mask = self._row_mask(years, countries)
+        overall, groups = {}, {}
+        for col in self.metrics:
+            values = self._values[col]
+            order = self._order[col][mask[self._order[col]]]
+            overall[col] = SortedColumn(values[order], presorted=True)
+
+            grouped = self._grouped[col][mask[self._grouped[col]]]
+            codes = self._country_codes[grouped]
+            starts = np.flatnonzero(np.diff(codes, prepend=-1))  # <-- first row of each country's run
+            groups[col] = {
+                self.countries[codes[s]]: SortedColumn(part, presorted=True)
+                for s, part in zip(starts, np.split(values[grouped], starts[1:]))
+            }
+        return QuantileIndex.from_sorted(overall, groups, self.entity_col)
@@ -0,0 +1,147 @@
+"""
+Star-schema data layer: Country x Category x Doc Type x Year.
+
+Dimensions are dictionary-encoded: member labels are stored once, fact rows
+carry small integer codes. Measures are the additive moments of every metric
+(aggregates.MOMENTS) plus the best (minimum) Rank, so every rollup is a sum or
+min over integer-coded groups. Averaged metrics take their moments from the
+mean state the ETL keeps per row (etl.MEAN_STATE), so the 'All' rollup of a
+Field / Document Type split equals the flat ETL aggregate of the same raw rows. The (Country, Year) rollups for all members of
+each filter dimension are built once, and tabs ask for the Country x Year frame
+of one Field / Document Type instead of grouping fact rows themselves.
+
+Exports without a Category or Doc Type column get a single 'All' member, and
+then the layer hands back the fact table unchanged.
+"""
+import numpy as np
+import pandas as pd
+
+from analytics import aggregates, etl
+
+DIMENSIONS = ['Country', 'Category', 'Doc Type', 'Year']
+FILTER_DIMENSIONS = ['Category', 'Doc Type']  # <-- the sidebar's Field / Document Type selectors
+ALL = 'All'
+
+
+def dimension_members(facts, name):
+    """Sorted member labels of one dimension (what Dimension.members holds), without coding the rows."""
+    if name not in facts.columns:
+        return [ALL]
+    values = facts[name]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        return sorted(map(str, values.cat.categories[np.unique(codes[codes >= 0])]))  # <-- used categories only
+    return sorted(map(str, pd.unique(values)))
+
+
+def members_frame(facts):
+    """Long (Dimension, Member) frame of every filter dimension, e.g. for the shared tier."""
+    rows = [(name, member) for name in FILTER_DIMENSIONS for member in dimension_members(facts, name)]
+    return pd.DataFrame(rows, columns=['Dimension', 'Member'])
+
+
+class Dimension:
+    """Sorted member labels plus one integer code per fact row."""
+
+    def __init__(self, name, values):
+        codes, members = pd.factorize(values, sort=True)
+        self.name = name
+        self.members = pd.Index(members, name=name)
+        self.codes = codes.astype(np.min_scalar_type(max(len(members) - 1, 0)))
+
+    def __len__(self):
+        return len(self.members)
+
+    def code(self, member):
+        return self.members.get_loc(member)
+
+
+class StarSchema:
+
+    def __init__(self, facts, metrics=None):
+        # Every summed or averaged column of the cleaned data (Rank is kept separately as a min)
+        measures = metrics or [col for col, how in etl.AGG_RULES.items() if how != 'min']
+        self.metrics = [m for m in measures if m in facts.columns]
+        self.dims = {}
+        for name in DIMENSIONS:
+            if name in facts.columns:
+                values = facts[name]
+                values = values.astype(str) if name != 'Year' else values.to_numpy()
+            else:
+                values = np.full(len(facts), ALL, dtype=object)
+            self.dims[name] = Dimension(name, values)
+
+        # --- Fact arrays at full grain: integer dimension codes -> additive moments (+ best Rank) ---
+        state = [c for c in etl.state_columns() if c in facts.columns]
+        coded = facts[self.metrics + state].assign(**{name: dim.codes for name, dim in self.dims.items()})
+        self.facts = aggregates.build_moments(coded, self.metrics, keys=DIMENSIONS, state=etl.MEAN_STATE)
+        self.rank = coded.assign(Rank=facts['Rank']).groupby(DIMENSIONS)['Rank'].min() if 'Rank' in facts.columns else None
+
+        # --- Pre-aggregated rollups: (Country, Year) overall and per member of each filter dimension ---
+        self.rollups = {None: self._rollup(['Country', 'Year'])}
+        for name in FILTER_DIMENSIONS:
+            if len(self.dims[name]) > 1:
+                self.rollups[name] = self._rollup(['Country', 'Year', name])
+
+        # Already one row per (Country, Year) with nothing to filter: the facts are the answer
+        self._columns = [c for c in facts.columns if c not in FILTER_DIMENSIONS and c not in etl.state_columns()]
+        single = all(len(self.dims[name]) == 1 for name in FILTER_DIMENSIONS)
+        self._flat = facts[self._columns] if single and len(self.facts) == len(facts) else None  # <-- column views, no copy
+        self._dtypes = facts.dtypes
+
+    def _rollup(self, levels, facts=None, rank=None):
+        facts = self.facts if facts is None else facts
+        rank = self.rank if rank is None else rank
+        moments = facts.groupby(level=levels).sum()
+        best = rank.groupby(level=levels).min() if rank is not None else None
+        return moments, best
+
+    def members(self, name):
+        return list(self.dims[name].members)
+
+    def has_filters(self):
+        """True when some filter dimension has more than the single 'All' member."""
+        return any(len(self.dims[name]) > 1 for name in FILTER_DIMENSIONS)
+
+    def query(self, category=ALL, doc_type=ALL):
+        """(moments, best rank) at (Country, Year) grain for one Category / Doc Type."""
+        chosen = {name: member for name, member in zip(FILTER_DIMENSIONS, (category, doc_type)) if member != ALL}
+        if not chosen:
+            return self.rollups[None]
+        if len(chosen) == 1:
+            (name, member), = chosen.items()
+            code = self.dims[name].code(member)
+            moments, best = self.rollups[name]
+            return (moments.xs(code, level=name),
+                    best.xs(code, level=name) if best is not None else None)
+
+        # Both filters set: only the matching fact rows are grouped
+        mask = np.ones(len(self.facts), dtype=bool)
+        for name, member in chosen.items():
+            mask &= self.facts.index.get_level_values(name) == self.dims[name].code(member)
+        rank = self.rank[mask] if self.rank is not None else None
+        return self._rollup(['Country', 'Year'], self.facts[mask], rank)
+
+    def frame(self, category=ALL, doc_type=ALL):
+        """Country x Year frame in the cleaned-data layout (sums, simple means, best Rank, benchmark)."""
+        if self._flat is not None:
+            return self._flat
+        moments, best = self.query(category, doc_type)
+        means = aggregates.moment_means(moments)
+        countries = self.dims['Country'].members[moments.index.get_level_values('Country')]
+        out = pd.DataFrame({
+            'Country': pd.Categorical(countries),
+            'Year': self.dims['Year'].members[moments.index.get_level_values('Year')],
+        })
+        for col in self.metrics:
+            if etl.AGG_RULES.get(col) == 'sum':
+                out[col] = moments[(col, 'sum')].to_numpy()
+            else:
+                out[col] = means[col].round(2).to_numpy()  # <-- same rounding as the ETL's means
+        if best is not None:
+            out['Rank'] = best.to_numpy()
+        out['Benchmark Status'] = pd.Categorical(
+            np.where(out['CNCI'] < 1.0, etl.BENCHMARK_BELOW, etl.BENCHMARK_ABOVE)
+        )
+        columns = [c for c in self._columns if c in out.columns]
+        return out[columns].astype({c: self._dtypes[c] for c in columns if c not in ('Country', 'Benchmark Status')})
@@ -0,0 +1,123 @@
+"""
+Columnar on-disk cache for the cleaned dataset.
+
+cleaned_publications.csv is parsed once with an explicit schema and stored as
+an uncompressed Feather (Arrow IPC) file. Later loads read the binary file,
+optionally only the requested columns. The store is rebuilt when the CSV's
+mtime/size changes and its content hash differs from the one it was built from.
+"""
+import json
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from analytics import etl
+
+STORE_PATH = 'data/.cache/cleaned_publications.feather'
+META_PATH = STORE_PATH + '.json'
+
+# Explicit schema -> no type inference on load
+SCHEMA = {
+    'Country': 'category',
+    'Category': 'category',  # <-- optional star-schema dimensions (production exports)
+    'Doc Type': 'category',
+    'Year': 'int16',
+    'Documents': 'int32',
+    'Times Cited': 'int64',
+    'Documents in Top 1%': 'int32',
+    'Documents in Top 10%': 'int32',
+    'CNCI': 'float32',
+    'Collab-CNCI': 'float32',
+    '% Docs Cited': 'float32',
+    '% Documents in Top 1%': 'float32',
+    '% Documents in Top 10%': 'float32',
+    'Rank': 'int16',
+    'Benchmark Status': 'category',
+}
+# Mergeable mean state kept by the ETL (sum, count, document-weighted sum, document weight)
+STATE_DTYPES = {'count': 'int32'}  # <-- the others are float64 sums
+SCHEMA.update({
+    col + suffix: STATE_DTYPES.get(moment, 'float64')
+    for col, how in etl.AGG_RULES.items() if how == 'mean'
+    for moment, suffix in etl.MEAN_STATE.items()
+})
+SCHEMA_VERSION = 3  # <-- bump when SCHEMA changes so old stores are rebuilt
+
+
+def read_csv_typed(csv_path=etl.CLEAN_PATH):
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtypes = {col: dtype for col, dtype in SCHEMA.items() if col in header}
+    return pd.read_csv(csv_path, dtype=dtypes)
+
+
+def _load_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def build_store(csv_path=etl.CLEAN_PATH, store_path=STORE_PATH, meta_path=META_PATH, digest=None):
+    """Parse the CSV once and write the typed Feather file plus its metadata."""
+    df = read_csv_typed(csv_path)
+    etl.atomic_write(store_path, lambda f: df.to_feather(f, compression='uncompressed'), binary=True)
+
+    st = os.stat(csv_path)
+    meta = {
+        'csv_path': csv_path,
+        'csv_mtime': st.st_mtime_ns,
+        'csv_size': st.st_size,
+        'csv_sha256': digest or etl.file_hash(csv_path),
+        'schema_version': SCHEMA_VERSION,
+        'rows': len(df),
+    }
+    meta['version'] = meta['csv_sha256'][:16]
+    etl.atomic_write(meta_path, lambda f: json.dump(meta, f, indent=1))
+    return meta
+
+
+def ensure_store(csv_path=etl.CLEAN_PATH, store_path=STORE_PATH, meta_path=META_PATH):
+    """Return the store metadata, rebuilding the store if the CSV changed.
+
+    meta['version'] identifies the dataset content and is used as a cache key.
+    """
+    meta = _load_meta(meta_path)
+    st = os.stat(csv_path)  # <-- raises FileNotFoundError if the CSV is missing
+
+    if meta is None or meta.get('schema_version') != SCHEMA_VERSION or not os.path.exists(store_path):
+        return build_store(csv_path, store_path, meta_path)
+
+    # Fast path: CSV untouched since the store was built
+    if meta['csv_mtime'] == st.st_mtime_ns and meta['csv_size'] == st.st_size:
+        return meta
+
+    # CSV touched: only rebuild if the content actually changed
+    digest = etl.file_hash(csv_path)
+    if digest != meta['csv_sha256']:
+        return build_store(csv_path, store_path, meta_path, digest=digest)
+
+    meta.update(csv_mtime=st.st_mtime_ns, csv_size=st.st_size)
+    etl.atomic_write(meta_path, lambda f: json.dump(meta, f, indent=1))
+    return meta
+
+
+def load_frame(columns=None, csv_path=etl.CLEAN_PATH, store_path=STORE_PATH, meta_path=META_PATH, memory_map=False):
+    """Typed DataFrame from the columnar store, optionally projected to `columns`.
+
+    memory_map=True maps the file instead of reading it: columns are read-only
+    views over the OS page cache, shared by every process that maps the store.
+    """
+    ensure_store(csv_path, store_path, meta_path)
+    if memory_map:
+        return feather.read_table(store_path, columns=columns, memory_map=True).to_pandas(split_blocks=True)
+    return pd.read_feather(store_path, columns=columns)
+
+
+def load_facts(columns=None, csv_path=etl.CLEAN_PATH, store_path=STORE_PATH, meta_path=META_PATH, memory_map=False):
+    """load_frame() plus the columns every view expects (proxies for exports without them)."""
+    facts = load_frame(columns, csv_path, store_path, meta_path, memory_map)
+    if '% Documents in Top 10%' not in facts.columns and '% Documents in Top 1%' in facts.columns:
+        facts['% Documents in Top 10%'] = facts['% Documents in Top 1%'] * 3.5  # <-- proxy for exports without it
+    return facts
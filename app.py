@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
-from itertools import combinations 
+import threading
+import time
+from analytics import etl, store, aggregates, dominance, memo, compute, derived, profiling, downsample, quantiles, outliers, correlation, resampling, ranks, slicing, star, backends, figures, shared
 
 # -----------------------------------------------------------------------------
 # PAGE CONFIGURATION
@@ -29,8 +29,8 @@ st.markdown("""
     .red-box { background-color: #ffebee; border-color: #ef5350; }
     div[data-testid="stMetricValue"] { font-size: 24px; }
 
-    /* --- Sticky Tabs --- */
-    div[data-testid="stTabs"] {
+    /* --- Sticky Section Navigation --- */
+    .st-key-section_nav {
         position: -webkit-sticky; position: sticky;
         top: 0; z-index: 999; background-color: white;
         padding-top: 1rem; padding-bottom: 1rem;
@@ -50,19 +50,188 @@ st.markdown("""
 # -----------------------------------------------------------------------------
 # DATA LOADING
 # -----------------------------------------------------------------------------
-@st.cache_data
-def load_data():
+# Opt-in profiler for this rerun (?profile=1 or DASHBOARD_PROFILE=1)
+prof = profiling.RerunProfiler(enabled=profiling.is_enabled(st.query_params))
+
+VERSION_TTL = 5 # <-- seconds between filesystem checks for new exports (per process)
+
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def data_version():
+    # Refresh the cleaned file from raw exports (no-op when no partition changed)
     try:
-        df = pd.read_csv('data/cleaned_publications.csv')
-        return df
+        etl.run_pipeline()
+    except (OSError, ValueError) as e: # <-- ValueError also covers pd.errors.ParserError and exports missing a required column
+        st.warning(f"⚠️ ETL refresh skipped ({e}). Using existing cleaned data.")
+    # Rebuild the columnar cache only if the CSV changed; version = content hash
+    try:
+        return store.ensure_store()['version']
     except FileNotFoundError:
-        st.warning("⚠️ 'cleaned_publications.csv' not found.")
-df = load_data()
+        return None
+
+@st.cache_resource
+def load_facts(version):
+    # Raw fact table of one dataset version (only the data layers below read it)
+    return store.load_facts(memory_map=True) # <-- mapped Feather store, pages shared by every worker process
+
+@st.cache_resource
+def load_star(version):
+    # Star-schema layer over the fact table: dictionary-encoded dimensions + (Country, Year) rollups
+    if version is None:
+        return None
+    return star.StarSchema(load_facts(version))
+
+@st.cache_resource
+def load_duckdb(version):
+    # In-process DuckDB connection plus a Parquet copy of the fact table (DASHBOARD_BACKEND=duckdb)
+    return backends.connect(), backends.export_parquet(load_facts(version), version)
+
+@st.cache_resource
+def shared_tier(version):
+    # Startup warm-up (once per process): attach or publish the default frame, cube, filter members and default-view tables
+    shared.prune(version)
+    return shared.warm_up(version, load_facts(version))
+
+@st.cache_resource
+def load_members(version):
+    # Field / Document Type members for the sidebar, attached from the shared tier (no star schema per process)
+    return shared.filter_members(version, lambda: load_facts(version))
+
+@st.cache_resource(max_entries=8)
+def load_data(version, field=star.ALL, doc_type=star.ALL):
+    # Immutable Country x Year frame of one Field / Document Type: memory-mapped from the shared tier (read-only)
+    if version is None:
+        return None
+    # The star schema is only built (once per process) when the frame is not published yet
+    return shared.get_or_publish(version, shared.frame_name(version, field, doc_type), lambda: load_star(version).frame(field, doc_type))
+
+@st.cache_resource(max_entries=8)
+def load_cube(version, field=star.ALL, doc_type=star.ALL):
+    # Country-level sum/mean/min/max/count for every metric, built by one process per dataset version (read-only)
+    return shared.get_or_publish(version, shared.cube_name(version, field, doc_type), aggregates.build_country_cube, load_data(version, field, doc_type))
+
+@st.cache_resource(max_entries=8)
+def load_quantiles(version, field=star.ALL, doc_type=star.ALL):
+    # Every metric sorted once (overall and per country): quantiles become index lookups
+    frame = load_data(version, field, doc_type)
+    return quantiles.QuantileIndex(frame, [c for c in aggregates.METRIC_COLUMNS if c in frame.columns])
+
+@st.cache_resource(max_entries=8)
+def load_ranks(version, field=star.ALL, doc_type=star.ALL):
+    # Dense rank / percentile / YoY change per (metric, year, country), built once per dataset version
+    return ranks.RankTensor(load_data(version, field, doc_type), aggregates.METRIC_COLUMNS)
+
+@st.cache_resource(max_entries=8)
+def load_slicer(version, field=star.ALL, doc_type=star.ALL):
+    # Rows sorted by (Year, Country) with per-year offsets and prefix sums of the additive moments
+    return slicing.SliceIndex(load_data(version, field, doc_type), aggregates.METRIC_COLUMNS)
+
+@st.cache_resource(max_entries=16)
+def load_slice(version, field, doc_type, years, countries):
+    # Frame, cube, quantile index and rank tensor of one sidebar filter, all served from the slice index
+    slicer = load_slicer(version, field, doc_type)
+    frame = slicer.rows(years, countries)
+    return frame, slicer.cube(years, countries), slicer.quantile_index(years, countries), ranks.RankTensor(frame, aggregates.METRIC_COLUMNS)
+
+@st.cache_resource
+def compute_cache():
+    # Process-wide LRU of derived results, shared by all sessions
+    return memo.ComputeCache(max_entries=256)
+
+def cached(tab, metric, fn, *args, **params):
+    # Memoize fn(*args, **params) under (dataset version, tab, metric, params)
+    key = memo.make_key(DATA_VERSION, tab, metric, data_field=DATA_FIELD, data_slice=DATA_SLICE, **params)
+    with prof.timer(f"{tab}:{metric}", kind="compute"):
+        if tab in shared.SHARED_TABS and DATA_SLICE is None:
+            # Table results of unfiltered views: computed by one worker process, attached by the others
+            return compute_cache().get_or_compute(key, shared.get_or_publish, DATA_VERSION, shared.key_name(key), fn, *args, **params)
+        return compute_cache().get_or_compute(key, fn, *args, **params)
+
+@st.cache_resource
+def figure_cache():
+    # Process-wide LRU of built figures, bounded by the data points of their traces
+    return memo.FigureCache(max_points=5_000_000)
+
+def cached_figure(view, metric, build, **selection):
+    # Build the figure once per (dataset version, view, metric, selection); treat it as read-only
+    key = memo.make_key(DATA_VERSION, view, metric, data_field=DATA_FIELD, data_slice=DATA_SLICE, **selection)
+    return figure_cache().get_or_compute(key, build)
+
+RESAMPLES = 2000 # <-- bootstrap/permutation replicates behind the confidence bands
+
+def resampled(tab, metric, fn, *args, **params):
+    # Memoized resampling run; shows a progress bar only while it is actually computing
+    bar = st.empty()
+    def progress(done, total):
+        bar.progress(done / total, text=f"Resampling: {done:,} / {total:,} replicates")
+    result = cached(tab, metric, fn, *args, progress, **params)
+    bar.empty()
+    return result
+
+def show_chart(fig, name):
+    # st.plotly_chart serializes the figure to JSON; time it separately from figure building
+    with prof.timer(name, kind="chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+with prof.timer("data_version", kind="load"):
+    DATA_VERSION = data_version()
+DATA_FIELD = (star.ALL, star.ALL) # <-- (Category, Doc Type) picked in the sidebar
+DATA_SLICE = None # <-- (first year, last year, countries) once the sidebar filter narrows the data
+compute_cache().retain_version(DATA_VERSION) # <-- evict results of older datasets
+figure_cache().retain_version(DATA_VERSION)
+if DATA_VERSION is not None:
+    with prof.timer("shared_tier", kind="load"):
+        shared_tier(DATA_VERSION)
+with prof.timer("load_data", kind="load"):
+    df = load_data(DATA_VERSION)
+if df is None:
+    st.warning("⚠️ 'cleaned_publications.csv' not found.")
+
+# -----------------------------------------------------------------------------
+# SECTION STATE
+# -----------------------------------------------------------------------------
+SECTIONS = [
+    "📊 1. Overview & Key Findings",
+    "🗺️ 2. Strategic Positioning",
+    "🎯 3. Distribution Analysis",
+    "⚔️ 4. Competitive Landscape",
+    "🚨 5. Outlier Analysis",
+    "🔗 6. Correlation Analysis",
+    "📈 7. Performance Trends"
+]
+
+# Streamlit drops the state of widgets that are not rendered in a run.
+# Re-assigning every key keeps the selections of hidden sections alive.
+for _key in list(st.session_state.keys()):
+    st.session_state[_key] = st.session_state[_key]
+
+def remember(key, default):
+    # Seed a widget's default through session_state (so no index/default args are needed)
+    if key not in st.session_state:
+        st.session_state[key] = default
+    return key
+
+def prefetch_sections(cache, version, data_field, data_slice, frame, qindex):
+    # Warm the memo cache with the default selections of every section (runs in a background thread)
+    jobs = [
+        ('distribution', '% Documents in Top 1%', compute.distribution_summary, (frame, '% Documents in Top 1%', qindex), {}),
+        ('dominance', 'Times Cited', dominance.market_dominance, (frame, 'Times Cited'), {}),
+        ('outlier_scan', 'iqr', outliers.scan, (frame, ['Documents', 'CNCI', 'Times Cited', '% Docs Cited', 'Collab-CNCI', '% Documents in Top 1%']),
+         {'method': 'iqr', 'scope': 'global', 'window': 7}),
+        ('correlation_suite', 'all', correlation.correlation_suite, (frame, ['Documents', 'CNCI', 'Times Cited', '% Docs Cited', 'Collab-CNCI', '% Documents in Top 1%', '% Documents in Top 10%']),
+         {'n_boot': 1000}),
+    ]
+    for tab, metric, fn, args, params in jobs:
+        cache.get_or_compute(memo.make_key(version, tab, metric, data_field=data_field, data_slice=data_slice, **params), fn, *args, **params)
 
 # -----------------------------------------------------------------------------
 # MAIN DASHBOARD LOGIC
 # -----------------------------------------------------------------------------
 if df is not None:
+    with prof.timer("load_cube", kind="load"):
+        cube = load_cube(DATA_VERSION) # <-- shared by tabs 1, 2 and 7
+    with prof.timer("load_quantiles", kind="load"):
+        qindex = load_quantiles(DATA_VERSION) # <-- medians, quartiles and describe() for tabs 1, 3 and 5
+
     # Cover Image
     st.markdown('<div class="cover-image"></div>', unsafe_allow_html=True)
 
@@ -92,20 +261,89 @@ if df is not None:
         - [LinkedIn](https://www.linkedin.com/in/omkar3101)
         - [Email](mailto:omkarshar3101@gmail.com)
         """)
+        st.markdown("---")
+
+        # Chart Rendering (scatter/strip plots above this size are binned server-side)
+        st.header("Chart Rendering")
+        point_limit = st.number_input(
+            "Max exact points per chart:",
+            min_value=100,
+            step=1000,
+            key=remember("point_limit", downsample.POINT_LIMIT),
+            help="Above this many rows, ordinary points are drawn as a binned WebGL density layer. Flagged points (below benchmark, outliers) are always drawn exactly."
+        )
+        st.markdown("---")
 
-    # TABS 
-    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-        "📊 1. Overview & Key Findings",
-        "🗺️ 2. Strategic Positioning",
-        "🎯 3. Distribution Analysis",
-        "⚔️ 4. Competitive Landscape",
-        "🚨 5. Outlier Analysis",
-        "🔗 6. Correlation Analysis",
-        "📈 7. Performance Trends"
-    ])
+        # Field / Document Type (only when the export carries more than the single 'All' member)
+        field_members = load_members(DATA_VERSION)
+        if any(len(members) > 1 for members in field_members.values()):
+            st.header("Field")
+            field_choices = []
+            for dim, label, key in zip(star.FILTER_DIMENSIONS, ("Subject Category:", "Document Type:"), ("filter_field", "filter_doc_type")):
+                members = field_members[dim]
+                if len(members) > 1:
+                    field_choices.append(st.selectbox(label, [star.ALL] + members, key=remember(key, star.ALL)))
+                else:
+                    field_choices.append(star.ALL)
+            DATA_FIELD = tuple(field_choices)
+            if DATA_FIELD != (star.ALL, star.ALL):
+                df = load_data(DATA_VERSION, *DATA_FIELD) # <-- Country x Year rollup of that field, never the fact rows
+                cube = load_cube(DATA_VERSION, *DATA_FIELD)
+                qindex = load_quantiles(DATA_VERSION, *DATA_FIELD)
+            st.markdown("---")
+
+        # Data Filters (every section works on the selected years and countries)
+        st.header("Data Filters")
+        slicer = load_slicer(DATA_VERSION, *DATA_FIELD)
+        first_year, last_year = int(slicer.years[0]), int(slicer.years[-1])
+        year_range = st.slider(
+            "Year Range:",
+            min_value=first_year,
+            max_value=last_year,
+            key=remember("filter_years", (first_year, last_year))
+        )
+        filter_countries = st.multiselect(
+            "Countries (empty = all):",
+            list(slicer.countries),
+            key=remember("filter_countries", [])
+        )
+        if len(filter_countries) == 1:
+            st.caption("⚠️ Select at least two countries to compare; showing all countries.")
+            filter_countries = []
+
+    # --- Apply the sidebar filter: year block + country mask, cube and quantiles from prefix sums ---
+    slice_ranks = None
+    if tuple(year_range) != (first_year, last_year) or filter_countries:
+        DATA_SLICE = (int(year_range[0]), int(year_range[1]), tuple(sorted(filter_countries)))
+        with prof.timer("load_slice", kind="load"):
+            df, cube, qindex, slice_ranks = load_slice(DATA_VERSION, *DATA_FIELD, DATA_SLICE[:2], DATA_SLICE[2])
+        st.info(f"🔎 Filtered view: {DATA_SLICE[0]}–{DATA_SLICE[1]}, {df['Country'].nunique()} countries, {len(df):,} rows.")
+
+    # --- Query backend for the tab aggregations (pandas on the frame/cube, or DuckDB SQL over Parquet) ---
+    if backends.backend_name() == 'duckdb':
+        duck_con, parquet_file = load_duckdb(DATA_VERSION)
+        engine = backends.DuckDBBackend(
+            duck_con, parquet_file, df,
+            years=DATA_SLICE[:2] if DATA_SLICE else None,
+            countries=DATA_SLICE[2] if DATA_SLICE else None,
+            field=DATA_FIELD
+        )
+    else:
+        engine = backends.PandasBackend(df, cube, lambda: slice_ranks if slice_ranks is not None else load_ranks(DATA_VERSION, *DATA_FIELD))
+
+    # SECTIONS (only the active one runs, unlike st.tabs which runs all seven every rerun)
+    with st.container(key="section_nav"):
+        active_section = st.radio(
+            "Section:",
+            SECTIONS,
+            horizontal=True,
+            key=remember("active_section", SECTIONS[0]),
+            label_visibility="collapsed"
+        )
+    section_start = time.perf_counter()
 
     # "1. Overview & Key Findings"
-    with tab1:
+    if active_section == SECTIONS[0]:
         # --- Step 1 : Insight Box ---
         st.markdown(f"""
         <div class="insight-box blue-box">
@@ -137,7 +375,7 @@ if df is not None:
             selected_metric_label = st.selectbox(
                 "Select Metric:",
                 list(METRICS_MAP.keys()),
-                index=2 # <-- Default CNCI
+                key=remember("overview_metric", "CNCI (Quality)") # <-- Default CNCI
             )
             selected_col = METRICS_MAP[selected_metric_label]
 
@@ -146,7 +384,8 @@ if df is not None:
             analysis_view = st.radio(
                 "Select Analysis Perspective:",
                 ("1. Consistency Check (Strip Plot)", "2. Concentration Analysis (Pareto Chart)"),
-                horizontal=True
+                horizontal=True,
+                key=remember("overview_view", "1. Consistency Check (Strip Plot)")
             )
 
         # --- Step 3 : Logic based on Radio Selection ---
@@ -154,27 +393,19 @@ if df is not None:
         if analysis_view == "1. Consistency Check (Strip Plot)":
             st.markdown(f"#### 1. Consistency Analysis: {selected_metric_label}") 
             
-            baseline_metrics = ['CNCI', 'Collab-CNCI', '% Documents in Top 1%'] 
-
-            # Separate Global Baseline
-            if selected_col in baseline_metrics:
-                threshold_val = 1.0
-                threshold_name = "Global Baseline"
-                label_below = "Below Baseline (< 1.0)"
-                label_above = "Above Baseline (>= 1.0)"
-            else:
-                threshold_val = df[selected_col].median()
-                threshold_name = "Global Median"
-                label_below = f"Below Median (< {threshold_val:.2f})"
-                label_above = f"Above Median (>= {threshold_val:.2f})"
+            # Separate Global Baseline (ratio metrics) from the Global Median (volume metrics)
+            threshold_val, threshold_name, label_below, label_above = figures.benchmark_threshold(
+                selected_col, qindex.column(selected_col).median()
+            )
             
-            # Apply Logic
-            df['Benchmark Status'] = df[selected_col].apply(
-                lambda x: label_below if x < threshold_val else label_above
+            # Apply Logic (vectorized categorical labels, cached per metric & threshold)
+            benchmark_status = cached(
+                'benchmark', selected_col, derived.threshold_labels, df[selected_col],
+                threshold=threshold_val, label_below=label_below, label_above=label_above
             )
             
             # Metric Display
-            below_count = len(df[df[selected_col] < threshold_val])
+            below_count = int((benchmark_status.cat.codes == 0).sum())
             st.metric(
                 f"Years Below {threshold_name}", 
                 f"{below_count} / {len(df)} Rows", 
@@ -183,30 +414,12 @@ if df is not None:
             )
 
             # Create Strip Plot
-            fig_strip = px.strip(
-                df, 
-                y=selected_col, 
-                x='Country', 
-                color='Benchmark Status', 
-                color_discrete_map={   
-                    label_below: '#EF553B', 
-                    label_above: '#636EFA'
-                },
-                hover_data=['Year', selected_col], 
-                title=f'Consistency Check vs {threshold_name}',
-                template='plotly_white'
-            )
-            
-            fig_strip.add_hline(
-                y=threshold_val, 
-                line_dash="dash", 
-                line_color="black", 
-                annotation_text=f"{threshold_name} ({threshold_val:.2f})"
-            )
-            
-            # Increased height slightly for better visibility in full width
-            fig_strip.update_layout(height=550) 
-            st.plotly_chart(fig_strip, use_container_width=True)
+            with prof.timer("tab1.strip", kind="figure"):
+                fig_strip = figures.strip(
+                    df, selected_col, benchmark_status, threshold_val, threshold_name, label_below, label_above,
+                    point_limit=point_limit
+                )
+            show_chart(fig_strip, "tab1.strip")
             
             st.caption(f"ℹ️ **Note:** Red dots indicate years where performance dropped below the **{threshold_name}**.")
 
@@ -214,19 +427,9 @@ if df is not None:
         else:
             st.markdown(f"#### 2. Concentration Analysis (Pareto): {selected_metric_label}") 
             
-            # Logic same as before
-            pareto_df = df.groupby('Country')[selected_col].sum().reset_index() 
-            pareto_df = pareto_df.sort_values(by=selected_col, ascending=False).reset_index(drop=True) 
-
-            total_val = pareto_df[selected_col].sum()  
-            pareto_df['Cumulative_Perc'] = (pareto_df[selected_col].cumsum() / total_val) * 100 
-            pareto_df['Entity_Perc'] = ((pareto_df.index + 1) / len(pareto_df)) * 100 
-
-            try:
-                cutoff_row = pareto_df[pareto_df['Cumulative_Perc'] >= 80].iloc[0]  
-                cutoff_perc = cutoff_row['Entity_Perc'] 
-            except IndexError:
-                cutoff_perc = 100
+            # Country totals come from the precomputed cube
+            with prof.timer("tab1.pareto", kind="compute"):
+                pareto_df, cutoff_perc = cached('pareto', selected_col, engine.pareto, selected_col)
 
             status_delta = "High Concentration (Monopoly)" if cutoff_perc <= 20 else "Distributed (Competitive)"
             delta_col = "inverse" if cutoff_perc <= 20 else "off"
@@ -237,33 +440,23 @@ if df is not None:
                 delta=status_delta, 
                 delta_color=delta_col
             )
+
+            # Uncertainty: bootstrap over years (which years are observed changes the country totals)
+            pareto_boot = resampled('pareto_boot', selected_col, resampling.pareto_bootstrap, df, selected_col, n_reps=RESAMPLES)
+            st.caption(f"{pareto_boot['ci']:.0%} bootstrap interval: **{pareto_boot['cutoff_low']:.1f}% – {pareto_boot['cutoff_high']:.1f}%** of entities ({RESAMPLES:,} year resamples).")
             
             # Create Pareto Chart
-            fig_pareto = go.Figure()
-            fig_pareto.add_trace(go.Bar( 
-                x=pareto_df['Country'], y=pareto_df[selected_col], name='Value', marker_color='#ced4da'
-            ))
-            fig_pareto.add_trace(go.Scatter( 
-                x=pareto_df['Country'], y=pareto_df['Cumulative_Perc'],
-                mode='lines+markers', name='Cumulative %', yaxis='y2', line=dict(color='#ef553b', width=3)
-            ))
-
-            fig_pareto.update_layout(
-                title=f'Lorenz Curve: {selected_metric_label}',
-                yaxis=dict(title=f'Total {selected_metric_label}'),
-                yaxis2=dict(title='Cumulative %', overlaying='y', side='right', range=[0, 110]),
-                hovermode='x unified',
-                height=550, # Increased height
-                showlegend=False
-            )
+            def build_pareto():
+                return figures.pareto(pareto_df, selected_col, selected_metric_label, band=pareto_boot)
 
-            fig_pareto.add_hline(y=80, line_dash="dash", line_color="green", yref="y2", annotation_text="80% Threshold")
-            st.plotly_chart(fig_pareto, use_container_width=True)
+            with prof.timer("tab1.pareto", kind="figure"):
+                fig_pareto = cached_figure('tab1.pareto', selected_col, build_pareto, label=selected_metric_label)
+            show_chart(fig_pareto, "tab1.pareto")
             
             st.caption("ℹ️ **Interpretation:** A steep red line rising quickly means a few countries hold all the power.")
 
     # "2. Strategic Positioning"
-    with tab2:
+    if active_section == SECTIONS[1]:
         # --- Step 1 : Insight Box ---
         st.markdown(f"""
         <div class="insight-box orange-box">
@@ -295,8 +488,7 @@ if df is not None:
             x_label = st.selectbox(
                 "Select X-Axis Metric:", 
                 list(STRATEGY_METRICS.keys()), 
-                index=4, # <-- Default: Documents
-                key="strat_x"
+                key=remember("strat_x", "Documents (Volume)") # <-- Default: Documents
             )
             x_col = STRATEGY_METRICS[x_label]
             
@@ -304,94 +496,43 @@ if df is not None:
             y_label = st.selectbox(
                 "Select Y-Axis Metric:", 
                 list(STRATEGY_METRICS.keys()), 
-                index=2, # <-- Default: CNCI
-                key="strat_y"
+                key=remember("strat_y", "CNCI (Quality)") # <-- Default: CNCI
             )
             y_col = STRATEGY_METRICS[y_label]
 
+        mean_label = st.radio(
+            "Average Quality Metrics By:",
+            ("Simple Mean (every year counts once)", "Document-Weighted Mean"),
+            horizontal=True,
+            key=remember("strat_mean", "Simple Mean (every year counts once)")
+        )
+        mean_stat = 'wmean' if mean_label == "Document-Weighted Mean" else 'mean' # <-- cube column read for CNCI & % metrics
+
         # --- Step 3 : Data Preparation ---
         # Define how to aggregate different columns
-        agg_rules = {
-            'Documents': 'sum', 
-            'Times Cited': 'sum', 
-            'CNCI': 'mean', 
-            'Collab-CNCI': 'mean',
-            '% Docs Cited': 'mean',
-            '% Documents in Top 1%': 'mean' 
-        }
+        agg_rules = aggregates.quadrant_rules(mean_stat) # <-- sums for volume, mean_stat for quality metrics
         
-        # Group by Country
-        overall_df = df.groupby('Country').agg(agg_rules).reset_index()
-
-        # Calculate Medians for the Quadrants
-        median_x = overall_df[x_col].median()
-        median_y = overall_df[y_col].median()
+        # Country-level values (precomputed cube or SQL backend) and the Medians for the Quadrants
+        overall_df, median_x, median_y = cached('quadrant', x_col, engine.quadrant, agg_rules, x_col, y_col=y_col, averages=mean_stat)
 
 
         # --- Step 4 : Visualisation --- 
-        # Determine if Log Scale is needed (Only for large numbers)
-        log_x_bool = True if x_col in ['Documents', 'Times Cited'] else False
-        log_y_bool = True if y_col in ['Documents', 'Times Cited'] else False
 
 
         st.markdown(f" #### Strategic Position : {x_label} vs {y_label}") # <-- Title of Scatter Plot
 
         # Create Scatter Plot
-        fig_quad = px.scatter(
-            overall_df, 
-            x=x_col, 
-            y=y_col, 
-            size='Documents', # <-- Bubble size to show volume
-            color='Collab-CNCI', # <-- Bubble color to show Collab-CNCI
-            hover_name='Country',
-            hover_data=['Times Cited', 'CNCI'],
-            log_x=log_x_bool,
-            log_y=log_y_bool,
-            color_continuous_scale='Plasma', 
-            height=600,
-            text='Country'
-        )
-
-        fig_quad.update_traces(
-                textposition='top center',  # <-- put text on topc
-        )
-        
-        # Add Median Lines (Quadrants)
-        fig_quad.add_vline(x=median_x, line_dash="dash", line_color="gray", annotation_text=f"Median {x_col}")
-        fig_quad.add_hline(y=median_y, line_dash="dash", line_color="gray", annotation_text=f"Median {y_col}")
-        
-        # Dynamic Quadrant Annotation
-        fig_quad.add_annotation(
-            xref="paper", yref="paper", x=0.98, y=0.98, text="<b>LEADERS</b><br>(High X & High Y)",
-            showarrow=False, font=dict(color="green", size=12), xanchor='right', yanchor='top'
-        )
-        fig_quad.add_annotation(
-            xref="paper", yref="paper", x=0.98, y=0.02, text=f"<b>{x_col} DRIVEN</b><br>(High X / Low Y)",
-            showarrow=False, font=dict(color="orange", size=12), xanchor='right', yanchor='bottom'
-        )
-        fig_quad.add_annotation(
-            xref="paper", yref="paper", x=0.02, y=0.98, text=f"<b>{y_col} DRIVEN</b><br>(Low X / High Y)",
-            showarrow=False, font=dict(color="blue", size=12), xanchor='left', yanchor='top'
-        )
-        fig_quad.add_annotation(
-            xref="paper", yref="paper", x=0.02, y=0.02, text="<b>DEVELOPING</b><br>(Low X & Low Y)",
-            showarrow=False, font=dict(color="grey", size=12), xanchor='left', yanchor='bottom'
-        )
+        def build_quadrant():
+            return figures.quadrant(overall_df, x_col, y_col, median_x, median_y, x_label, y_label)
 
-        fig_quad.update_layout(
-            xaxis_title=x_label, 
-            yaxis_title=y_label, 
-            margin=dict(l=0, r=0, t=40, b=0),
-            coloraxis_colorbar_title_text='Collab<br>Quality',
-            template="plotly_white",
-        )
-        
-        st.plotly_chart(fig_quad, use_container_width=True)
+        with prof.timer("tab2.quadrant", kind="figure"):
+            fig_quad = cached_figure('tab2.quadrant', x_col, build_quadrant, y_col=y_col, averages=mean_stat)
+        show_chart(fig_quad, "tab2.quadrant")
         
-        st.caption(f"ℹ️ **Note:** Bubble Size = Total Documents. Color = Collab-CNCI Score. Axes Medians are calculated from country-level aggregates.")
+        st.caption(f"ℹ️ **Note:** Bubble Size = Total Documents. Color = Collab-CNCI Score. Axes Medians are calculated from country-level aggregates. Document-weighted means let a 70,000-document year count more than a 2,000-document one.")
 
     # "3. Distribution Analysis"
-    with tab3: 
+    if active_section == SECTIONS[2]: 
         # --- Step 1 : Create Insight Box ---
         st.markdown("""
         <div class="insight-box blue-box">
@@ -420,16 +561,17 @@ if df is not None:
         target_metric_label = st.selectbox(
             "Select Metric to see distribution:", 
             list(METRICS_MAP_DIST.keys()), 
-            index=1, # <-- % Docs Cited
+            key=remember("dist_metric", "% Top 1% Documents (Excellence)") # <-- Default: % Top 1%
         )
         target_col = METRICS_MAP_DIST[target_metric_label]
 
         # --- Step 3 : Visualization ---
         st.markdown(f"#### Distribution of {target_metric_label}") # <-- title of chart
 
-        # Calculate Statistics
-        mean_val = df[target_col].mean()
-        median_val = df[target_col].median()
+        # Calculate Statistics (memoized per metric)
+        dist = cached('distribution', target_col, compute.distribution_summary, df, target_col, qindex)
+        mean_val = dist['mean']
+        median_val = dist['median']
         
         # Metrics Display
         m1, m2, m3 = st.columns(3)
@@ -437,46 +579,14 @@ if df is not None:
         m2.metric("Median (Typical)", f"{median_val:.2f}")
         
         # Determine Skewness for Insight
-        skew = df[target_col].skew()
+        skew = dist['skew']
         skew_text = "Symmetric (Balanced)" if -0.5 < skew < 0.5 else ("Right Skewed (Elite Few)" if skew > 0 else "Left Skewed (Most perform well)")
         m3.metric("Distribution Shape", skew_text)
 
         # Create Histogram Plot
-        fig_dist = px.histogram(
-            df, 
-            x=target_col, 
-            nbins=40, 
-            marginal='box', 
-            color_discrete_sequence=['#636EFA'], 
-            opacity=0.7,
-            title=f"Spread of {target_metric_label}"
-        )
-
-        # Add Lines
-        fig_dist.add_vline(x=mean_val, line_dash="dash", line_color="red")
-        fig_dist.add_vline(x=median_val, line_dash="dot", line_color="blue")
-        
-        # Add Annotations 
-        fig_dist.add_annotation(  # <-- Mean Label
-            x=mean_val, y=1.02, yref="paper", text="Mean", 
-            showarrow=False, font=dict(color="red")
-        )
-        fig_dist.add_annotation(  # <-- Median Label
-            x=median_val, y=0.95, yref="paper", text="Median", 
-            showarrow=False, font=dict(color="blue")
-        )
-
-        # Add Baseline Line only for relevant metrics
-        if target_col in ['CNCI', 'Collab-CNCI', '% Documents in Top 1%']:
-            baseline = 1.0
-            fig_dist.add_vline(x=baseline, line_dash="solid", line_color="green")
-            fig_dist.add_annotation(    # <-- Baseline Label
-                x=baseline, y=0.88, yref="paper", text="Global Baseline (1.0)", 
-                showarrow=False, font=dict(color="green")
-            )
-        
-        fig_dist.update_layout(height=450, xaxis_title=target_metric_label, yaxis_title='Frequency (Count)', showlegend=False)
-        st.plotly_chart(fig_dist, use_container_width=True)
+        with prof.timer("tab3.histogram", kind="figure"):
+            fig_dist = figures.histogram(df, target_col, target_metric_label, mean_val, median_val)
+        show_chart(fig_dist, "tab3.histogram")
 
         # --- Step 4 : Detailed Tables --- 
         t1, t2, t3 = st.columns(3)
@@ -485,30 +595,24 @@ if df is not None:
         with t1:
             st.markdown("###### 1. Statistical Summary")
             st.caption("Descriptive statistics for the entire dataset.")
-            stats_df = df[target_col].describe().to_frame(name='Value')
-            st.dataframe(stats_df, use_container_width=True)
+            st.dataframe(dist['stats'], use_container_width=True)
 
         # Table 2 : Consistency Check
         with t2:
             st.markdown("###### 2. Consistency Leaders")
             # Consistent means appearing in the Top 25% (75th Percentile) frequently
-            threshold = df[target_col].quantile(0.75)
+            threshold = dist['threshold']
             st.caption(f"Count of years where Country was in **Top 25%** (> {threshold:.2f}).")
-            consistent_performers = df[df[target_col] > threshold]['Country'].value_counts().head(5).to_frame(name='High Perf. Years')
-            st.dataframe(consistent_performers, use_container_width=True)
+            st.dataframe(dist['consistent'], use_container_width=True)
 
         # Table 3 : Peak Performance (Single Year)
         with t3:
             st.markdown("###### 3. Top 5 Single-Year Peaks")
             st.caption(f"Highest recorded values for {target_metric_label}.")
-            top_peaks = df.sort_values(by=target_col, ascending=False).head(5)[['Country', 'Year', target_col]]
-            # Formatting Value Column
-            top_peaks.rename(columns={target_col: 'Value'}, inplace=True)
-            top_peaks.index = range(1, 6)
-            st.dataframe(top_peaks, use_container_width=True)
+            st.dataframe(dist['peaks'], use_container_width=True)
 
     # "4. Competitive Landscape"
-    with tab4: 
+    if active_section == SECTIONS[3]: 
         # --- Step 1 : Create Insight Box ---
         st.markdown("""
         <div class="insight-box orange-box">
@@ -540,8 +644,7 @@ if df is not None:
             selected_metric_label = st.selectbox(
                 "Select Metric:",
                 list(METRICS.keys()),
-                index=0,
-                key='dominance_metric_select'
+                key=remember('dominance_metric_select', "Times Cited (Impact)")
             )
             selected_metric_col = METRICS[selected_metric_label]
 
@@ -551,6 +654,7 @@ if df is not None:
                 "Select View Type:",
                 ("Market View (Top 2 Overall)", "Rivalry View (Compare Specific Countries)"),
                 horizontal=True,
+                key=remember('dominance_view', "Market View (Top 2 Overall)")
             )
 
         # --- Step 4 : Visualization ---
@@ -559,39 +663,12 @@ if df is not None:
         if view_mode == "Market View (Top 2 Overall)":
             st.markdown(f"#### 1. Market View: Leader's Dominance - Top 2 by {selected_metric_label}") # <-- title of marketing view
             
-            gap_data = [] 
-            years = sorted(df['Year'].unique())
-            for y in years:
-                year_df = df[df['Year'] == y].sort_values(by=selected_metric_col, ascending=False)
-                if len(year_df) >= 2:
-                    leader, runner = year_df.iloc[0], year_df.iloc[1]
-                    
-                    leader_val = leader[selected_metric_col]
-                    runner_val = runner[selected_metric_col]
-                    total_val = leader_val + runner_val # <-- Total for Normalization
-
-                    # Formula: (Difference / Total) * 100 Normalized Margin (0-100%)
-                    gap_pct = ((leader_val - runner_val) / total_val) * 100 if total_val > 0 else 0
-                    
-                    gap_data.append({'Year': y, 'Leader': leader['Country'], 'Runner-Up': runner['Country'], 'Dominance %': gap_pct})
-            
-            gap_df = pd.DataFrame(gap_data) # <-- create new data frame for creating visual
+            # Top 2 per year in one pass. Formula: (Difference / Total) * 100 Normalized Margin (0-100%)
+            gap_df = cached('dominance', selected_metric_col, engine.top2_per_year, selected_metric_col)
 
-            fig_gap_line = px.line(gap_df, x='Year', y='Dominance %', markers=True, 
-                                   hover_data=['Leader', 'Runner-Up'])
-            
-            fig_gap_line.update_traces(line=dict(color='crimson', width=3), marker=dict(size=8))
-            
-            fig_gap_line.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="No Gap (Equal)") # <-- Reference line
-            
-            # Y-axis zero to 100
-            fig_gap_line.update_layout(
-                height=500, 
-                template='plotly_white', 
-                yaxis_title=f"Normalized Dominance (%)",
-                yaxis=dict(range=[0, 100]) # <--- Locked Range
-            )
-            st.plotly_chart(fig_gap_line, use_container_width=True)
+            with prof.timer("tab4.market", kind="figure"):
+                fig_gap_line = figures.market(gap_df)
+            show_chart(fig_gap_line, "tab4.market")
             
             # Create Caption
             st.caption("""
@@ -620,8 +697,7 @@ if df is not None:
             selected_countries = st.multiselect(
                 "Select countries to compare dominance trends:", 
                 available_countries, 
-                default=valid_defaults,
-                key='rivalry_country_select'
+                key=remember('rivalry_country_select', valid_defaults)
             )
 
             st.markdown(f"#### 2. Rivalry Trends: Pairwise Dominance - by {selected_metric_label}") # <-- title of rivalry trend view
@@ -631,50 +707,14 @@ if df is not None:
                 if trend_df.empty:
                     st.warning("No data found for the selected countries.")
                 else:
-                    dominance_data = []
-                    all_years = sorted(trend_df['Year'].unique())
+                    # Year x Country pivot -> pairwise dominance tensor (NumPy broadcasting)
+                    with prof.timer("tab4.rivalry", kind="compute"):
+                        dom_df = dominance.rivalry_dominance(trend_df, selected_metric_col, selected_countries)
                     
-                    for yr in all_years:
-                        yr_data = trend_df[trend_df['Year'] == yr]
-                        metrics_map = yr_data.set_index('Country')[selected_metric_col].to_dict()
-                        
-                        for c1, c2 in combinations(selected_countries, 2):
-                            if c1 in metrics_map and c2 in metrics_map:
-                                val1 = metrics_map[c1]
-                                val2 = metrics_map[c2]
-                                total = val1 + val2
-
-                                if val1 >= val2:
-                                    leader_val = val1
-                                    leader_name = c1
-                                    runner_name = c2
-                                else:
-                                    leader_val = val2
-                                    leader_name = c2
-                                    runner_name = c1
-                                
-                                if total > 0:
-                                    runner_val = val1 if leader_name == c2 else val2
-                                    dom_pct = ((leader_val - runner_val) / total) * 100 
-                                else:
-                                    dom_pct = 0.0 
-
-                                dominance_data.append({
-                                    'Year': yr, 'Pair': f"{c1} vs {c2}", 'Dominance %': dom_pct, 
-                                    'Leader': leader_name, 'Runner-Up': runner_name
-                                })
-                    
-                    if dominance_data:
-                        dom_df = pd.DataFrame(dominance_data)
-                        
-                        fig_dom_trend = px.line(
-                            dom_df, x='Year', y='Dominance %', color='Pair', markers=True,
-                            hover_data={'Dominance %': ':.1f', 'Leader': True, 'Runner-Up': True},
-                            template='plotly_white'
-                        )
-                        fig_dom_trend.add_hline(y=0, line_dash="dash", line_color="black", annotation_text="Equal Impact (0% Gap)")
-                        fig_dom_trend.update_layout(height=450, yaxis_title=f"Normalized Dominance (%)", yaxis=dict(range=[0, 100]))
-                        st.plotly_chart(fig_dom_trend, use_container_width=True)
+                    if not dom_df.empty:
+                        with prof.timer("tab4.rivalry", kind="figure"):
+                            fig_dom_trend = figures.rivalry(dom_df)
+                        show_chart(fig_dom_trend, "tab4.rivalry")
                         
                         st.caption("""
                         ℹ️ **How to read this chart:** 
@@ -693,7 +733,7 @@ if df is not None:
                 st.warning("Please select at least two countries to generate the trend comparison.")
 
     # "5. Outlier Analysis"
-    with tab5: 
+    if active_section == SECTIONS[4]: 
         # --- Step 1 : Create Insight Box ---
         st.markdown("""
         <div class="insight-box red-box">
@@ -716,80 +756,82 @@ if df is not None:
             "Collab-CNCI (Collab Quality)": 'Collab-CNCI',
             "% Top 1 Document % (Excellence)": '% Documents in Top 1%'
         }
-        selected_outlier_label = st.selectbox(
-            "Select Metric to Scan for Outliers:", 
-            list(METRICS_OUTLIER_MAP.keys())
-        )
+        OUTLIER_METHODS = {
+            "IQR (1.5× Fences)": 'iqr',
+            "MAD (Robust Z > 3.5)": 'mad'
+        }
+        OUTLIER_SCOPES = {
+            "Global": 'global',
+            "Per Country": 'country',
+            "Per Year": 'year',
+            "Rolling Window (Per Country)": 'rolling'
+        }
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            selected_outlier_label = st.selectbox(
+                "Select Metric to Scan for Outliers:", 
+                list(METRICS_OUTLIER_MAP.keys()),
+                key=remember("outlier_metric", "Document (Volume)")
+            )
+        with c2:
+            method_label = st.selectbox("Detection Method:", list(OUTLIER_METHODS.keys()), key=remember("outlier_method", "IQR (1.5× Fences)"))
+        with c3:
+            scope_label = st.selectbox("Compare Against:", list(OUTLIER_SCOPES.keys()), key=remember("outlier_scope", "Global"))
         outlier_col = METRICS_OUTLIER_MAP[selected_outlier_label]
+        outlier_method = OUTLIER_METHODS[method_label]
+        outlier_scope = OUTLIER_SCOPES[scope_label]
+
+        window = 7
+        if outlier_scope == 'rolling':
+            window = st.slider("Rolling Window (Years):", min_value=3, max_value=11, step=2, key=remember("outlier_window", 7))
 
         # --- Step 4 : Outlier Calculation
-        # Dynamic Calculation (IQR Method)
-        Q1 = df[outlier_col].quantile(0.25)
-        Q3 = df[outlier_col].quantile(0.75)
-        IQR = Q3 - Q1
-        upper_bound = Q3 + 1.5 * IQR
-        lower_bound = Q1 - 1.5 * IQR # Standard method includes lower bound too
+        # One batched scan covers all six metrics (memoized per method, scope & window)
+        outlier_scan = cached(
+            'outlier_scan', outlier_method, engine.outlier_scan, list(METRICS_OUTLIER_MAP.values()),
+            method=outlier_method, scope=outlier_scope, window=window
+        )
+        global_fences = outlier_scope == 'global'
+        upper_bound = outlier_scan['upper'][outlier_col].iloc[0]
+        lower_bound = outlier_scan['lower'][outlier_col].iloc[0] # Standard method includes lower bound too
         # Identify Outliers
-        outliers_df = df[(df[outlier_col] > upper_bound) | (df[outlier_col] < lower_bound)].copy()
-        # Determine Status for Color
-        def get_status(value):
-            if value > upper_bound: return 'High Outlier'
-            elif value < lower_bound: return 'Low Outlier'
-            else: return 'Normal'
-        df['Outlier_Status'] = df[outlier_col].apply(get_status)
+        outliers_df = outliers.outlier_rows(df, outlier_scan, outlier_col)
+        # Status for Color (vectorized categorical labels from the scan)
+        outlier_status = outlier_scan['labels'][outlier_col]
 
         # --- Step 5 : Dynamic Visualization ---
         st.markdown(f"#### Anomaly Detection in {selected_outlier_label}")
         col_chart, col_stats = st.columns([3, 1])
         
         with col_chart:
-            fig_out = px.scatter(
-                df, 
-                x='Year', 
-                y=outlier_col,
-                color='Outlier_Status',
-                color_discrete_map={'High Outlier': '#EF553B', 'Low Outlier': '#FFA15A', 'Normal': 'lightgrey'}, 
-                hover_name='Country', 
-                hover_data=['Year', outlier_col, 'Documents'],
-                size='Documents', # Bubble size represents Volume context
-                size_max=20
-            )
-            
-            # Add Threshold Line (Upper)
-            fig_out.add_hline(
-                y=upper_bound, 
-                line_dash="dash", 
-                line_color="red", 
-                annotation_text=f"Upper Limit ({upper_bound:.2f})",
-                annotation_position="top right"
-            )
-            
-            # Add Threshold Line (Lower) - Only if positive
-            if lower_bound > 0:
-                fig_out.add_hline(
-                    y=lower_bound, 
-                    line_dash="dash", 
-                    line_color="orange", 
-                    annotation_text=f"Lower Limit ({lower_bound:.2f})", 
-                    annotation_position="bottom right"
+            with prof.timer("tab5.outliers", kind="figure"):
+                fig_out = figures.outlier_scatter(
+                    df, outlier_col, outlier_status, lower_bound, upper_bound,
+                    global_fences=global_fences, point_limit=point_limit
                 )
-            
-            fig_out.update_layout(template='plotly_white', height=500)
-            st.plotly_chart(fig_out, use_container_width=True)
+            show_chart(fig_out, "tab5.outliers")
 
         with col_stats:
             st.markdown("#### Stats")
-            st.metric("Upper Threshold", f"{upper_bound:.2f}")
-            if lower_bound > 0:
-                st.metric("Lower Threshold", f"{lower_bound:.2f}")
+            if global_fences:
+                st.metric("Upper Threshold", f"{upper_bound:.2f}")
+                if lower_bound > 0:
+                    st.metric("Lower Threshold", f"{lower_bound:.2f}")
+            else:
+                st.caption(f"Fences computed {scope_label.lower()}.")
             st.metric("Total Outliers", f"{len(outliers_df)}")
             st.info("Note: Bubble size represents Publication Volume.")
 
+            # Same method across every metric (already computed by the batched scan)
+            scan_summary = outlier_scan['counts'].rename(index={v: k for k, v in METRICS_OUTLIER_MAP.items()})
+            st.dataframe(scan_summary, use_container_width=True)
+
         # --- Step 6 : Outlier Table ---
         if not outliers_df.empty:
             st.markdown(f"#### Detected Anomalies in {selected_outlier_label}")
             # Clean up table for display
-            display_outliers = outliers_df[['Country', 'Year', outlier_col]].sort_values(by=outlier_col, ascending=False)
+            display_cols = ['Country', 'Year', outlier_col] + ([] if global_fences else ['Lower Fence', 'Upper Fence'])
+            display_outliers = outliers_df[display_cols].sort_values(by=outlier_col, ascending=False)
             # Rename column for clarity
             display_outliers.rename(columns={outlier_col: f"Value ({outlier_col})"}, inplace=True)
             st.dataframe(
@@ -801,7 +843,7 @@ if df is not None:
             st.success(f"✅ No statistical outliers detected for {selected_outlier_label}. The data is consistently distributed.")
 
     # "6. Correlation Analysis"
-    with tab6:
+    if active_section == SECTIONS[5]:
         # --- Step 1 : Create Insight Box
         st.markdown("""
         <div class="insight-box purple-box">
@@ -817,8 +859,6 @@ if df is not None:
         """, unsafe_allow_html=True)
         
         # --- Step 2 : Create Metric Drop Down
-        if '% Documents in Top 10%' not in df.columns:
-            df['% Documents in Top 10%'] = df['% Documents in Top 1%'] * 3.5 
         CORR_METRICS = {
             "Documents (Volume)": 'Documents',
             "CNCI (Quality)": 'CNCI',
@@ -832,64 +872,71 @@ if df is not None:
         c1, c2, c3 = st.columns([1.5, 1.5, 1])
         
         with c1:
-            x_label = st.selectbox("Select X-Axis Metric:", list(CORR_METRICS.keys()), index=0)
+            x_label = st.selectbox("Select X-Axis Metric:", list(CORR_METRICS.keys()), key=remember("corr_x", "Documents (Volume)"))
             x_col = CORR_METRICS[x_label]
             
         with c2:
             # Default index set to 2 (Times Cited) to show strong correlation initially
-            y_label = st.selectbox("Select Y-Axis Metric:", list(CORR_METRICS.keys()), index=2)
+            y_label = st.selectbox("Select Y-Axis Metric:", list(CORR_METRICS.keys()), key=remember("corr_y", "Times Cited (Impact)"))
             y_col = CORR_METRICS[y_label]
 
         # --- Step 3 : Calculation for Correlation ratio ---
-        r_value = df[x_col].corr(df[y_col])
+        # Every pair, method, p-value, bootstrap CI and OLS line at once (memoized per dataset version)
+        CORR_BOOTSTRAPS = 1000
+        corr = cached('correlation_suite', 'all', correlation.correlation_suite, df, list(CORR_METRICS.values()), n_boot=CORR_BOOTSTRAPS)
+        r_value = corr['matrices']['pearson'].loc[x_col, y_col]
         
         # Determine Relationship Strength for Color/Text
-        if abs(r_value) >= 0.7:
-            strength_text = "Strong Relationship"
-            trend_color = "green"
-        elif abs(r_value) >= 0.4:
-            strength_text = "Moderate Relationship"
-            trend_color = "blue"
-        else:
-            strength_text = "Weak/No Relationship"
-            trend_color = "red"
+        strength_text, _ = figures.correlation_strength(r_value)
 
         with c3:
             st.metric(f"Pearson Correlation (r)", f"{r_value:.4f}", delta=strength_text)
 
+        # Significance & robustness of the selected pair
+        ci_label = f"{corr['ci']:.0%} CI (Bootstrap)"
+        corr_tests = resampled(
+            'correlation_resampling', 'all', resampling.correlation_resampling, df, list(CORR_METRICS.values()),
+            n_perm=RESAMPLES, n_boot=CORR_BOOTSTRAPS
+        )
+        m1, m2, m3, m4, m5 = st.columns(5)
+        m1.metric("Spearman (ρ)", f"{corr['matrices']['spearman'].loc[x_col, y_col]:.4f}")
+        m2.metric("Kendall (τ)", f"{corr['matrices']['kendall'].loc[x_col, y_col]:.4f}")
+        m3.metric("p-value (Pearson)", f"{corr['pvalues']['pearson'].loc[x_col, y_col]:.2g}")
+        m4.metric("p-value (Permutation)", f"{corr_tests['perm_pvalues'].loc[x_col, y_col]:.2g}")
+        m5.metric(ci_label, f"[{corr['ci_low']['pearson'].loc[x_col, y_col]:.2f}, {corr['ci_high']['pearson'].loc[x_col, y_col]:.2f}]")
+
         # --- Step 4 : Dynamic Visualization ---
         st.markdown(f"#### Correlation Analysis - {x_label} vs {y_label}")
-        try:
-            trend_mode = "ols"
-        except:
-            trend_mode = None # <-- fallback if statsmodels is missing
 
         # Create Scatter Plot
-        fig_corr = px.scatter(
-            df, 
-            x=x_col, 
-            y=y_col, 
-            hover_name='Country',
-            hover_data=['Year'],
-            trendline=trend_mode,
-            labels={x_col: x_label, y_col: y_label},
-            opacity=0.65
-        )
-
-        # Styling the Trendline
-        if trend_mode:
-            fig_corr.update_traces(selector=dict(mode='lines'), line=dict(color=trend_color, width=3))
-        
-        # Customize Markers
-        fig_corr.update_traces(marker=dict(size=10, line=dict(width=1, color='DarkSlateGrey')))
-        
-        fig_corr.update_layout(height=550, template='plotly_white')
-        st.plotly_chart(fig_corr, use_container_width=True)
+        with prof.timer("tab6.scatter_ols", kind="figure"):
+            fig_corr = figures.correlation_scatter(df, x_col, y_col, x_label, y_label, corr, corr_tests, point_limit=point_limit)
+        show_chart(fig_corr, "tab6.scatter_ols")
         
         st.info(f"💡 **Interpretation:** As **{x_label}** increases, **{y_label}** tends to change by a factor of **{r_value:.2f}**. (1.0 is perfect positive, -1.0 is perfect negative, 0 is no relation).")
 
+        # --- Step 5 : Full Correlation Matrix ---
+        st.markdown("#### Correlation Matrix (All Metrics)")
+        corr_method = st.radio(
+            "Method:",
+            ["Pearson", "Spearman", "Kendall"],
+            horizontal=True,
+            key=remember("corr_method", "Pearson")
+        )
+
+        def build_matrix():
+            matrix = corr['matrices'][corr_method.lower()].rename(
+                index={v: k for k, v in CORR_METRICS.items()}, columns={v: k for k, v in CORR_METRICS.items()}
+            )
+            return figures.correlation_matrix(matrix, corr_method)
+
+        with prof.timer("tab6.matrix", kind="figure"):
+            fig_matrix = cached_figure('tab6.matrix', corr_method, build_matrix)
+        show_chart(fig_matrix, "tab6.matrix")
+        st.caption(f"ℹ️ **Note:** {corr['n']} country-years. Confidence intervals use {CORR_BOOTSTRAPS} bootstrap resamples; the permutation p-value uses {RESAMPLES:,} shuffles.")
+
     # "7. Performance Trends" 
-    with tab7:
+    if active_section == SECTIONS[6]:
         # --- Step 1 : Insight Box ---
         st.markdown("""
         <div class="insight-box green-box">
@@ -917,14 +964,15 @@ if df is not None:
                 "Collab-CNCI (Collab Quality)": 'Collab-CNCI',
                 "% Top 1% Documents (Excellence)": '% Documents in Top 1%'
             }
-            selected_metric_label = st.selectbox("Select Metric:", list(METRICS_MAP.keys()))
+            selected_metric_label = st.selectbox("Select Metric:", list(METRICS_MAP.keys()), key=remember("trend_metric", "Documents (Volume)"))
             selected_col = METRICS_MAP[selected_metric_label]
         # 2. View Type Toggle (Always Visible - moved up to control visibility of country select)
         with col_controls1:
             view_option = st.radio(
                 "Select View Type:",
                 ("View Trends Over Time", "View Overall Performance", "View Geographic Map"), 
-                horizontal=True
+                horizontal=True,
+                key=remember("trend_view", "View Trends Over Time")
             )
 
         # --- Step 3 : Logic for Aggregation & Defaults ---
@@ -942,16 +990,15 @@ if df is not None:
         
         if view_option != "View Geographic Map":
             # Calculate Defaults based on Global Top 10
-            rank_df = df.groupby('Country')[selected_col].agg(agg_func_rank).sort_values(ascending=False).head(10)
-            top_10_countries_list = rank_df.index.tolist()
+            rank_df = aggregates.leaderboard(cube, selected_col, agg_func_rank, top=10)
+            top_10_countries_list = rank_df['Country'].tolist()
             available_countries = sorted(df['Country'].unique().tolist())
             
             # Show Multiselect
             selected_countries = st.multiselect(
                 "Select Countries to Compare:", 
                 available_countries, 
-                default=top_10_countries_list, 
-                key=f"multiselect_{selected_metric_label}" 
+                key=remember(f"multiselect_{selected_metric_label}", top_10_countries_list)
             )
         else:
             st.info("**Global View Active:** Showing data for all countries on the map.")          # <-- Map Mode Message
@@ -969,19 +1016,9 @@ if df is not None:
             st.markdown(f"#### Trend Analysis: {selected_metric_label}")
             
             if not df_visual.empty:
-                fig_trend = px.line(
-                    df_visual, 
-                    x='Year', 
-                    y=selected_col, 
-                    color='Country', 
-                    markers=True,
-                    hover_data=['Documents'] 
-                )
-                if selected_col in ['CNCI', 'Collab-CNCI']:
-                    fig_trend.add_hline(y=1.0, line_dash="dash", line_color="red", annotation_text="Global Baseline (1.0)")
-                
-                fig_trend.update_layout(height=500, template='plotly_white', xaxis_title="Year", yaxis_title=selected_metric_label)
-                st.plotly_chart(fig_trend, use_container_width=True)
+                with prof.timer("tab7.trend", kind="figure"):
+                    fig_trend = figures.trend(df_visual, selected_col, selected_metric_label)
+                show_chart(fig_trend, "tab7.trend")
             else:
                 st.warning("Please select at least one country above to view trends.")
             
@@ -991,47 +1028,65 @@ if df is not None:
             with trend_col1:
                 st.markdown(f"##### Yearly Global Leaderboard: Top 10 in {selected_metric_label}")
             with trend_col2:
-                available_years = sorted(df['Year'].unique(), reverse=True)
-                target_year = st.selectbox("Select Year for Ranking:", available_years)
+                available_years = sorted(df['Year'].unique().tolist(), reverse=True)
+                target_year = st.selectbox("Select Year for Ranking:", available_years, key=remember("trend_year", available_years[0]))
 
-            top_10_year = df[df['Year'] == target_year].sort_values(by=selected_col, ascending=False).head(10)
+            rank_tensor = slice_ranks if slice_ranks is not None else load_ranks(DATA_VERSION, *DATA_FIELD)
+            top_10_year = cached('year_top', selected_col, engine.year_top, selected_col, year=int(target_year), k=10)
             
             display_df = top_10_year[['Country', selected_col]].copy()
             display_df.rename(columns={selected_col: selected_metric_label}, inplace=True)
+            display_df['vs Previous Year'] = [
+                "–" if np.isnan(change) else ("▲ " if change > 0 else "▼ " if change < 0 else "= ") + f"{abs(int(change))}"
+                for change in top_10_year['Rank Change']
+            ]
             display_df.index = range(1, len(display_df) + 1)
             st.table(display_df)
 
+            # Rank movements & history (precomputed rank tensor)
+            move_col1, move_col2 = st.columns([1, 2])
+            with move_col1:
+                st.markdown(f"##### Biggest Climbers into {target_year}")
+                climbers = rank_tensor.climbers(selected_col, target_year, k=5)
+                if climbers.empty:
+                    st.caption("No previous year to compare against.")
+                else:
+                    st.dataframe(climbers, hide_index=True, use_container_width=True)
+            with move_col2:
+                history_country = st.selectbox(
+                    "Rank History for Country:",
+                    list(rank_tensor.countries),
+                    key=remember("rank_history_country", "INDIA" if "INDIA" in rank_tensor.countries else rank_tensor.countries[0])
+                )
+                history_df = rank_tensor.history(history_country, list(METRICS_MAP.values()))
+                with prof.timer("tab7.rank_history", kind="figure"):
+                    fig_history = figures.rank_history(history_df, history_country)
+                show_chart(fig_history, "tab7.rank_history")
+
 
         # VIEW 2 : Overall Performance
         elif view_option == "View Overall Performance":
             st.markdown(f"#### Overall Performance: {selected_metric_label}")
             
             if not df_visual.empty:
-                df_visual_agg = df_visual.groupby('Country')[selected_col].agg(agg_func_rank).reset_index()
-                df_visual_agg = df_visual_agg.sort_values(by=selected_col, ascending=True) 
-
-                fig_overall = px.bar(
-                    df_visual_agg, 
-                    y='Country', 
-                    x=selected_col, 
-                    orientation='h', 
-                    color='Country', 
-                    text_auto=fmt,
-                )
-                if selected_col in ['CNCI', 'Collab-CNCI']:
-                    fig_overall.add_vline(x=1.0, line_dash="dash", line_color="red", annotation_text="Global Baseline")
-                
-                fig_overall.update_layout(height=500, template='plotly_white', xaxis_title=f"Total/Avg {selected_metric_label}", showlegend=False)
-                st.plotly_chart(fig_overall, use_container_width=True)
+                df_visual_agg = aggregates.leaderboard(cube, selected_col, agg_func_rank, countries=selected_countries, ascending=True)
+
+                with prof.timer("tab7.overall", kind="figure"):
+                    fig_overall = figures.overall(df_visual_agg, selected_col, selected_metric_label, fmt)
+                show_chart(fig_overall, "tab7.overall")
             else:
                 st.warning("Please select at least one country above to view performance.")
 
             # Overall Table Logic
             st.markdown(f"##### Lifetime Global Leaderboard: Top 10 Overall {selected_metric_label}")
-            df_global_agg = df.groupby('Country')[selected_col].agg(agg_func_rank).reset_index()
-            top_10_overall = df_global_agg.sort_values(by=selected_col, ascending=False).head(10)
+            top_10_overall = aggregates.leaderboard(cube, selected_col, agg_func_rank, top=10)
             display_overall = top_10_overall[['Country', selected_col]].copy()
             display_overall.rename(columns={selected_col: selected_metric_label}, inplace=True)
+            # How stable is each position? (bootstrap over years)
+            rank_ci = resampled('rank_boot', selected_col, resampling.rank_bootstrap, df, selected_col, how=agg_func_rank, n_reps=RESAMPLES)
+            display_overall['Rank (95% CI)'] = [
+                f"{rank_ci.at[c, 'Rank Low']}–{rank_ci.at[c, 'Rank High']}" for c in top_10_overall['Country']
+            ]
             display_overall.index = range(1, len(display_overall) + 1)
             st.table(display_overall)
 
@@ -1042,37 +1097,34 @@ if df is not None:
             st.caption(f"Visualizing Lifetime **{agg_func_rank.title()}** of {selected_metric_label} across the globe.")
 
             # 1. Aggregate Data for Map
-            map_df = df.groupby('Country')[selected_col].agg(agg_func_rank).reset_index()
+            map_df = aggregates.leaderboard(cube, selected_col, agg_func_rank)
             
             # 2. Create Map
-            fig_map = px.choropleth(
-                map_df,
-                locations="Country",
-                locationmode='country names',
-                color=selected_col,
-                hover_name="Country",
-                color_continuous_scale="Viridis_r" if agg_func_rank == 'mean' else "Plasma", # Different themes for volume/quality
-            )
-
-            fig_map.update_geos(
-                visible=True,
-                resolution=50,
-                showcountries=True, countrycolor="black",
-                showcoastlines=True, coastlinecolor="black",
-                showlakes=False,
-                projection_type="natural earth" # Looks like a 3D-ish flat map
-            )
-
-            fig_map.update_layout(
-                height=600,
-                margin={"r":0,"t":40,"l":0,"b":0},
-                paper_bgcolor="white", # Chart background black
-                font_color="black",    # Text white
-                coloraxis_colorbar=dict(
-                    title=f"{selected_metric_label}",
-                    tickfont=dict(color="black"),
-                    title_font=dict(color="black")
-                )
-            )
-
-            st.plotly_chart(fig_map, use_container_width=True)
\ No newline at end of file
+            def build_map():
+                return figures.choropleth(map_df, selected_col, selected_metric_label, agg_func_rank)
+
+            with prof.timer("tab7.choropleth", kind="figure"):
+                fig_map = cached_figure('tab7.choropleth', selected_col, build_map, how=agg_func_rank, label=selected_metric_label)
+            show_chart(fig_map, "tab7.choropleth")
+
+    prof.record(f"section:{active_section}", "section", time.perf_counter() - section_start)
+
+    # --- Profiling Panel (opt-in) ---
+    if prof.enabled:
+        with st.sidebar:
+            st.markdown("---")
+            st.header("⏱️ Rerun Profile")
+            st.metric("Script Time", f"{prof.total_ms():.0f} ms")
+            st.dataframe(prof.to_frame().style.format({'ms': '{:.1f}'}), hide_index=True, use_container_width=True)
+            fig_stats = figure_cache().stats()
+            st.caption(f"Figure cache: {fig_stats['entries']} figures, {fig_stats['points']:,} points, hit rate {fig_stats['hit_rate']:.0%}")
+            metrics_text = profiling.prometheus_text()
+            with st.expander("Prometheus Export (process totals)"):
+                st.code(metrics_text, language="text")
+            st.download_button("Download Metrics", metrics_text, file_name="dashboard_metrics.prom")
+        prof.log(section=active_section, version=DATA_VERSION) # <-- JSON lines on the 'dashboard.profile' logger
+
+    # --- Background prefetch for the hidden sections (once per session) ---
+    if not st.session_state.get("prefetch_started"):
+        st.session_state["prefetch_started"] = True
+        threading.Thread(target=prefetch_sections, args=(compute_cache(), DATA_VERSION, DATA_FIELD, DATA_SLICE, df, qindex), daemon=True).start()
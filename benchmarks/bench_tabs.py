@@ -0,0 +1,335 @@
+"""
+Benchmark harness for the compute path of every dashboard tab.
+
+Runs each tab's computational core (no Streamlit) against synthetic datasets
+scaled from the cleaned_publications.csv schema and reports wall time, peak
+traced memory and allocated blocks as JSON.
+
+Usage:
+    python -m benchmarks.bench_tabs                          # scales 1, 10, 100, 1000
+    python -m benchmarks.bench_tabs --scales 1 10 --out run.json
+    python -m benchmarks.bench_tabs --compare baseline.json  # print ratios vs an earlier run
+"""
+import argparse
+import json
+import platform
+import statistics
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from analytics import aggregates, backends, compute, correlation, derived, dominance, etl, outliers, quantiles, ranks, resampling, shared, slicing, star, store
+
+RIVALRY_K = 32  # <-- countries compared in the Rivalry View path
+OUTLIER_COLUMNS = ['Documents', 'CNCI', 'Times Cited', '% Docs Cited', 'Collab-CNCI', '% Documents in Top 1%']
+CORR_COLUMNS = OUTLIER_COLUMNS + ['% Documents in Top 10%']
+
+COUNT_COLUMNS = ['Documents', 'Times Cited', 'Documents in Top 1%', 'Documents in Top 10%']
+RATIO_COLUMNS = ['CNCI', 'Collab-CNCI', '% Docs Cited', '% Documents in Top 1%', '% Documents in Top 10%']
+
+QUADRANT_RULES = {
+    'Documents': 'sum',
+    'Times Cited': 'sum',
+    'CNCI': 'mean',
+    'Collab-CNCI': 'mean',
+    '% Docs Cited': 'mean',
+    '% Documents in Top 1%': 'mean'
+}
+
+
+# -----------------------------------------------------------------------------
+# SYNTHETIC DATA
+# -----------------------------------------------------------------------------
+def synthetic_frame(base, scale, seed=0):
+    """`base` replicated `scale` times as new countries, metrics jittered (x scale rows and countries)."""
+    if scale == 1:
+        return base.copy()
+    rng = np.random.default_rng(seed)
+    n = len(base)
+    copy_id = np.repeat(np.arange(scale), n)
+    df = base.iloc[np.tile(np.arange(n), scale)].reset_index(drop=True)
+
+    names = base['Country'].astype(str).to_numpy()[np.tile(np.arange(n), scale)]
+    df['Country'] = pd.Categorical(np.char.add(np.char.add(names.astype(str), '-'), copy_id.astype(str)))
+
+    noise = rng.lognormal(mean=0.0, sigma=0.15, size=(len(df), len(COUNT_COLUMNS) + len(RATIO_COLUMNS)))
+    for i, col in enumerate(COUNT_COLUMNS):
+        df[col] = np.round(df[col].to_numpy(dtype='float64') * noise[:, i]).astype(df[col].dtype)
+    for j, col in enumerate(RATIO_COLUMNS):
+        df[col] = (df[col].to_numpy(dtype='float64') * noise[:, len(COUNT_COLUMNS) + j]).astype(df[col].dtype)
+    return df
+
+
+# -----------------------------------------------------------------------------
+# TAB COMPUTE PATHS (mirror app.py, minus Streamlit and Plotly)
+# -----------------------------------------------------------------------------
+def path_cube(df, ctx):
+    return aggregates.build_country_cube(df)
+
+
+def path_shared_cube(df, ctx):
+    return shared.attach('bench', ctx['shared_cube'], root=ctx['shared_root'])  # <-- vs load.cube: mmap instead of rebuild
+
+
+def path_quantiles(df, ctx):
+    return quantiles.QuantileIndex(df, [c for c in aggregates.METRIC_COLUMNS if c in df.columns])
+
+
+def path_ranks(df, ctx):
+    return ranks.RankTensor(df, aggregates.METRIC_COLUMNS)
+
+
+def path_moments(df, ctx):
+    return aggregates.build_moments(df)
+
+
+def path_moment_rollup(df, ctx):
+    # Document-weighted country means over the last five years, straight from the moments
+    years = ctx['moments'].index.get_level_values('Year')
+    return aggregates.moment_means(aggregates.rollup(ctx['moments'], mask=years > ctx['last_year'] - 5), weighted=True)
+
+
+def path_star(df, ctx):
+    # Star schema over a Category x Doc Type split of the fact table (4 fields x 2 types per row)
+    facts = pd.concat([df.assign(Category=f'Field {i % 4}', **{'Doc Type': 'Article' if i < 4 else 'Review'}) for i in range(8)],
+                      ignore_index=True)
+    return star.StarSchema(facts)
+
+
+def path_star_field(df, ctx):
+    return ctx['star'].frame('Field 1', star.ALL)
+
+
+def path_slicer(df, ctx):
+    return slicing.SliceIndex(df, aggregates.METRIC_COLUMNS)
+
+
+def path_slice(df, ctx):
+    # Sidebar filter of the last ten years: row block, cube from prefix sums, quantiles from presorted orders
+    years = (ctx['last_year'] - 9, ctx['last_year'])
+    slicer = ctx['slicer']
+    return slicer.rows(years), slicer.cube(years), slicer.quantile_index(years)
+
+
+def path_pareto(df, ctx):
+    return aggregates.pareto_table(ctx['cube'], 'Times Cited')
+
+
+def path_pareto_bootstrap(df, ctx):
+    return resampling.pareto_bootstrap(df, 'Times Cited', n_reps=2000, n_jobs=1)
+
+
+def path_benchmark_labels(df, ctx):
+    threshold = ctx['qindex'].column('Documents').median()
+    return derived.threshold_labels(df['Documents'], threshold, 'Below Median', 'Above Median')
+
+
+def path_quadrant(df, ctx):
+    overall_df = aggregates.country_frame(ctx['cube'], QUADRANT_RULES)
+    return compute.quadrant_medians(overall_df, 'Documents', 'CNCI')
+
+
+def path_distribution(df, ctx):
+    return compute.distribution_summary(df, '% Documents in Top 1%', ctx['qindex'])
+
+
+def path_market(df, ctx):
+    return dominance.market_dominance(df, 'Times Cited')
+
+
+def path_rivalry(df, ctx):
+    return dominance.rivalry_dominance(df, 'Times Cited', ctx['rivals'])
+
+
+def path_outliers(df, ctx):
+    return outliers.scan(df, OUTLIER_COLUMNS, method='iqr', scope='global')
+
+
+def path_outliers_country(df, ctx):
+    return outliers.scan(df, OUTLIER_COLUMNS, method='mad', scope='country')
+
+
+def path_outliers_rolling(df, ctx):
+    return outliers.scan(df, OUTLIER_COLUMNS, method='iqr', scope='rolling', window=7)
+
+
+def path_correlation_suite(df, ctx):
+    return correlation.correlation_suite(df, CORR_COLUMNS, n_boot=1000)
+
+
+def path_rank_bootstrap(df, ctx):
+    return resampling.rank_bootstrap(df, 'Documents', how='sum', n_reps=2000, n_jobs=1)
+
+
+def path_duckdb_pareto(df, ctx):
+    return ctx['duckdb'].pareto('Times Cited')
+
+
+def path_duckdb_quadrant(df, ctx):
+    return ctx['duckdb'].quadrant(QUADRANT_RULES, 'Documents', 'CNCI')
+
+
+def path_duckdb_year_top(df, ctx):
+    return ctx['duckdb'].year_top('Documents', ctx['last_year'], k=10)
+
+
+def path_leaderboards(df, ctx):
+    overall = aggregates.leaderboard(ctx['cube'], 'Documents', top=10)
+    yearly = ctx['ranks'].top_k('Documents', ctx['last_year'], k=10)
+    return overall, yearly
+
+
+PATHS = [
+    ('load.cube', path_cube),
+    ('load.shared_cube', path_shared_cube),
+    ('load.quantiles', path_quantiles),
+    ('load.ranks', path_ranks),
+    ('load.moments', path_moments),
+    ('load.star', path_star),
+    ('star.field_frame', path_star_field),
+    ('load.slicer', path_slicer),
+    ('filter.slice', path_slice),
+    ('tab1.pareto', path_pareto),
+    ('tab1.pareto_bootstrap', path_pareto_bootstrap),
+    ('tab1.benchmark_labels', path_benchmark_labels),
+    ('tab2.quadrant', path_quadrant),
+    ('tab2.moment_rollup', path_moment_rollup),
+    ('tab3.distribution', path_distribution),
+    ('tab4.market', path_market),
+    ('tab4.rivalry', path_rivalry),
+    ('tab5.outliers', path_outliers),
+    ('tab5.outliers_country', path_outliers_country),
+    ('tab5.outliers_rolling', path_outliers_rolling),
+    ('tab6.correlation_suite', path_correlation_suite),
+    ('tab7.leaderboards', path_leaderboards),
+    ('tab7.rank_bootstrap', path_rank_bootstrap),
+    ('duckdb.pareto', path_duckdb_pareto),
+    ('duckdb.quadrant', path_duckdb_quadrant),
+    ('duckdb.year_top', path_duckdb_year_top),
+]
+
+
+# -----------------------------------------------------------------------------
+# MEASUREMENT
+# -----------------------------------------------------------------------------
+def measure(fn, df, ctx, repeats):
+    fn(df, ctx)  # <-- warm-up (imports, lazy caches)
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(df, ctx)
+        times.append((time.perf_counter() - start) * 1000)
+
+    # Memory in a separate traced run (tracing slows the timed runs down)
+    tracemalloc.start()
+    before_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.reset_peak()
+    result = fn(df, ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    after_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    del result
+
+    return {
+        'wall_ms_min': min(times),
+        'wall_ms_median': statistics.median(times),
+        'peak_kib': peak / 1024,
+        'alloc_blocks': after_blocks - before_blocks,  # <-- blocks still held by the result
+    }
+
+
+def run(scales, repeats, paths=None):
+    base = store.load_frame().drop(columns=etl.state_columns())  # <-- jittered metrics would no longer match the ETL state
+    selected = [(name, fn) for name, fn in PATHS if not paths or name in paths]
+    if backends.duckdb is None:
+        selected = [(name, fn) for name, fn in selected if not name.startswith('duckdb.')]  # <-- optional dependency
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+        for scale in scales:
+            df = synthetic_frame(base, scale)
+            ctx = {
+                'cube': aggregates.build_country_cube(df),
+                'qindex': path_quantiles(df, None),
+                'ranks': path_ranks(df, None),
+                'moments': path_moments(df, None),
+                'slicer': path_slicer(df, None),
+                'star': path_star(df, None),
+                'rivals': df['Country'].astype(str).drop_duplicates().head(RIVALRY_K).tolist(),
+                'last_year': int(df['Year'].max()),
+                'shared_root': workdir,
+                'shared_cube': f'cube-x{scale}',
+            }
+            shared.publish('bench', ctx['shared_cube'], ctx['cube'], root=workdir)
+            if any(name.startswith('duckdb.') for name, _ in selected):
+                path = os.path.join(workdir, f'facts-x{scale}.parquet')
+                df.to_parquet(path, index=False)
+                ctx['duckdb'] = backends.DuckDBBackend(backends.connect(), path, df)
+            for name, fn in selected:
+                row = {'path': name, 'scale': scale, 'rows': len(df), 'countries': int(df['Country'].nunique())}
+                row.update(measure(fn, df, ctx, repeats))
+                results.append(row)
+                print(f"{name:<24} x{scale:<5} {row['wall_ms_median']:>10.2f} ms  {row['peak_kib']:>10.0f} KiB", file=sys.stderr)
+    return results
+
+
+def run_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+    }
+
+
+def compare(current, baseline):
+    """Print median wall time / peak memory ratios (current / baseline) per (path, scale)."""
+    old = {(r['path'], r['scale']): r for r in baseline['results']}
+    print(f"{'path':<24} {'scale':>6} {'time x':>8} {'mem x':>8}")
+    for row in current['results']:
+        ref = old.get((row['path'], row['scale']))
+        if ref is None:
+            continue
+        t = row['wall_ms_median'] / ref['wall_ms_median'] if ref['wall_ms_median'] else float('nan')
+        m = row['peak_kib'] / ref['peak_kib'] if ref['peak_kib'] else float('nan')
+        print(f"{row['path']:<24} {row['scale']:>6} {t:>8.2f} {m:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's per-tab compute paths.")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--paths', nargs='+', help="Only run these paths (e.g. tab4.market tab4.rivalry).")
+    parser.add_argument('--out', help="Write the JSON report here instead of stdout.")
+    parser.add_argument('--compare', help="Earlier JSON report to compare against.")
+    args = parser.parse_args()
+
+    report = {'meta': run_metadata(), 'results': run(args.scales, args.repeats, args.paths)}
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import etl, store
+
+RAW_COLUMNS = {
+    'Web of Science Documents': 'int',
+    'Times Cited': 'int',
+    'Documents in Top 1%': 'int',
+    'Documents in Top 10%': 'int',
+    'Category Normalized Citation Impact': 'float',
+    'Collab-CNCI': 'float',
+    '% Docs Cited': 'float',
+    '% Documents in Top 1%': 'float',
+    '% Documents in Top 10%': 'float',
+    'Rank': 'int',
+}
+COUNTRIES = ['INDIA', 'CHINA', 'ENGLAND', 'UNITED KINGDOM', 'BRAZIL', 'JAPAN']
+
+
+def make_raw_export(n=60, seed=0, years=(2019, 2020, 2021), **dimensions):
+    """Synthetic Web of Science export in the raw column layout."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Name': rng.choice(COUNTRIES, n),
+        'year': rng.choice(list(years), n),
+    })
+    for col, kind in RAW_COLUMNS.items():
+        df[col] = rng.integers(1, 500, n) if kind == 'int' else rng.uniform(0.2, 3.0, n).round(3)
+    for col, members in dimensions.items():
+        df[col] = rng.choice(members, n)
+    return df
+
+
+def write_exports(folder, *exports):
+    folder.mkdir(exist_ok=True)
+    for i, export in enumerate(exports):
+        export.to_csv(folder / f'export-{i}.csv', index=False)
+    return [str(folder / '*.csv')]
+
+
+@pytest.fixture
+def raw_export():
+    return make_raw_export
+
+
+@pytest.fixture
+def build_facts(tmp_path):
+    """Raw exports -> ETL -> typed store -> facts, all under tmp_path."""
+    def build(*exports):
+        sources = write_exports(tmp_path / 'raw', *exports)
+        clean = str(tmp_path / 'clean.csv')
+        etl.run_pipeline(sources, out_path=clean, manifest_path=str(tmp_path / 'manifest.json'))
+        store_path = str(tmp_path / 'store.feather')
+        return store.load_facts(csv_path=clean, store_path=store_path, meta_path=store_path + '.json')
+    return build
+
+
+@pytest.fixture
+def facts(build_facts):
+    """Country x Year facts over ten years (no Field / Document Type dimensions)."""
+    return build_facts(make_raw_export(n=400, years=range(2010, 2020)))
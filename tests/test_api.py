@@ -0,0 +1,149 @@
+import asyncio
+import functools
+import json
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+pytest.importorskip('starlette')
+
+from analytics import api, store
+
+
+def get(app, url, headers=()):
+    """One GET through the ASGI app -> (status, headers, body); no HTTP client needed."""
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': query.encode(), 'headers': [(k.lower().encode(), v.encode()) for k, v in headers],
+        'client': ('testclient', 50000), 'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    body = b''.join(m.get('body', b'') for m in messages[1:])
+    return start['status'], {k.decode(): v.decode() for k, v in start['headers']}, body
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, raw_export, build_facts):
+    build_facts(raw_export(n=300, years=range(2010, 2020), Category=['Physics', 'Medicine']))
+    paths = {'csv_path': str(tmp_path / 'clean.csv'), 'store_path': str(tmp_path / 'store.feather'),
+             'meta_path': str(tmp_path / 'store.feather.json')}
+    monkeypatch.setattr(api, 'store', types.SimpleNamespace(
+        ensure_store=functools.partial(store.ensure_store, **paths),
+        load_facts=functools.partial(store.load_facts, **paths),
+    ))
+    monkeypatch.delenv('DASHBOARD_BACKEND', raising=False)
+    return api.create_app()
+
+
+@pytest.mark.parametrize('url', [
+    '/leaderboard/CNCI?years=2015-2010',
+    '/leaderboard/CNCI?years=2010',
+    '/leaderboard/CNCI?top=-1',
+    '/leaderboard/CNCI?top=0',
+    '/leaderboard/CNCI?how=median',
+    '/yearly/CNCI?k=0',
+    '/quadrant/Documents?y=Documents',
+    '/quadrant/Documents?averages=median',
+    '/outliers/CNCI?scope=rolling&window=0',
+    '/outliers/CNCI?scope=rolling&window=-3',
+    '/outliers/CNCI?scope=rolling&window=4',
+    '/outliers/CNCI?method=zscore',
+    '/leaderboard/CNCI?page=0',
+    '/leaderboard/CNCI?format=xml',
+])
+def test_bad_params_are_400(app, url):
+    status, _, body = get(app, url)
+    assert status == 400
+    assert json.loads(body)['error']
+
+
+@pytest.mark.parametrize('url', [
+    '/leaderboard/CNCI?years=2030-2040',
+    '/leaderboard/CNCI?years=1990-2005',
+    '/leaderboard/CNCI?field=Economics',
+    '/leaderboard/CNCI?doc_type=Review',
+    '/leaderboard/CNCI?countries=ATLANTIS',
+    '/leaderboard/Impact',
+    '/yearly/CNCI?year=1999',
+    '/ranking/CNCI',
+])
+def test_unknown_values_are_404(app, url):
+    status, _, body = get(app, url)
+    assert status == 404
+    assert json.loads(body)['error']
+
+
+def test_filters_narrow_the_table(app):
+    _, _, everything = get(app, '/leaderboard/Documents')
+    _, _, physics = get(app, '/leaderboard/Documents?field=Physics&years=2012-2014')
+    total, part = json.loads(everything), json.loads(physics)
+    assert part['total'] <= total['total']
+    assert sum(r['Documents'] for r in part['rows']) < sum(r['Documents'] for r in total['rows'])
+
+
+def test_top_limits_rows(app):
+    status, headers, body = get(app, '/leaderboard/CNCI?top=3')
+    assert status == 200
+    assert headers['x-total-count'] == '3'
+    assert len(json.loads(body)['rows']) == 3
+
+
+def test_rolling_outliers_with_a_valid_window(app):
+    status, _, body = get(app, '/outliers/CNCI?scope=rolling&window=3')
+    assert status == 200
+    assert 'Lower Fence' in json.loads(body)['columns']
+
+
+def test_matching_etag_is_304_without_a_body(app):
+    status, headers, body = get(app, '/quadrant/Documents?y=CNCI')
+    assert status == 200 and body
+    etag = headers['etag']
+
+    status, headers, body = get(app, '/quadrant/Documents?y=CNCI', headers=[('If-None-Match', etag)])
+    assert status == 304
+    assert headers['etag'] == etag
+    assert body == b''
+
+    status, _, _ = get(app, '/quadrant/Documents?y=CNCI&page_size=5', headers=[('If-None-Match', etag)])
+    assert status == 200  # <-- other page, other ETag
+
+
+@pytest.fixture
+def empty_filter(app):
+    """A valid field / country / year filter that matches no rows."""
+    facts = api.store.load_facts()
+    rows = facts.loc[facts['Category'] == 'Physics']
+    physics = set(zip(rows['Country'].astype(str), rows['Year']))
+    country, year = next((c, y) for c in sorted(set(facts['Country'].astype(str))) for y in range(2010, 2020)
+                         if (c, y) not in physics)
+    return f"field=Physics&countries={country}&years={year}-{year}"
+
+
+@pytest.mark.parametrize('path', ['/outliers/CNCI', '/outliers/CNCI?scope=rolling&window=3',
+                                  '/outliers/CNCI?scope=country&method=mad', '/yearly/CNCI'])
+def test_a_filter_without_rows_gives_an_empty_table(app, empty_filter, path):
+    status, _, body = get(app, f"{path}{'&' if '?' in path else '?'}{empty_filter}")
+    assert status == 200
+    payload = json.loads(body)
+    assert payload['rows'] == []
+    if path == '/outliers/CNCI':
+        assert payload['meta']['lower'] is None and payload['meta']['upper'] is None
+
+
+def test_the_api_does_not_import_plotly():
+    code = "import sys, analytics.api; sys.exit('plotly' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(__file__))).returncode == 0
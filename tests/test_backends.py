@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import aggregates, backends, ranks, star
+
+duckdb = pytest.importorskip('duckdb')
+
+
+@pytest.fixture
+def engines(tmp_path, raw_export, build_facts):
+    facts = build_facts(raw_export(n=400, years=range(2010, 2020), Category=['Physics', 'Medicine', 'Law']))
+    frame = star.StarSchema(facts).frame()
+    cube = aggregates.build_country_cube(frame)
+    path = str(tmp_path / 'facts.parquet')
+    facts.to_parquet(path, index=False)
+    return (backends.PandasBackend(frame, cube, lambda: ranks.RankTensor(frame, aggregates.METRIC_COLUMNS)),
+            backends.DuckDBBackend(backends.connect(), path, frame))
+
+
+def test_duckdb_rolls_up_the_etl_mean_state(engines):
+    pandas_engine, duck = engines
+    rules = aggregates.quadrant_rules('mean')
+    expected, mx, my = pandas_engine.quadrant(rules, 'Documents', 'CNCI')
+    got, gx, gy = duck.quadrant(rules, 'Documents', 'CNCI')
+
+    pd.testing.assert_frame_equal(got.set_index('Country')[expected.columns[1:]], expected.set_index('Country'),
+                                  check_dtype=False, atol=0.0011)  # <-- a .xx5 tie in one of ten years moves the mean 0.001
+    assert (gx, gy) == pytest.approx((mx, my), abs=0.0011)
+
+
+def test_duckdb_year_top_matches_pandas(engines):
+    pandas_engine, duck = engines
+    expected = pandas_engine.year_top('CNCI', 2019, k=5)
+    got = duck.year_top('CNCI', 2019, k=5)
+    assert list(got['Country']) == list(expected['Country'])
+    np.testing.assert_allclose(got['CNCI'], expected['CNCI'], atol=1e-6)
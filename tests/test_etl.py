@@ -0,0 +1,188 @@
+import json
+import os
+import stat
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import etl
+from conftest import make_raw_export, write_exports
+
+
+def run(tmp_path, sources, name, force=False):
+    out = str(tmp_path / f'{name}.csv')
+    summary = etl.run_pipeline(sources, out_path=out, manifest_path=str(tmp_path / f'{name}.json'), force=force)
+    return summary, pd.read_csv(out)
+
+
+def full_rebuild(tmp_path, sources):
+    _, result = run(tmp_path, sources, 'full', force=True)
+    return result
+
+
+def test_merge_states_is_associative():
+    clean = etl.clean_raw(make_raw_export(n=300))
+    a, b, c = (etl.partial_state(part) for part in (clean.iloc[:90], clean.iloc[90:200], clean.iloc[200:]))
+
+    left = etl.merge_states([etl.merge_states([a, b]), c])
+    right = etl.merge_states([a, etl.merge_states([b, c])])
+    flat = etl.merge_states([c, a, b])
+    pd.testing.assert_frame_equal(left, right)
+    pd.testing.assert_frame_equal(left, flat)
+    pd.testing.assert_frame_equal(left, etl.partial_state(clean))
+
+
+def test_merge_states_skips_missing_states():
+    state = etl.partial_state(etl.clean_raw(make_raw_export()))
+    assert etl.merge_states([]) is None
+    assert etl.merge_states([None, None]) is None
+    assert etl.merge_states([None, state]) is state
+
+
+def test_cleaned_table_keeps_the_mergeable_state():
+    first, second = etl.clean_raw(make_raw_export(seed=1)), etl.clean_raw(make_raw_export(seed=2))
+    state = etl.state_columns()
+    halves = pd.concat([etl.aggregate(first), etl.aggregate(second)]).groupby(['Country', 'Year'])[state].sum()
+    both = etl.aggregate(pd.concat([first, second])).set_index(['Country', 'Year'])
+    pd.testing.assert_frame_equal(halves, both[state], check_dtype=False)
+
+    np.testing.assert_allclose(both['CNCI'], (halves['CNCI (sum)'] / halves['CNCI (count)']).round(2))
+    rows = pd.concat([first, second]).assign(w=lambda d: d['CNCI'] * d['Documents']).groupby(['Country', 'Year'])
+    np.testing.assert_allclose(halves['CNCI (doc sum)'] / halves['CNCI (doc weight)'],
+                               rows['w'].sum() / rows['Documents'].sum())
+
+
+def test_chunked_read_matches_a_one_pass_aggregate(tmp_path):
+    export = make_raw_export(n=500)
+    path = str(tmp_path / 'export.csv')
+    export.to_csv(path, index=False)
+
+    streamed = etl.finalize(etl.read_partition(path, chunk_rows=37))
+    one_pass = etl.aggregate(etl.clean_raw(export))
+    pd.testing.assert_frame_equal(streamed, one_pass, atol=0.011)  # <-- .xx5 ties may round the other way
+
+
+def test_england_is_merged_into_the_united_kingdom():
+    result = etl.aggregate(etl.clean_raw(make_raw_export(n=200)))
+    assert 'ENGLAND' not in set(result['Country'])
+    assert not result.duplicated(['Country', 'Year']).any()
+
+
+def test_incremental_runs_equal_a_full_rebuild(tmp_path):
+    raw = tmp_path / 'raw'
+    sources = write_exports(raw, make_raw_export(seed=1), make_raw_export(seed=2), make_raw_export(seed=3))
+
+    summary, _ = run(tmp_path, sources, 'clean')
+    assert summary['mode'] == 'full'
+    assert run(tmp_path, sources, 'clean')[0]['mode'] == 'up-to-date'
+
+    # Changed export: only its groups are recomputed
+    changed = make_raw_export(seed=2)
+    changed.loc[:4, 'Times Cited'] += 1000
+    changed.to_csv(raw / 'export-1.csv', index=False)
+    summary, result = run(tmp_path, sources, 'clean')
+    assert summary['mode'] == 'incremental'
+    pd.testing.assert_frame_equal(result, full_rebuild(tmp_path, sources))
+
+    # New export, then a removed one
+    make_raw_export(seed=4, years=(2021, 2022)).to_csv(raw / 'export-3.csv', index=False)
+    summary, result = run(tmp_path, sources, 'clean')
+    assert summary['mode'] == 'incremental'
+    pd.testing.assert_frame_equal(result, full_rebuild(tmp_path, sources))
+
+    os.remove(raw / 'export-0.csv')
+    summary, result = run(tmp_path, sources, 'clean')
+    assert summary['mode'] == 'incremental'
+    pd.testing.assert_frame_equal(result, full_rebuild(tmp_path, sources))
+
+
+def test_incremental_run_with_dimensions_equals_a_full_rebuild(tmp_path):
+    raw = tmp_path / 'raw'
+    sources = write_exports(raw, make_raw_export(seed=1, Category=['Physics', 'Medicine']), make_raw_export(seed=2))
+    run(tmp_path, sources, 'clean')
+
+    make_raw_export(seed=5, Category=['Physics', '7']).to_csv(raw / 'export-0.csv', index=False)
+    summary, result = run(tmp_path, sources, 'clean')
+    assert summary['mode'] == 'incremental'
+    pd.testing.assert_frame_equal(result, full_rebuild(tmp_path, sources))
+
+
+def test_a_new_dimension_forces_a_full_rebuild(tmp_path):
+    raw = tmp_path / 'raw'
+    sources = write_exports(raw, make_raw_export(seed=1))
+    run(tmp_path, sources, 'clean')
+
+    make_raw_export(seed=2, **{'Doc Type': ['Article', 'Review']}).to_csv(raw / 'export-1.csv', index=False)
+    summary, result = run(tmp_path, sources, 'clean')
+    assert summary['mode'] == 'full'
+    assert set(result['Doc Type']) == {'Article', 'Review', etl.UNCLASSIFIED}
+
+
+@pytest.mark.parametrize('rows', [0, 1])
+def test_tiny_exports(tmp_path, rows):
+    sources = write_exports(tmp_path / 'raw', make_raw_export(seed=1), make_raw_export(n=rows, seed=2))
+    _, result = run(tmp_path, sources, 'clean')
+    pd.testing.assert_frame_equal(result, full_rebuild(tmp_path, sources))
+
+
+def test_only_partitions_feeding_changed_groups_are_read(tmp_path):
+    raw = tmp_path / 'raw'
+    old_years = make_raw_export(seed=1, years=(2015, 2016))
+    sources = write_exports(raw, old_years, make_raw_export(seed=2, years=(2019, 2020)))
+    run(tmp_path, sources, 'clean')
+
+    make_raw_export(seed=3, years=(2021,)).to_csv(raw / 'export-2.csv', index=False)  # <-- a new year
+    summary, _ = run(tmp_path, sources, 'clean')
+    assert summary['read'] == [str(raw / 'export-2.csv')]
+
+    os.utime(raw / 'export-0.csv', ns=(1, 1))  # <-- touched, same content
+    summary, _ = run(tmp_path, sources, 'clean')
+    assert summary['mode'] == 'up-to-date' and summary['read'] == []
+
+
+def test_writes_leave_no_temp_files(tmp_path):
+    sources = write_exports(tmp_path / 'raw', make_raw_export())
+    run(tmp_path, sources, 'clean')
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.tmp-')]
+
+
+def test_writes_keep_the_target_mode_or_follow_the_umask(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl, '_UMASK', 0o022)
+    sources = write_exports(tmp_path / 'raw', make_raw_export())
+    run(tmp_path, sources, 'clean')
+    assert stat.S_IMODE(os.stat(tmp_path / 'clean.csv').st_mode) == 0o644  # <-- not mkstemp's 0600
+    assert stat.S_IMODE(os.stat(tmp_path / 'clean.json').st_mode) == 0o644
+
+    os.chmod(tmp_path / 'clean.csv', 0o640)
+    run(tmp_path, sources, 'clean', force=True)
+    assert stat.S_IMODE(os.stat(tmp_path / 'clean.csv').st_mode) == 0o640
+
+
+def test_bundled_export_matches_the_committed_cleaned_csv(tmp_path):
+    root = os.path.dirname(os.path.dirname(__file__))
+    _, result = run(tmp_path, [os.path.join(root, 'data', 'publications.csv')], 'clean')
+    pd.testing.assert_frame_equal(result, pd.read_csv(os.path.join(root, 'data', 'cleaned_publications.csv')))
+
+
+def test_an_output_of_an_older_layout_is_rebuilt(tmp_path):
+    sources = write_exports(tmp_path / 'raw', make_raw_export())
+    run(tmp_path, sources, 'clean')
+
+    manifest = etl.load_manifest(str(tmp_path / 'clean.json'))
+    del manifest['output_version']  # <-- written before the cleaned table kept the mean state
+    (tmp_path / 'clean.json').write_text(json.dumps(manifest))
+    summary, result = run(tmp_path, sources, 'clean')
+    assert summary['mode'] == 'full'
+    assert set(etl.state_columns()) <= set(result.columns)
+
+
+def test_an_export_missing_a_required_column_leaves_the_output_alone(tmp_path):
+    raw = tmp_path / 'raw'
+    sources = write_exports(raw, make_raw_export())
+    _, before = run(tmp_path, sources, 'clean')
+
+    make_raw_export(seed=2)[['Name', 'year', 'Times Cited']].to_csv(raw / 'export-1.csv', index=False)
+    with pytest.raises(ValueError, match='missing required column.*Web of Science Documents'):
+        run(tmp_path, sources, 'clean')
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'clean.csv'), before)
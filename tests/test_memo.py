@@ -0,0 +1,39 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from analytics import memo
+
+
+def test_lru_eviction_and_version_retention():
+    cache = memo.ComputeCache(max_entries=2)
+    calls = []
+    build = lambda value: calls.append(value) or value
+
+    for key in ('a', 'b', 'a', 'c'):
+        cache.get_or_compute(memo.make_key('v1', 'tab', key), build, key)
+    assert calls == ['a', 'b', 'c']  # <-- 'a' was a hit
+    assert len(cache) == 2 and cache.stats()['hits'] == 1
+
+    cache.get_or_compute(memo.make_key('v2', 'tab', 'a'), build, 'a')
+    assert cache.retain_version('v2') == 1
+    assert len(cache) == 1
+
+
+def test_make_key_ignores_param_order():
+    assert memo.make_key('v', 't', 'm', a=1, b=2) == memo.make_key('v', 't', 'm', b=2, a=1)
+
+
+def test_figure_cache_is_bounded_by_trace_points():
+    cache = memo.FigureCache(max_points=2500)
+    figure = lambda n: go.Figure(go.Scatter(x=np.arange(n), y=np.arange(n)))
+
+    cache.get_or_compute(('v', 'a', None, ()), figure, 500)   # <-- 1,000 points (x + y)
+    cache.get_or_compute(('v', 'b', None, ()), figure, 500)
+    assert cache.stats()['points'] == 2000
+
+    cache.get_or_compute(('v', 'c', None, ()), figure, 500)   # <-- over budget: 'a' goes
+    assert cache.stats()['points'] == 2000
+    assert cache.stats()['entries'] == 2
+
+    cache.clear()
+    assert cache.stats()['points'] == 0
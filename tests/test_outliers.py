@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from analytics import outliers
+
+
+@pytest.mark.parametrize('window', [-3, 0, 1, 2, 4])
+def test_rolling_scan_rejects_bad_windows(facts, window):
+    with pytest.raises(ValueError, match='odd number'):
+        outliers.scan(facts, ['CNCI'], scope='rolling', window=window)
+
+
+def test_rolling_scan_with_the_smallest_window(facts):
+    scan = outliers.scan(facts, ['CNCI', 'Documents'], scope='rolling', window=outliers.MIN_WINDOW)
+    assert scan['lower'].index.equals(facts.index)
+    assert set(scan['labels']['CNCI'].unique()) <= {'Low', 'Normal', 'High'}
+
+
+@pytest.mark.parametrize('method, k', [('iqr', 1.5), ('mad', 3.5)])
+def test_global_fences_match_pandas(facts, method, k):
+    scan = outliers.scan(facts, ['CNCI'], method=method, scope='global')
+    values = facts['CNCI'].astype('float64')
+    if method == 'iqr':
+        q1, q3 = values.quantile([0.25, 0.75])
+        expected = (q1 - k * (q3 - q1), q3 + k * (q3 - q1))
+    else:
+        med = values.median()
+        mad = (values - med).abs().median() / outliers.MAD_SCALE
+        expected = (med - k * mad, med + k * mad)
+    np.testing.assert_allclose((scan['lower']['CNCI'].iloc[0], scan['upper']['CNCI'].iloc[0]), expected)
+    flagged = (values < expected[0]) | (values > expected[1])
+    assert scan['counts']['CNCI'] == flagged.sum()
+
+
+def test_unknown_method_and_scope(facts):
+    with pytest.raises(ValueError):
+        outliers.scan(facts, ['CNCI'], method='zscore')
+    with pytest.raises(ValueError):
+        outliers.scan(facts, ['CNCI'], scope='decade')
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import quantiles, slicing
+
+COLUMNS = ['Documents', 'CNCI', '% Docs Cited']
+
+
+@pytest.fixture
+def qindex(facts):
+    return quantiles.QuantileIndex(facts, COLUMNS)
+
+
+@pytest.mark.parametrize('col', COLUMNS)
+def test_quantiles_match_pandas(facts, qindex, col):
+    series = facts[col].astype('float64')
+    for q in (0, 0.1, 0.25, 0.5, 0.75, 0.99, 1):
+        assert qindex.quantile(col, q) == series.quantile(q)
+    assert qindex.column(col).median() == series.median()
+    pd.testing.assert_series_equal(qindex.column(col).describe(), series.describe(), check_names=False)
+
+
+def test_nans_are_skipped():
+    column = quantiles.SortedColumn([3.0, np.nan, 1.0, 2.0])
+    assert len(column) == 3
+    assert column.median() == 2.0
+    assert column.count_above(1.5) == 2 and column.count_below(1.5) == 1
+    assert np.isnan(quantiles.SortedColumn([]).quantile(0.5))
+
+
+def test_group_counts_above_match_a_groupby(facts, qindex):
+    threshold = facts['CNCI'].median()
+    expected = facts[facts['CNCI'] > threshold].groupby('Country', observed=True).size()
+    counts = qindex.group_counts_above('CNCI', threshold)
+    assert counts.to_dict() == {str(k): v for k, v in expected.items() if v > 0}
+    assert counts.is_monotonic_decreasing
+
+
+def test_slice_index_gives_the_same_quantiles(facts, qindex):
+    sliced = slicing.SliceIndex(facts, COLUMNS).quantile_index()
+    for col in COLUMNS:
+        np.testing.assert_array_equal(sliced.column(col).values, qindex.column(col).values)
+        for country, column in qindex.groups[col].items():
+            np.testing.assert_array_equal(sliced.groups[col][country].values, column.values)
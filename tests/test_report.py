@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+import pytest
+
+from analytics import outliers, report
+
+
+@pytest.fixture
+def worker(facts, monkeypatch):
+    monkeypatch.setattr(report.store, 'load_facts', lambda: facts)
+    monkeypatch.setattr(report, '_WORKER', {})
+    report._init_worker()
+    return report._WORKER
+
+
+def test_views_cover_the_dashboard_selectors():
+    quadrant = report.VIEWS['tab2.quadrant'][1].values()
+    assert {(o['x_col'], o['y_col']) for o in quadrant} == {(x, y) for x in report.METRICS for y in report.METRICS if x != y}
+    assert {o['averages'] for o in quadrant} == {'mean', 'wmean'}
+
+    scans = {(o['method'], o['scope'], o['window'] if o['scope'] == 'rolling' else None)
+             for o in report.VIEWS['tab5.outliers'][1].values()}
+    assert {(m, s) for m, s, _ in scans} == {(m, s) for m in outliers.METHODS for s in outliers.SCOPES}
+    assert {w for _, s, w in scans if s == 'rolling'} == set(report.ROLLING_WINDOWS)
+    assert 'tab4.rivalry' in report.VIEWS
+
+
+@pytest.mark.parametrize('view, option', [
+    ('tab2.quadrant', 'CNCI vs Collab-CNCI, Document-Weighted Mean'),
+    ('tab4.rivalry', 'Times Cited'),
+    ('tab5.outliers', 'Documents, mad, rolling 5y'),
+    ('tab6.scatter', '% Documents in Top 10% vs CNCI'),
+    ('tab7.trend', 'CNCI'),
+])
+def test_render_writes_the_chart_and_tables(worker, tmp_path, view, option):
+    entry = report.render(str(tmp_path), 'stem', view, option, png=False)
+    assert entry['option'] == option
+    assert all(os.path.exists(tmp_path / name) for name in entry['files'] + ['stem.json'])
+    tables = [pd.read_csv(tmp_path / name) for name in entry['files'] if name.endswith('.csv')]
+    assert tables and not tables[0].empty
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import resampling
+
+
+def standardized(n=120, m=3, seed=0):
+    Z = np.random.default_rng(seed).standard_normal((n, m))
+    Z -= Z.mean(axis=0)
+    return Z / np.sqrt((Z ** 2).sum(axis=0))
+
+
+@pytest.mark.parametrize('budget', [1, 500, 10_000_000])
+def test_permutation_kernel_matches_one_matmul_per_replicate(monkeypatch, budget):
+    monkeypatch.setattr(resampling, 'PERM_BATCH_CELLS', budget)
+    Z = standardized()
+    out = resampling._permutation_kernel({'z': Z}, 37, np.random.default_rng(5))
+
+    rng = np.random.default_rng(5)
+    step = max(1, budget // Z.size)
+    perms = np.concatenate([
+        rng.permuted(np.tile(np.arange(len(Z)), (min(step, 37 - start), 1)), axis=1)
+        for start in range(0, 37, step)
+    ])
+    expected = np.stack([Z.T @ Z[p] for p in perms])
+    np.testing.assert_allclose(out, expected, atol=1e-12)
+
+
+def test_permutation_null_is_centred_on_zero():
+    null = resampling._permutation_kernel({'z': standardized(n=400)}, 2000, np.random.default_rng(0))
+    assert abs(null[:, 0, 1].mean()) < 0.01
+    assert null[:, 0, 1].std() == pytest.approx(1 / np.sqrt(400), rel=0.1)
+
+
+def test_correlation_resampling_is_reproducible_and_separates_signal():
+    rng = np.random.default_rng(3)
+    x = rng.standard_normal(200)
+    df = pd.DataFrame({'x': x, 'y': 2 * x + rng.standard_normal(200) * 0.1, 'noise': rng.standard_normal(200)})
+
+    first = resampling.correlation_resampling(df, ['x', 'y', 'noise'], n_perm=500, n_boot=200, n_jobs=1)
+    second = resampling.correlation_resampling(df, ['x', 'y', 'noise'], n_perm=500, n_boot=200, n_jobs=1)
+    pd.testing.assert_frame_equal(first['perm_pvalues'], second['perm_pvalues'])
+
+    assert first['perm_pvalues'].loc['x', 'y'] == pytest.approx(1 / 501)
+    assert first['perm_pvalues'].loc['x', 'noise'] > 0.01
+    slopes = first['lines'][:, 0, 1, 0]  # <-- slope of y on x per bootstrap replicate
+    assert np.median(slopes) == pytest.approx(2, abs=0.05)
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics import aggregates, shared, star
+
+
+def test_attach_is_a_zero_copy_read_only_view(facts, tmp_path):
+    root = str(tmp_path / 'shared')
+    shared.publish('v1', 'frame', facts, root=root)
+    frame = shared.attach('v1', 'frame', root=root)
+
+    pd.testing.assert_frame_equal(frame, facts)
+    values = frame['CNCI'].to_numpy()
+    assert not values.flags.owndata and not values.flags.writeable
+
+
+def test_tuples_keep_their_scalars(facts, tmp_path):
+    root = str(tmp_path / 'shared')
+    cube = aggregates.build_country_cube(facts)
+    table, cutoff = aggregates.pareto_table(cube, 'Documents')
+    shared.publish('v1', 'pareto', (table, np.float64(cutoff)), root=root)
+
+    attached, attached_cutoff = shared.attach('v1', 'pareto', root=root)
+    pd.testing.assert_frame_equal(attached, table, check_index_type=False)
+    assert attached_cutoff == cutoff
+
+
+def test_a_code_change_gets_a_fresh_tier(facts, tmp_path, monkeypatch):
+    root = str(tmp_path / 'shared')
+    shared.publish('v1', 'frame', facts, root=root)
+    old = shared.tier_name('v1')
+
+    monkeypatch.setattr(shared, '_code_tag', lambda: 'newcode')
+    assert shared.attach('v1', 'frame', root=root) is None  # <-- results of the old code are never attached
+    shared.publish('v1', 'frame', facts, root=root)
+
+    assert shared.prune('v1', root=root) == 1
+    assert os.listdir(root) == [shared.tier_name('v1')]
+    assert old != shared.tier_name('v1')
+
+
+def test_warm_up_only_builds_what_is_not_published(raw_export, build_facts, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # <-- the default tier lives under ./data/.cache/shared
+    facts = build_facts(raw_export(n=300, years=range(2010, 2020), Category=['Physics', 'Medicine']))
+    names = shared.warm_up('v1', facts)
+    assert shared.filter_members('v1', lambda: facts) == {'Category': ['Medicine', 'Physics'], 'Doc Type': [star.ALL]}
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("rebuilt a published table")
+    monkeypatch.setattr(star, 'StarSchema', no_rebuild)
+    monkeypatch.setattr(star, 'members_frame', no_rebuild)
+    assert shared.warm_up('v1', facts) == names
+    assert shared.filter_members('v1', no_rebuild)['Category'] == ['Medicine', 'Physics']
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import aggregates, slicing
+
+
+@pytest.fixture
+def slicer(facts):
+    return slicing.SliceIndex(facts)
+
+
+@pytest.mark.parametrize('years', [(2030, 2040), (1990, 1995), (2015, 2012)])
+def test_empty_and_reversed_spans_give_empty_slices(slicer, years):
+    full = slicer.cube()
+    cube = slicer.cube(years)
+
+    assert cube.empty
+    assert list(cube.columns) == list(full.columns)
+    assert cube.dtypes.equals(full.dtypes)
+    assert slicer.rows(years).empty
+    assert slicer.moments(years).empty
+    assert np.isnan(slicer.quantile_index(years).column('CNCI').quantile(0.5))
+
+
+def test_single_missing_year_inside_the_range_is_empty(facts):
+    slicer = slicing.SliceIndex(facts[facts['Year'] != 2015])
+    assert slicer.cube((2015, 2015)).empty
+
+
+@pytest.mark.parametrize('years, countries', [
+    (None, None),
+    ((2012, 2016), None),
+    ((2019, 2019), None),
+    ((2011, 2018), ['INDIA', 'JAPAN']),
+])
+def test_cube_matches_a_groupby_over_the_sliced_rows(slicer, years, countries):
+    rows = slicer.rows(years, countries)
+    expected = aggregates.build_country_cube(rows, slicer.metrics)
+    expected = expected[expected[('Documents', 'count')] > 0]  # <-- groupby keeps unused categories
+    cube = slicer.cube(years, countries)
+
+    assert list(cube.index) == list(expected.index.astype(str))
+    pd.testing.assert_frame_equal(cube, expected[cube.columns].set_axis(cube.index), rtol=1e-5)
+
+
+def test_rows_of_a_span_are_the_filtered_facts(facts, slicer):
+    rows = slicer.rows((2013, 2015), ['CHINA'])
+    expected = facts[facts['Year'].between(2013, 2015) & (facts['Country'] == 'CHINA')]
+    assert len(rows) == len(expected)
+    assert rows['Times Cited'].sum() == expected['Times Cited'].sum()
+    assert list(rows['Country'].cat.categories) == ['CHINA']
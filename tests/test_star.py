@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import aggregates, etl, star
+
+
+def test_raw_export_with_category_becomes_field_rollup(raw_export, build_facts):
+    export = raw_export(Category=['Physics', 'Medicine'], **{'Doc Type': ['Article']})
+    facts = build_facts(export)
+    schema = star.StarSchema(facts)
+
+    assert schema.has_filters()
+    assert schema.members('Category') == ['Medicine', 'Physics']
+    assert schema.members('Doc Type') == ['Article']
+
+    physics = schema.frame('Physics').set_index(['Country', 'Year']).sort_index()
+    expected = etl.aggregate(etl.clean_raw(export[export['Category'] == 'Physics']).drop(columns=['Category', 'Doc Type']))
+    expected = expected.set_index(['Country', 'Year']).sort_index()
+    assert list(physics.index) == list(expected.index)
+    np.testing.assert_array_equal(physics['Documents'], expected['Documents'])
+    np.testing.assert_allclose(physics['CNCI'], expected['CNCI'], atol=0.006)  # <-- float32 store, 2-decimal rounding
+    np.testing.assert_array_equal(physics['Rank'], expected['Rank'])
+
+
+def test_all_members_roll_up_to_country_year(raw_export, build_facts):
+    export = raw_export(Category=['Physics', 'Medicine'])
+    schema = star.StarSchema(build_facts(export))
+
+    overall = schema.frame().groupby(['Country', 'Year'], observed=True)['Times Cited'].sum()
+    by_field = [schema.frame(member).groupby(['Country', 'Year'], observed=True)['Times Cited'].sum()
+                for member in schema.members('Category')]
+    total = by_field[0].add(by_field[1], fill_value=0)
+    pd.testing.assert_series_equal(overall, total.astype(overall.dtype), check_names=False, check_index_type=False)
+    assert 'Category' not in schema.frame().columns
+
+
+def test_all_rollup_equals_the_flat_etl_aggregate(raw_export, build_facts):
+    export = raw_export(n=400, Category=['Physics', 'Medicine', 'Law'], **{'Doc Type': ['Article', 'Review']})
+    schema = star.StarSchema(build_facts(export))
+    flat = etl.aggregate(etl.clean_raw(export.drop(columns=['Category', 'Doc Type']))).set_index(['Country', 'Year'])
+
+    # Moments: the raw rows behind every field are recombined, not their means
+    moments, _ = schema.query()
+    means = aggregates.moment_means(moments)
+    weighted = aggregates.moment_means(moments, weighted=True)
+    for col in ('CNCI', 'Collab-CNCI', '% Docs Cited', '% Documents in Top 1%'):
+        np.testing.assert_allclose(means[col], flat[col + ' (sum)'] / flat[col + ' (count)'], rtol=1e-9)
+        np.testing.assert_allclose(weighted[col], flat[col + ' (doc sum)'] / flat[col + ' (doc weight)'], rtol=1e-9)
+
+    frame = schema.frame().set_index(['Country', 'Year']).sort_index()
+    assert list(frame.index) == list(flat.index)
+    np.testing.assert_array_equal(frame['Documents'], flat['Documents'])
+    np.testing.assert_array_equal(frame['Rank'], flat['Rank'])
+    for col in ('CNCI', 'Collab-CNCI', '% Docs Cited', '% Documents in Top 1%', '% Documents in Top 10%'):
+        np.testing.assert_allclose(frame[col], flat[col], atol=0.0101)  # <-- float32 store; .xx5 ties may round the other way
+
+
+def test_exports_without_the_dimension_go_to_unclassified(raw_export, build_facts):
+    facts = build_facts(raw_export(seed=1), raw_export(seed=2, Category=['Physics']))
+    assert star.StarSchema(facts).members('Category') == ['Physics', etl.UNCLASSIFIED]
+
+
+def test_export_without_dimensions_is_served_flat(raw_export, build_facts):
+    facts = build_facts(raw_export())
+    schema = star.StarSchema(facts)
+
+    assert not schema.has_filters()
+    frame = schema.frame()
+    pd.testing.assert_frame_equal(frame, facts.drop(columns=etl.state_columns()))
+    assert np.shares_memory(frame['CNCI'].to_numpy(), facts['CNCI'].to_numpy())  # <-- no copy of the fact table
+
+
+def test_unknown_member_raises_key_error(raw_export, build_facts):
+    schema = star.StarSchema(build_facts(raw_export(Category=['Physics', 'Medicine'])))
+    with pytest.raises(KeyError):
+        schema.frame('Economics')
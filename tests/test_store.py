@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+
+from analytics import store
+
+
+def paths(tmp_path):
+    store_path = str(tmp_path / 'store.feather')
+    return {'csv_path': str(tmp_path / 'clean.csv'), 'store_path': store_path, 'meta_path': store_path + '.json'}
+
+
+def test_typed_schema_and_projection(facts, tmp_path):
+    assert str(facts['Country'].dtype) == 'category'
+    assert facts['Year'].dtype == 'int16'
+    assert facts['Documents'].dtype == 'int32'
+    assert facts['CNCI'].dtype == 'float32'
+
+    projected = store.load_frame(['Country', 'CNCI'], **paths(tmp_path))
+    assert list(projected.columns) == ['Country', 'CNCI']
+
+
+def test_store_is_rebuilt_only_when_the_content_changes(facts, tmp_path):
+    p = paths(tmp_path)
+    version = store.ensure_store(**p)['version']
+
+    os.utime(p['csv_path'], ns=(1, 1))  # <-- touched, same content
+    assert store.ensure_store(**p)['version'] == version
+
+    csv = pd.read_csv(p['csv_path'])
+    csv.loc[0, 'Documents'] += 1
+    csv.to_csv(p['csv_path'], index=False)
+    assert store.ensure_store(**p)['version'] != version
+    assert store.load_frame(**p)['Documents'].iloc[0] == csv.loc[0, 'Documents']
+
+
+def test_memory_mapped_load_is_read_only(facts, tmp_path):
+    mapped = store.load_frame(memory_map=True, **paths(tmp_path))
+    pd.testing.assert_frame_equal(mapped, store.load_frame(**paths(tmp_path)))
+    assert not mapped['CNCI'].to_numpy().flags.writeable